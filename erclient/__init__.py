@@ -1,13 +1,33 @@
 from .api_paths import VERSION_1_0, VERSION_2_0
+from .batcher import ObservationBatcher
+from .change_sync import AsyncChangeSync, ChangeSync, WatermarkFile
+from .checkpoint import CheckpointFile, PaginationCheckpoint
+from .circuit_breaker import CircuitBreaker
 from .client import AsyncERClient, ERClient
+from .codec import JSONCodec, OrjsonCodec
+from .compression import RequestCompression
+from .dedup import ObservationDeduplicator
+from .entity_cache import EntityCache
 from .er_errors import (ERClientBadCredentials, ERClientBadRequest,
                         ERClientException, ERClientInternalError,
                         ERClientNotFound, ERClientPermissionDenied,
                         ERClientRateLimitExceeded, ERClientServiceUnreachable)
+from .http_cache import HTTPCache
+from .mirror import SQLiteMirror
+from .observation_cache import ObservationCache
+from .rate_limit import RateLimiter
+from .retry import RetryPolicy
+from .spool import ObservationSpool
+from .token_cache import FileTokenCache
 
 __all__ = [
     "ERClient",
     "AsyncERClient",
+    "AsyncChangeSync",
+    "ChangeSync",
+    "CheckpointFile",
+    "CircuitBreaker",
+    "EntityCache",
     "ERClientException",
     "ERClientBadCredentials",
     "ERClientPermissionDenied",
@@ -16,6 +36,20 @@ __all__ = [
     "ERClientServiceUnreachable",
     "ERClientNotFound",
     "ERClientRateLimitExceeded",
+    "FileTokenCache",
+    "HTTPCache",
+    "JSONCodec",
+    "ObservationBatcher",
+    "ObservationCache",
+    "ObservationDeduplicator",
+    "ObservationSpool",
+    "OrjsonCodec",
+    "PaginationCheckpoint",
+    "RateLimiter",
+    "RequestCompression",
+    "RetryPolicy",
+    "SQLiteMirror",
     "VERSION_1_0",
     "VERSION_2_0",
+    "WatermarkFile",
 ]
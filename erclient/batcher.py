@@ -0,0 +1,121 @@
+"""
+Write-behind batching of sensor observations posted through AsyncERClient.
+
+The sensors endpoint accepts lists, so observations submitted one at a time are collected
+per sensor_type and posted together, saving a round trip per observation.
+"""
+import asyncio
+
+
+class _Buffer(object):
+
+    def __init__(self):
+        self.items = []  # (observation, future)
+        self.bytes = 0
+        self.timer = None
+
+
+class ObservationBatcher(object):
+    """
+    Collects observations per sensor_type and posts them as one list when the batch reaches
+    max_batch_size observations or max_batch_bytes, or max_latency seconds after its first
+    observation, whichever comes first.
+
+    Every submitted observation gets a future, resolved with its own result when the server
+    answers with one per observation, or else with the result of the whole batch. A failed
+    post fails the futures of every observation in it.
+    """
+
+    DEFAULT_MAX_BATCH_SIZE = 100
+    DEFAULT_MAX_BATCH_BYTES = 512 * 1024
+    DEFAULT_MAX_LATENCY_SECONDS = 0.5
+    DEFAULT_MAX_CONCURRENCY = 4
+
+    def __init__(self, client, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_batch_bytes=DEFAULT_MAX_BATCH_BYTES,
+                 max_latency=DEFAULT_MAX_LATENCY_SECONDS, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """
+        :param client: The AsyncERClient used to post.
+        :param max_batch_size: Observations per post.
+        :param max_batch_bytes: Encoded size of the observations of one post.
+        :param max_latency [seconds]: Longest time an observation waits for its batch to fill up.
+        :param max_concurrency: Maximum number of batch posts in flight.
+        """
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_latency = max_latency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._buffers = {}
+        self._posts = set()
+        self.batches_posted = 0
+        self.observations_posted = 0
+
+    async def submit(self, observation, sensor_type='generic'):
+        """
+        Add an observation to its sensor_type's batch. Returns a future resolved with the post result (or its error).
+        """
+        observation = self.client._clean_observation(observation)
+        size = len(self.client.json_codec.dumps(observation))
+        buffer = self._buffers.get(sensor_type)
+        if buffer is not None and buffer.items and buffer.bytes + size > self.max_batch_bytes:
+            self._flush(sensor_type)
+        buffer = self._buffers.setdefault(sensor_type, _Buffer())
+        future = asyncio.get_event_loop().create_future()
+        buffer.items.append((observation, future))
+        buffer.bytes += size
+        if len(buffer.items) >= self.max_batch_size or buffer.bytes >= self.max_batch_bytes:
+            self._flush(sensor_type)
+        elif buffer.timer is None:
+            buffer.timer = asyncio.get_event_loop().call_later(self.max_latency, self._flush, sensor_type)
+        return future
+
+    async def post(self, observation, sensor_type='generic'):
+        """
+        Add an observation to its batch and wait until the batch has been posted.
+        """
+        return await (await self.submit(observation, sensor_type))
+
+    @property
+    def pending(self):
+        return sum(len(buffer.items) for buffer in self._buffers.values())
+
+    def _flush(self, sensor_type):
+        buffer = self._buffers.pop(sensor_type, None)
+        if buffer is None:
+            return
+        if buffer.timer is not None:
+            buffer.timer.cancel()
+        items = [(o, f) for o, f in buffer.items if not f.cancelled()]
+        if items:
+            post = asyncio.ensure_future(self._post(sensor_type, items))
+            self._posts.add(post)
+            post.add_done_callback(self._posts.discard)
+
+    async def _post(self, sensor_type, items):
+        async with self._semaphore:
+            try:
+                result = await self.client.post_sensor_observation(
+                    [observation for observation, _ in items], sensor_type=sensor_type, batch=False)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        self.batches_posted += 1
+        self.observations_posted += len(items)
+        per_item = isinstance(result, list) and len(result) == len(items)
+        for i, (_, future) in enumerate(items):
+            if not future.done():
+                future.set_result(result[i] if per_item else result)
+
+    async def flush(self):
+        """
+        Post every pending batch now and wait for all posts in flight.
+        """
+        for sensor_type in list(self._buffers):
+            self._flush(sensor_type)
+        while self._posts:
+            await asyncio.gather(*list(self._posts), return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
@@ -0,0 +1,125 @@
+"""
+Checkpoints of paginated scans, so a long backfill can resume where it stopped.
+"""
+import json
+import os
+import tempfile
+
+
+def _normalized(params):
+    # Params as they read back from JSON, so a loaded checkpoint compares equal to the live one
+    return json.loads(json.dumps(params or {}, default=str))
+
+
+def write_json_atomic(path, data):
+    """
+    Replace the file at path with data as JSON, so a crash leaves either the old or the new file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class PaginationCheckpoint(object):
+    """
+    Where a paginated scan stands after a page: the query it runs and the params of the next
+    page (which carry its cursor, page or offset). `done` is set once the last page was read.
+
+    Checkpoints are taken after every item of a page was yielded, so resuming after a crash
+    may yield again the items of the page that was being consumed, never skip any.
+    """
+
+    def __init__(self, path, params, next_params=None, pages=0, items=0):
+        self.path = path
+        self.params = _normalized(params)
+        self.next_params = _normalized(next_params) if next_params is not None else None
+        self.pages = pages
+        self.items = items
+
+    @property
+    def done(self):
+        return self.next_params is None
+
+    def advance(self, next_params, items):
+        """
+        The checkpoint after one more page of `items` items.
+        """
+        return PaginationCheckpoint(self.path, self.params, next_params=next_params,
+                                    pages=self.pages + 1, items=self.items + items)
+
+    def matches(self, path, params):
+        return self.path == path and self.params == _normalized(params)
+
+    def to_dict(self):
+        return dict(path=self.path, params=self.params, next_params=self.next_params,
+                    pages=self.pages, items=self.items)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['path'], data['params'], next_params=data.get('next_params'),
+                   pages=data.get('pages', 0), items=data.get('items', 0))
+
+    def __eq__(self, other):
+        return isinstance(other, PaginationCheckpoint) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f'PaginationCheckpoint({self.path!r}, pages={self.pages}, items={self.items}, done={self.done})'
+
+
+def start_checkpoint(path, params, resume_from=None):
+    """
+    The checkpoint a scan of path with params starts from: resume_from (a PaginationCheckpoint
+    or its dict), or the first page.
+
+    :raises ValueError: if resume_from is a checkpoint of a different query
+    """
+    if resume_from is None:
+        return PaginationCheckpoint(path, params, next_params=params)
+    if isinstance(resume_from, dict):
+        resume_from = PaginationCheckpoint.from_dict(resume_from)
+    if not resume_from.matches(path, params):
+        raise ValueError(f'Checkpoint is for {resume_from.path} {resume_from.params}, not {path} {_normalized(params)}')
+    return resume_from
+
+
+class CheckpointFile(object):
+    """
+    Keeps the latest checkpoint of a scan in a JSON file:
+
+        checkpoints = CheckpointFile('backfill.json')
+        for observation in client.get_observations(..., resume_from=checkpoints.load(),
+                                                   on_checkpoint=checkpoints.save):
+            ...
+
+    Each save replaces the file atomically, so a crash leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """
+        The saved checkpoint, or None if there is none.
+        """
+        try:
+            with open(self.path) as f:
+                return PaginationCheckpoint.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def save(self, checkpoint):
+        write_json_atomic(self.path, checkpoint.to_dict())
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
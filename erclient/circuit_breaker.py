@@ -0,0 +1,91 @@
+"""
+Circuit breaker that makes clients fail fast while an ER site is down.
+"""
+import math
+import threading
+import time
+
+from .er_errors import ERClientServiceUnreachable
+
+
+class CircuitBreaker(object):
+    """
+    Opens after `failure_threshold` consecutive failures (502/503/504 or connection errors)
+    and rejects requests with ERClientServiceUnreachable until `recovery_timeout` has passed.
+    Then a single caller is let through to probe the service (half-open): success closes
+    the circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    DEFAULT_FAILURE_THRESHOLD = 5
+    DEFAULT_RECOVERY_TIMEOUT_SECONDS = 30
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 recovery_timeout=DEFAULT_RECOVERY_TIMEOUT_SECONDS, name=None):
+        """
+        :param failure_threshold: Consecutive failures that open the circuit.
+        :param recovery_timeout [seconds]: Time to wait while open before probing the service.
+        :param name: Used in error messages, usually the service root.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.name = name
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_service(cls, service_root, **kwargs):
+        """
+        Return the breaker shared by every client of the given service root in this process.
+        """
+        with cls._registry_lock:
+            breaker = cls._registry.get(service_root)
+            if breaker is None:
+                breaker = cls._registry[service_root] = cls(name=service_root, **kwargs)
+            return breaker
+
+    @property
+    def state(self):
+        return self._state
+
+    def acquire(self):
+        """
+        Check whether a request may be sent.
+
+        :return: CLOSED if it may go ahead, HALF_OPEN if the caller must probe the service first
+        :raises ERClientServiceUnreachable: while the circuit is open or another caller is probing
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return self.CLOSED
+            remaining = self._opened_at + self.recovery_timeout - time.monotonic()
+            if self._state == self.OPEN and remaining <= 0:
+                self._state = self.HALF_OPEN
+                return self.HALF_OPEN
+        raise ERClientServiceUnreachable(
+            f'ER service unavailable, failing fast while the circuit is open ({self.name})',
+            retry_after=max(0, math.ceil(remaining)))
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.OPEN:
+                # A request sent before the circuit opened: don't push the recovery time back
+                return
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
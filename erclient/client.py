@@ -1,16 +1,19 @@
-import concurrent.futures
+import asyncio
 import csv
+import itertools
 import json
 import logging
 import math
 import re
+import threading
 import time
 import warnings
+from contextlib import closing
 from datetime import datetime, timedelta, timezone
 from email.utils import parsedate_to_datetime
 from http import HTTPStatus
 from typing import List
-from urllib.parse import urlparse, urlunparse
+from urllib.parse import parse_qsl, urlparse, urlunparse
 
 import httpx
 import pytz
@@ -21,10 +24,29 @@ from urllib3.util.retry import Retry
 from .api_paths import (DEFAULT_VERSION, VERSION_2_0, event_type_detail_path,
                         event_types_list_path, event_types_patch_path,
                         normalize_version)
+from .batcher import ObservationBatcher
+from .checkpoint import start_checkpoint
+from .circuit_breaker import CircuitBreaker
+from .coalesce import SingleFlight
+from .codec import get_codec
+from .compression import RequestCompression
+from .dedup import ObservationDeduplicator
+from .entity_cache import EntityCache, references
 from .er_errors import (ERClientBadCredentials, ERClientBadRequest,
                         ERClientException, ERClientInternalError,
                         ERClientNotFound, ERClientPermissionDenied,
                         ERClientRateLimitExceeded, ERClientServiceUnreachable)
+from .http_cache import HTTPCache
+from .observation_cache import ObservationCache
+from .pager import ConcurrentPager
+from .retry import RetryPolicy
+from .scan import (RESOLUTION, ScanPlanner, event_count_params,
+                   event_window_filter, observation_window_params, scan_windows,
+                   scan_windows_async, to_datetime)
+from .scheduler import ObservationScheduler
+from .spool import OBSERVATIONS, OUTAGE_STATUS_CODES, SENSORS, ObservationSpool
+from .streaming import ResultsStreamParser
+from .token_cache import FileTokenCache
 from .version import __version__
 
 version_string = __version__
@@ -57,11 +79,30 @@ def linkify(url, params):
 
 
 def split_link(url):
-    url, qs = url.split('?')
-    params = dict([p.split('=') for p in qs.split('&')])
+    url, _, qs = url.partition('?')
+    # Decoded, so a cursor like "cj0x...%3D%3D" isn't encoded twice when sent back
+    params = dict(parse_qsl(qs, keep_blank_values=True))
     return (url, params)
 
 
+def next_page_params(response, params):
+    """
+    The params of the page after `response`, keeping whichever pagination method (cursor, page
+    or offset) its next link uses. None on the last page or when the caller asked for one page.
+    """
+    if not (response.get('next') and 'page' not in params):
+        return None
+    url, query_params = split_link(response['next'])
+    # Try to discover the pagination method
+    if "page" in query_params:
+        return {**params, 'page': query_params['page']}
+    elif "cursor" in query_params:
+        return {**params, 'cursor': query_params['cursor']}
+    elif "offset" in query_params:
+        return {**params, 'offset': query_params['offset']}
+    return None  # Unknown pagination method
+
+
 class ERClient(object):
     """
     ERClient provides basic access to the EarthRanger server API. You will need the server hostname as well as credentials in the form of a username/password or access token.
@@ -69,6 +110,10 @@ class ERClient(object):
     The boiler-plate code handles authentication, so you don't have to think about Oauth2 or refresh tokens.
     """
 
+    DEFAULT_CONNECT_TIMEOUT_SECONDS = 3.1
+    DEFAULT_DATA_TIMEOUT_SECONDS = 20
+    STREAM_CHUNK_SIZE = 64 * 1024
+
     def __init__(self, **kwargs):
         """
         Initialize an ERClient instance.
@@ -87,7 +132,18 @@ class ERClient(object):
         If posting to the sensors API, the default provider key
         :param provider_key: provider-key for posting observation data (Ex. xyz_provider)
 
-        :param max_http_retries: number of retries, default is 5
+        :param max_http_retries: number of attempts per request under the default retry_policy, default is 5
+        :param connect_timeout [seconds]: Maximum amount of time to wait for a connection to the token endpoint. Default is 3.1
+        :param data_timeout [seconds]: Maximum amount of time to wait for the token endpoint to respond. Default is 20
+        :param token_cache: Optional FileTokenCache shared with other processes. It is checked before requesting a token and updated after a successful login or refresh.
+        :param retry_policy: RetryPolicy applied to failed requests, the only retry layer of the client. Default makes up to max_http_retries attempts with exponential backoff, honoring Retry-After.
+        :param rate_limiter: Optional RateLimiter that paces requests per endpoint family (e.g. observations, sensors/, activity/events).
+        :param json_codec: Codec (or codec name, 'json' or 'orjson') used to encode request bodies and decode responses. Default is the standard library json.
+        :param compress_requests: True to gzip request bodies of 1 KB or more (e.g. bulk observations), or a RequestCompression to choose the encoding, threshold and level. Turned off automatically if the server rejects compressed bodies.
+        :param http_cache: True or an HTTPCache to keep metadata responses (event types, event categories, subject groups...) and revalidate them with If-None-Match/If-Modified-Since instead of downloading them again.
+        :param observation_cache: True, a directory or an ObservationCache to keep historical observations of get_subject_observations() and get_source_observations() on disk.
+        :param spool: A directory or an ObservationSpool where post_observation() and post_sensor_observation() keep what they can't post while ER is unreachable. Spooled observations are posted first, in order, once ER is back.
+        :param deduplicate_observations: True, a file or an ObservationDeduplicator to drop observations whose (manufacturer_id, recorded_at) was posted already with post_observation() or post_sensor_observation(). A file keeps the index between runs.
 
         """
 
@@ -95,6 +151,25 @@ class ERClient(object):
         self.auth_expires = pytz.utc.localize(datetime.min)
         self._http_session = None
         self.max_retries = kwargs.get('max_http_retries', 5)
+        # _get has always made max_http_retries attempts in all
+        self.retry_policy = kwargs.get('retry_policy') or RetryPolicy(
+            max_retries=max(self.max_retries - 1, 0))
+        self.rate_limiter = kwargs.get('rate_limiter')
+        self.json_codec = get_codec(kwargs.get('json_codec'))
+        self.request_compression = RequestCompression.from_option(
+            kwargs.get('compress_requests'))
+        self.http_cache = HTTPCache.from_option(kwargs.get('http_cache'))
+        self.observation_cache = ObservationCache.from_option(kwargs.get('observation_cache'))
+        self.spool = ObservationSpool.from_option(kwargs.get('spool'))
+        self._spool_retry_at = 0
+        # One thread replays the spool at a time
+        self._spool_lock = threading.Lock()
+        self.observation_deduplicator = ObservationDeduplicator.from_option(
+            kwargs.get('deduplicate_observations'))
+        self.auth_timeout = (kwargs.get('connect_timeout', self.DEFAULT_CONNECT_TIMEOUT_SECONDS),
+                             kwargs.get('data_timeout', self.DEFAULT_DATA_TIMEOUT_SECONDS))
+        # Serializes token renewal across the worker threads sharing this client
+        self._auth_lock = threading.Lock()
 
         raw_service_root = kwargs.get('service_root') or ""
         # Normalize via urlparse: if path contains /api (e.g. /api or /api/v1.0), keep only scheme+netloc+path before /api.
@@ -113,6 +188,7 @@ class ERClient(object):
         self.username = kwargs.get('username')
         self.password = kwargs.get('password')
         self.realtime_url = kwargs.get('realtime_url')
+        self.token_cache = kwargs.get('token_cache')
 
         if kwargs.get('token'):
             self.token = kwargs.get('token')
@@ -125,27 +201,81 @@ class ERClient(object):
         self.logger = logging.getLogger(self.__class__.__name__)
 
         self._http_session = requests.Session()
-        retries = Retry(total=5, backoff_factor=1.5, status_forcelist=[502])
+        # retry_policy is the only retry layer: the adapters make one attempt per request
+        retries = Retry(total=0, read=False)
         self._http_session.mount("http", HTTPAdapter(max_retries=retries))
         self._http_session.mount("https", HTTPAdapter(max_retries=retries))
 
+    def close(self):
+        """
+        Close the observation spool and save the index of posted observations (see spool and
+        deduplicate_observations), then close the HTTP session.
+        """
+        self._close_observation_stores()
+        self._http_session.close()
+
+    # Support using this client as a context manager.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _close_observation_stores(self):
+        if self.spool is not None:
+            self.spool.close()
+        if self.observation_deduplicator is not None:
+            self.observation_deduplicator.close()
+
     def _auth_is_valid(self):
         return self.auth_expires > datetime.now(tz=timezone.utc)
 
     def auth_headers(self):
 
+        auth = self.auth
+        if not auth or not self._auth_is_valid():
+            with self._auth_lock:
+                # Another thread may have renewed the token while we waited for the lock
+                if not self.auth or not self._auth_is_valid():
+                    self._renew_auth()
+                auth = self.auth
+
+        return {'Authorization': '{} {}'.format(auth['token_type'],
+                                                auth['access_token']),
+                'Accept-Type': 'application/json'}
+
+    def _renew_auth(self):
+        if self.token_cache is None:
+            return self._request_new_auth()
+
+        # Hold the cache lock across the token request so only one process renews at a time
+        with self.token_cache.locked():
+            if self._load_cached_auth():
+                return
+            self._request_new_auth()
+            self.token_cache.store(self._token_cache_key(),
+                                   self.auth, self.auth_expires)
+
+    def _request_new_auth(self):
         if self.auth:
-            if not self._auth_is_valid():
-                if not self.refresh_token():
-                    if not self.login():
-                        raise ERClientException('Login failed.')
+            if not self.refresh_token():
+                if not self.login():
+                    raise ERClientException('Login failed.')
         else:
             if not self.login():
                 raise ERClientException('Login failed.')
 
-        return {'Authorization': '{} {}'.format(self.auth['token_type'],
-                                                self.auth['access_token']),
-                'Accept-Type': 'application/json'}
+    def _token_cache_key(self):
+        return FileTokenCache.make_key(self.service_root, self.client_id, self.username)
+
+    def _load_cached_auth(self):
+        cached = self.token_cache.load(self._token_cache_key())
+        # Only adopt a token newer than ours (e.g. one another process just renewed)
+        if cached and cached[1] > self.auth_expires:
+            self.auth_expires = cached[1]
+            self.auth = cached[0]
+            return True
+        return False
 
     def refresh_token(self):
         payload = {'grant_type': 'refresh_token',
@@ -165,12 +295,15 @@ class ERClient(object):
 
     def _token_request(self, payload):
 
-        response = requests.post(self.token_url, data=payload)
+        # Go through the pooled session so renewals reuse an open connection
+        response = self._http_session.post(
+            self.token_url, data=payload, timeout=self.auth_timeout)
         if response.ok:
-            self.auth = json.loads(response.text)
-            expires_in = int(self.auth['expires_in']) - 5 * 60
+            auth = self.json_codec.loads(response.content)
+            expires_in = int(auth['expires_in']) - 5 * 60
             self.auth_expires = datetime.now(
                 tz=timezone.utc) + timedelta(seconds=expires_in)
+            self.auth = auth
             return True
 
         self.auth = None
@@ -187,29 +320,66 @@ class ERClient(object):
             base_url = self._api_root(DEFAULT_VERSION)
         return '/'.join((base_url.rstrip('/'), path.lstrip('/')))
 
-    def _get(self, path, base_url=None, stream=False, max_retries=5, seconds_between_attempts=5, **kwargs):
+    def _get(self, path, base_url=None, stream=False, max_retries=None, seconds_between_attempts=None,
+             revalidate=False, **kwargs):
+        """
+        :param max_retries: Override the retry policy's number of retries for this call.
+        :param seconds_between_attempts: Wait this fixed delay between attempts instead of the policy's backoff.
+        :param revalidate: Serve the response from http_cache when the server says it has not changed.
+        """
         headers = {'User-Agent': self.user_agent}
 
         headers.update(self.auth_headers())
         if (not path.startswith("http")):
             path = self._er_url(path, base_url)
 
+        cache_key = cached = None
+        if revalidate and self.http_cache is not None:
+            cache_key = self.http_cache.key(path, kwargs.get('params'))
+            cached = self.http_cache.get(cache_key)
+            if cached is not None:
+                headers.update(cached.validators())
+
+        policy = self.retry_policy
+        if max_retries is not None:
+            policy = policy.copy(max_retries=max_retries)
+        if seconds_between_attempts is not None:
+            policy = policy.copy(backoff_factor=seconds_between_attempts,
+                                 max_backoff=seconds_between_attempts, jitter=False)
+
         attempts = 0
-        while (attempts <= max_retries):
+        while True:
             attempts += 1
 
-            response = None
-            if (self._http_session):
-                response = self._http_session.get(path, headers=headers,
-                                                  params=kwargs.get('params'), stream=stream)
-            else:
-                response = requests.get(path, headers=headers,
-                                        params=kwargs.get('params'), stream=stream)
-
-            if response.ok:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(path)
+            try:
+                if (self._http_session):
+                    response = self._http_session.get(path, headers=headers,
+                                                      params=kwargs.get('params'), stream=stream)
+                else:
+                    response = requests.get(path, headers=headers,
+                                            params=kwargs.get('params'), stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = policy.retry_delay('GET', attempts)
+                if delay is None:
+                    raise
+                self.logger.warning(
+                    f"Fail attempt {attempts} of {policy.max_retries+1}: {e}")
+                time.sleep(delay)
+                continue
+
+            not_modified = cached is not None and response.status_code == HTTPStatus.NOT_MODIFIED
+            if response.ok or not_modified:
                 if kwargs.get('return_response', False):
                     return response
-                data = json.loads(response.text)
+                if cache_key is not None:
+                    self.http_cache.record(not_modified)
+                    if not not_modified:
+                        self.http_cache.store(
+                            cache_key, response.headers, response.content)
+                data = self.json_codec.loads(
+                    cached.content if not_modified else response.content)
                 if 'metadata' in data:
                     return data['metadata']
                 elif 'data' in data:
@@ -237,23 +407,70 @@ class ERClient(object):
                     reason = 'unknown reason'
                 raise ERClientPermissionDenied(reason)
 
-            self.logger.warn(
-                f"Fail attempt {attempts} of {max_retries+1}: {response.text}")
-            if (attempts >= max_retries):
+            retry_after = parse_retry_after_header(
+                response.headers.get('Retry-After'))
+            self.logger.warning(
+                f"Fail attempt {attempts} of {policy.max_retries+1}: {response.text}")
+            delay = policy.retry_delay(
+                'GET', attempts, status_code=response.status_code, retry_after=retry_after)
+            if delay is None:
                 raise ERClientException(
-                    f"Failed to call ER web service at {response.url} after {attempts} tries. {response.status_code} {response.text}")
-            time.sleep(seconds_between_attempts)
+                    f"Failed to call ER web service at {response.url} after {attempts} tries. {response.status_code} {response.text}",
+                    status_code=response.status_code, response_body=response.text, retry_after=retry_after)
+            time.sleep(delay)
+
+    def _get_stream(self, path, parser, params=None, base_url=None):
+        """
+        Yield the items of a paginated response's results while the response downloads.
+        The rest of the response is left in parser.envelope.
+        """
+        response = self._get(path, base_url=base_url, params=params,
+                             stream=True, return_response=True)
+        with closing(response):
+            for chunk in response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE):
+                yield from parser.feed(chunk)
+            yield from parser.close()
+
+    def _send_with_retries(self, method, path, send):
+        """
+        Call send() until it returns a response the retry policy accepts, sleeping between attempts.
+        """
+        attempts = 0
+        while True:
+            attempts += 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(path)
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A connect timeout means the request never reached the server
+                delay = self.retry_policy.retry_delay(
+                    method, attempts, request_sent=not isinstance(e, requests.ConnectTimeout))
+                if delay is None:
+                    raise
+                self.logger.warning(
+                    f"{method} attempt {attempts} failed: {e}. Retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            if response.ok:
+                return response
+            retry_after = parse_retry_after_header(
+                response.headers.get('Retry-After'))
+            delay = self.retry_policy.retry_delay(
+                method, attempts, status_code=response.status_code, retry_after=retry_after)
+            if delay is None:
+                return response
+            self.logger.warning(
+                f"{method} attempt {attempts} failed with {response.status_code}. Retrying in {delay:.2f}s")
+            time.sleep(delay)
 
     def _call(self, path, payload, method, params=None, base_url=None):
         headers = {'Content-Type': 'application/json',
                    'User-Agent': self.user_agent}
         headers.update(self.auth_headers())
 
-        def time_converter(t):
-            if isinstance(t, datetime):
-                return t.isoformat()
-
-        body = json.dumps(payload, default=time_converter)
+        body = self.json_codec.dumps(payload)
 
         fmap = None
         if (self._http_session):
@@ -267,11 +484,26 @@ class ERClient(object):
             self.logger.error('method must be one of...')
         else:
             url = self._er_url(path, base_url)
-            response = fn(url, data=body,
-                          headers=headers, params=params)
+            compressed = self.request_compression.compress(
+                body) if self.request_compression else None
+            if compressed is not None:
+                response = self._send_with_retries(
+                    method, path, lambda: fn(url, data=compressed, headers=self.request_compression.headers(headers),
+                                             params=params))
+                if self.request_compression.is_rejection(response.status_code, response.text):
+                    response = self._send_with_retries(
+                        method, path, lambda: fn(url, data=body, headers=headers, params=params))
+                    if response.ok:
+                        # The body was fine, so the server can't decode compressed requests
+                        self.logger.warning(
+                            'ER rejected a compressed request body, sending uncompressed bodies from now on')
+                        self.request_compression.disable()
+            else:
+                response = self._send_with_retries(
+                    method, path, lambda: fn(url, data=body, headers=headers, params=params))
 
         if response and response.ok:
-            res_json = response.json()
+            res_json = self.json_codec.loads(response.content)
             if res_json and 'data' in res_json and res_json['data']:
                 return res_json['data']
             else:
@@ -290,6 +522,9 @@ class ERClient(object):
         if response.status_code == 403:  # forbidden
             raise ERClientPermissionDenied(reason)
 
+        retry_after = parse_retry_after_header(
+            response.headers.get('Retry-After'))
+
         if response.status_code == 504 or response.status_code == 502:  # gateway timeout or bad gateway
             self.logger.error(f"ER service unavailable", extra=dict(provider_key=self.provider_key,
                                                                     service=self.service_root,
@@ -297,7 +532,8 @@ class ERClient(object):
                                                                     status_code=response.status_code,
                                                                     reason=reason,
                                                                     text=response.text))
-            raise ERClientServiceUnreachable(f"ER service unavailable")
+            raise ERClientServiceUnreachable(f"ER service unavailable", status_code=response.status_code,
+                                             response_body=response.text, retry_after=retry_after)
 
         self.logger.error(f"ER returned bad response", extra=dict(provider_key=self.provider_key,
                                                                   service=self.service_root,
@@ -307,7 +543,8 @@ class ERClient(object):
                                                                   text=response.text))
         message = f"provider_key: {self.provider_key}, service: {self.service_root}, path: {path},\n\t {response.status_code} from ER. Message: {reason} {response.text}"
         raise ERClientException(
-            f"Failed to {fn} to ER web service. {message}")
+            f"Failed to {fn} to ER web service. {message}", status_code=response.status_code,
+            response_body=response.text, retry_after=retry_after)
 
     def _post(self, path, payload, params=None, base_url=None):
         return self._call(path, payload, "POST", params, base_url=base_url)
@@ -335,10 +572,11 @@ class ERClient(object):
         headers.update(self.auth_headers())
 
         if (self._http_session):
-            response = self._http_session.delete(
-                self._er_url(path), headers=headers)
+            fn = self._http_session.delete
         else:
-            response = requests.delete(self._er_url(path), headers=headers)
+            fn = requests.delete
+        response = self._send_with_retries(
+            'DELETE', path, lambda: fn(self._er_url(path), headers=headers))
 
         if response.ok:
             return True
@@ -379,10 +617,17 @@ class ERClient(object):
         headers.update(self.auth_headers())
 
         body = body or {}
-        response = requests.post(self._er_url(
-            path), data=body, headers=headers, files=files)
+
+        def send():
+            # Files are consumed by each attempt; rewind them before a retry
+            for f in (files or {}).values():
+                if hasattr(f, 'seek'):
+                    f.seek(0)
+            return requests.post(self._er_url(path), data=body, headers=headers, files=files)
+
+        response = self._send_with_retries('POST', path, send)
         if response and response.ok:
-            return json.loads(response.text)['data']
+            return self.json_codec.loads(response.content)['data']
 
         if response.status_code == 404:  # not found
             raise ERClientNotFound()
@@ -529,8 +774,16 @@ class ERClient(object):
         else:
             payload = self._clean_observation(observation)
 
+        payload, positions = self._drop_posted(payload)
+        if payload is None:
+            return None
         self.logger.debug('Posting observation: %s', payload)
-        return self._post('observations', payload=payload)
+        if self.spool is not None:
+            result = self._post_or_spool(OBSERVATIONS, payload)
+        else:
+            result = self._post('observations', payload=payload)
+        self._mark_posted(payload)
+        return self._posted_results(result, payload, positions)
 
     def post_sensor_observation(self, observation, sensor_type='generic'):
         """
@@ -541,11 +794,118 @@ class ERClient(object):
         else:
             self._clean_observation(observation)
 
+        observation, positions = self._drop_posted(observation)
+        if observation is None:
+            return None
         self.logger.debug('Posting observation: %s', observation)
-        result = self._post(
-            'sensors/{}/{}/status'.format(sensor_type, self.provider_key), payload=observation)
+        if self.spool is not None:
+            result = self._post_or_spool(SENSORS, observation, sensor_type)
+        else:
+            result = self._post(
+                'sensors/{}/{}/status'.format(sensor_type, self.provider_key), payload=observation)
         self.logger.debug('Result of post is: %s', result)
-        return result
+        self._mark_posted(observation)
+        return self._posted_results(result, observation, positions)
+
+    def _drop_posted(self, payload):
+        """
+        Leave out the observations already posted (see deduplicate_observations).
+        Returns what is left to post (None if nothing is) and, for a list, the positions that
+        map the results back to it (see ObservationDeduplicator.filter).
+        """
+        if self.observation_deduplicator is None:
+            return payload, None
+        if isinstance(payload, (list, set)):
+            observations, positions = self.observation_deduplicator.filter(payload, positions=True)
+        else:
+            observations = payload if self.observation_deduplicator.filter([payload]) else None
+            positions = None
+        if not observations:
+            self.logger.debug('Dropping already posted observations: %s', payload)
+            return None, None
+        return observations, positions
+
+    def _mark_posted(self, payload):
+        if self.observation_deduplicator is not None:
+            self.observation_deduplicator.mark(payload if isinstance(payload, list) else [payload])
+
+    @staticmethod
+    def _posted_results(result, posted, positions):
+        # One result per observation of the caller's list, None for those posted before
+        if positions is None or not isinstance(result, list) or len(result) != len(posted):
+            return result
+        return [None if i is None else result[i] for i in positions]
+
+    def _post_spool_kind(self, kind, payload, sensor_type=None):
+        if kind == OBSERVATIONS:
+            return self._post('observations', payload=payload)
+        return self._post('sensors/{}/{}/status'.format(sensor_type, self.provider_key), payload=payload)
+
+    def _is_outage(self, error):
+        return (isinstance(error, (ERClientServiceUnreachable, requests.ConnectionError, requests.Timeout))
+                or getattr(error, 'status_code', None) in OUTAGE_STATUS_CODES)
+
+    def _post_or_spool(self, kind, payload, sensor_type=None):
+        """
+        Post payload, or append it to the spool while ER is unreachable or older observations
+        are still spooled, so observations reach ER in order. Returns None when spooled.
+        """
+        if not self.spool.is_empty and time.monotonic() >= self._spool_retry_at:
+            if self._spool_lock.acquire(blocking=False):
+                try:
+                    self._replay_spool()
+                finally:
+                    self._spool_lock.release()
+        if self.spool.is_empty:
+            try:
+                return self._post_spool_kind(kind, payload, sensor_type)
+            except Exception as e:
+                if not self._is_outage(e):
+                    raise
+                self.logger.warning(f'ER is unreachable, spooling {kind}: {e}')
+                self._spool_retry_at = time.monotonic() + self.spool.retry_interval
+        self.spool.append(kind, payload, sensor_type)
+        return None
+
+    def replay_spool(self):
+        """
+        Post the spooled observations in order, in batches, stopping at the first outage.
+        Observations that ER rejects (e.g. 400 Bad Request) are logged and dropped, so they don't hold back the rest.
+
+        :return: Number of observations posted.
+        """
+        with self._spool_lock:
+            return self._replay_spool()
+
+    def _replay_spool(self):
+        posted = 0
+        while True:
+            batch = self.spool.next_batch()
+            if batch is None:
+                return posted
+            kind, sensor_type, entries = batch
+            try:
+                self._post_spool_kind(kind, [o for _, observations in entries for o in observations], sensor_type)
+            except Exception as e:
+                if self._is_outage(e):
+                    self._spool_retry_at = time.monotonic() + self.spool.retry_interval
+                    return posted
+                # Post the batch's records one by one to drop only the rejected ones
+                for position, observations in entries:
+                    try:
+                        self._post_spool_kind(kind, observations, sensor_type)
+                    except Exception as e:
+                        if self._is_outage(e):
+                            self._spool_retry_at = time.monotonic() + self.spool.retry_interval
+                            return posted
+                        self.logger.error(f'Dropping spooled {kind} rejected by ER: {e}',
+                                          extra=dict(observations=observations))
+                    else:
+                        posted += len(observations)
+                    self.spool.ack(position)
+                continue
+            posted += sum(len(observations) for _, observations in entries)
+            self.spool.ack(entries[-1][0])
 
     def post_patrol(self, data):
         payload = self._clean_event(data)
@@ -641,10 +1001,11 @@ class ERClient(object):
         base_url = self._api_root(version)
         params = {
             "include_schema": include_schema} if version == VERSION_2_0 else None
-        return self._get(path, base_url=base_url, params=params)
+        return self._get(path, base_url=base_url, params=params, revalidate=True)
 
     def get_event_categories(self, include_inactive=False):
-        return self._get(f'activity/events/categories', params={"include_inactive": include_inactive})
+        return self._get(f'activity/events/categories', params={"include_inactive": include_inactive},
+                         revalidate=True)
 
     def get_messages(self):
 
@@ -672,19 +1033,51 @@ class ERClient(object):
         path = event_types_list_path(version)
         base_url = self._api_root(version)
         return self._get(path, base_url=base_url,
-                         params={"include_inactive": include_inactive, "include_schema": include_schema})
+                         params={"include_inactive": include_inactive, "include_schema": include_schema},
+                         revalidate=True)
 
     def get_event_schema(self, event_type):
-        return self._get(f'activity/events/schema/eventtype/{event_type}')
-
-    def _get_objects_count(self, params):
-        params = params.copy()
-        params["page"] = 1
-        params["page_size"] = 1
-        events = self._get(params['object'], params=params)
-        if events and events.get('count'):
-            return events['count']
-        return 0
+        return self._get(f'activity/events/schema/eventtype/{event_type}', revalidate=True)
+
+    def _get_data(self, path, params, stream=False, resume_from=None, on_checkpoint=None):
+        """
+        Yield the results of every page of a list, following its next links. Uses the cursor
+        paginator unless a page is given, so a deep page costs the same as the first.
+
+        :param stream: Parse each page while it downloads (see _get_stream).
+        :param resume_from: PaginationCheckpoint (or its dict) to continue a previous scan from.
+        :param on_checkpoint: Called with a PaginationCheckpoint after each page is consumed.
+        """
+        params = dict(params)
+        if 'page' not in params:
+            params['use_cursor'] = 'true'
+        checkpoint = start_checkpoint(path, params, resume_from)
+        page_params = params if resume_from is None else checkpoint.next_params
+        while page_params is not None:
+            count = 0
+            if stream:
+                parser = ResultsStreamParser()
+                for item in self._get_stream(path, parser, params=page_params):
+                    count += 1
+                    yield item
+                response = parser.page
+            else:
+                response = self._get(path, params=page_params)
+                if isinstance(response, list):  # Not paginated
+                    yield from response
+                    break
+                if response and 'results' not in response:  # A single object
+                    yield response
+                    break
+                results = (response or {}).get('results') or []
+                count = len(results)
+                yield from results
+            page_params = next_page_params(response or {}, params) if count else None
+            checkpoint = checkpoint.advance(page_params, count)
+            if on_checkpoint:
+                on_checkpoint(checkpoint)
+            if page_params is not None:
+                self.logger.debug(f'Getting more {path}: {page_params}')
 
     def get_objects(self, **kwargs):
         params = dict((k, v) for k, v in kwargs.items() if k not in ('page'))
@@ -692,103 +1085,110 @@ class ERClient(object):
             raise ValueError("Must specify object URL")
 
         self.logger.debug(f"Getting {params['object']}: ", params)
-        count = 0
-        results = self._get(params['object'], params=params)
-
-        while True:
-            if (not results):
-                break
-
-            if ('results' in results):
-                for result in results['results']:
-                    yield result
-                    count += 1
-                    if (('max_results' in params) and (count >= params['max_results'])):
-                        return
-                next = results.get('next')
-                if (next and ('page' not in params)):
-                    url = next
-                    self.logger.debug('Getting more objects: ' + url)
-                    results = self._get(url)
-                else:
-                    break
-            elif (type(results) == list):
-                for o in results:
-                    yield o
-                break
-            else:
-                yield results
-                break
+        objects = self._get_data(params['object'], params)
+        if 'max_results' in params:
+            objects = itertools.islice(objects, params['max_results'])
+        yield from objects
 
     def get_objects_multithreaded(self, **kwargs):
-        threads = kwargs.get("threads", 5)
-        params = dict((k, v) for k, v in kwargs.items() if k not in ('page'))
-        if (not params.get('object')):
+        """
+        Get every page of an object list concurrently, keeping a bounded number of pages in flight.
+
+        :param object: Path of the list, e.g. "subjects" or "observations".
+        :param threads: Pages fetched at the same time. Default 5.
+        :param max_in_flight: Pages requested or waiting to be consumed. Default is twice the threads.
+        :param retries: Times a failed page is fetched again, with the retry policy's backoff. Default 3.
+        :param ordered: Yield objects in page order instead of as pages arrive.
+        :param progress: Called with (pages_done, total_pages, objects_done) after each page.
+        Other kwargs are sent as query parameters.
+        """
+        params = dict((k, v) for k, v in kwargs.items() if k not in
+                      ('page', 'object', 'threads', 'max_in_flight', 'retries', 'ordered', 'progress'))
+        path = kwargs.get('object')
+        if (not path):
             raise ValueError("Must specify object URL")
 
         if (not params.get('page_size')):
             params['page_size'] = 100
 
-        count = self._get_objects_count(params)
-
-        if (count == 0):
-            self.logger.debug(f"No {params['object']} to load from ER.")
-            return []
-
+        threads = kwargs.get("threads", ConcurrentPager.DEFAULT_THREADS)
         self.logger.debug(
-            f"Loading {count} {params['object']} from ER with page size {params['page_size']} and {threads} threads")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
-            futures = []
-            for page in range(1, math.ceil(count/params['page_size'])+1):
-                temp_params = params.copy()
-                temp_params["page"] = page
-                futures.append(executor.submit(self._get, path=params['object'],
-                                               max_retries=5, params=temp_params))
-
-            for future in concurrent.futures.as_completed(futures):
-                max_retries = kwargs.get("retries", 0)
-                tries = 0
-                while (True):
-                    tries += 1
-                    try:
-                        result = future.result()
-                        for e in result['results']:
-                            yield e
-                        break
-                    except Exception as e:
-                        if (tries > max_retries):
-                            logging.error(
-                                f"Error occurred loading events: {e}")
-                            raise e
-                        else:
-                            logging.warning(
-                                f"Attempt {tries} of {max_retries}: Error occurred loading events: {e}.")
+            f"Loading {path} from ER with page size {params['page_size']} and {threads} threads")
+        pager = ConcurrentPager(
+            # The pager retries failed pages itself, with one budget per page
+            lambda page: self._get(path, params={**params, 'page': page}, max_retries=0),
+            page_size=params['page_size'],
+            threads=threads,
+            max_in_flight=kwargs.get('max_in_flight'),
+            retries=kwargs.get('retries', ConcurrentPager.DEFAULT_RETRIES),
+            retry_policy=self.retry_policy,
+            ordered=kwargs.get('ordered', False),
+            progress=kwargs.get('progress'))
+        yield from pager
 
     def get_events(self, **kwargs):
+        """
+        Yield events, following pages.
+
+        :param resume_from: PaginationCheckpoint (or its dict) of an interrupted scan with the same
+                            params; events are yielded from the page it stopped at.
+        :param on_checkpoint: Called with a PaginationCheckpoint after each page is consumed.
+        Other kwargs (state, page_size, page, event_type, filter, updated_since...) are sent as query params.
+        """
         params = dict((k, v) for k, v in kwargs.items() if k in
                       ('state', 'page_size', 'page', 'event_type', 'filter', 'include_notes',
                        'include_related_events', 'include_files', 'include_details', 'updated_since',
                        'include_updates', 'max_results', 'oldest_update_date', 'event_ids'))
 
         self.logger.debug('Getting events: ', params)
-        events = self._get('activity/events', params=params)
-
-        count = 0
-        while True:
-            if events and events.get('results'):
-                for result in events['results']:
-                    yield result
-                    count += 1
-                    if (('max_results' in params) and (count >= params['max_results'])):
-                        return
-            if events['next'] and ('page' not in params):
-                url = events['next']
-                url = re.sub('.*activity/events?',
-                             'activity/events', events['next'])
-                self.logger.debug('Getting more events: ' + url)
-                events = self._get(url)
-            else:
-                break
+        events = self._get_data('activity/events', params, resume_from=kwargs.get('resume_from'),
+                                on_checkpoint=kwargs.get('on_checkpoint'))
+        if 'max_results' in params:
+            events = itertools.islice(events, params['max_results'])
+        yield from events
+
+    def scan_events(self, start, end, partitions=ScanPlanner.DEFAULT_PARTITIONS, ordered=False,
+                    split_threshold=None, max_concurrency=None, **kwargs):
+        """
+        Like get_events() over [start, end], but the window is split into `partitions` sub-windows
+        (date_range filters) that are paginated concurrently in worker threads.
+
+        :param start: Start of the date_range (datetime or ISO 8601).
+        :param end: End of the date_range (datetime or ISO 8601).
+        :param partitions: Number of sub-windows.
+        :param ordered: Yield sub-windows one after the other in chronological order instead of
+                        events as they arrive. Events within a sub-window keep the server's order.
+        :param split_threshold: Halve sub-windows holding more events than this before scanning.
+        :param max_concurrency: Sub-windows scanned at once. Default is all of them.
+        Other kwargs are passed to get_events(); a filter is combined with each sub-window's date_range.
+        """
+        planner = ScanPlanner(start, end, partitions=partitions, split_threshold=split_threshold)
+        event_filter = kwargs.pop('filter', None)
+        count_params = event_count_params(kwargs)
+        windows = planner.plan(lambda window: self._count_window(
+            'activity/events', {**count_params, 'filter': event_window_filter(event_filter, window)}), max_concurrency)
+        yield from scan_windows(
+            windows, lambda window: self.get_events(filter=event_window_filter(event_filter, window), **kwargs),
+            ordered=ordered, max_concurrency=max_concurrency)
+
+    def scan_observations(self, start, end, partitions=ScanPlanner.DEFAULT_PARTITIONS, ordered=False,
+                          split_threshold=None, max_concurrency=None, **kwargs):
+        """
+        Like get_observations() over [start, end], but the window is split into `partitions`
+        sub-windows that are paginated concurrently in worker threads.
+        See scan_events() for the parameters; other kwargs are passed to get_observations().
+        """
+        planner = ScanPlanner(start, end, partitions=partitions, split_threshold=split_threshold)
+        filters = {k: kwargs[k] for k in ('subject_id', 'source_id') if kwargs.get(k)}
+        windows = planner.plan(lambda window: self._count_window(
+            'observations', observation_window_params(filters, window)), max_concurrency)
+        yield from scan_windows(
+            windows, lambda window: self.get_observations(start=window.start, end=window.end, **kwargs),
+            ordered=ordered, max_concurrency=max_concurrency)
+
+    def _count_window(self, path, params):
+        response = self._get(path, params={**params, 'page': 1, 'page_size': 1})
+        return response.get('count') if isinstance(response, dict) else None
 
     def get_event(self, *, event_id=None, include_details=True, include_updates=False, include_notes=False, include_related_events=False, include_files=False):
         params = {
@@ -805,20 +1205,7 @@ class ERClient(object):
         params = dict((k, v) for k, v in kwargs.items() if k in
                       ('state', 'page_size', 'page', 'event_type', 'filter'))
         self.logger.debug('Getting patrols: ', params)
-        patrols = self._get('activity/patrols', params=params)
-
-        while True:
-            if patrols and patrols.get('results'):
-                for result in patrols['results']:
-                    yield result
-            if patrols['next']:
-                url = patrols['next']
-                url = re.sub('.*activity/patrols?',
-                             'activity/patrols', patrols['next'])
-                self.logger.debug('Getting more patrols: ' + url)
-                patrols = self._get(url)
-            else:
-                break
+        yield from self._get_data('activity/patrols', params)
 
     def __result_to_dict(self, result):
         dict = {}
@@ -956,22 +1343,74 @@ class ERClient(object):
         return self._get(path='trackingmetadata/export', params=p)
 
     def get_subject_observations(self, subject_id, start=None, end=None,
-                                 filter_flag=0, include_details=True, page_size=10000):
+                                 filter_flag=0, include_details=True, page_size=10000, stream=False):
+        if self.observation_cache and start is not None and not stream:
+            return self._get_cached_observations('subject_id', subject_id, start, end,
+                                                 filter_flag, include_details, page_size)
         return self.get_observations(subject_id=subject_id, start=start, end=end,
-                                     filter_flag=filter_flag, include_details=include_details, page_size=page_size)
+                                     filter_flag=filter_flag, include_details=include_details, page_size=page_size,
+                                     stream=stream)
 
     def get_source_observations(self, source_id, start=None, end=None,
-                                filter_flag=0, include_details=True, page_size=10000):
+                                filter_flag=0, include_details=True, page_size=10000, stream=False):
+        if self.observation_cache and start is not None and not stream:
+            return self._get_cached_observations('source_id', source_id, start, end,
+                                                 filter_flag, include_details, page_size)
         return self.get_observations(source_id=source_id, start=start, end=end,
-                                     filter_flag=filter_flag, include_details=include_details, page_size=page_size)
+                                     filter_flag=filter_flag, include_details=include_details, page_size=page_size,
+                                     stream=stream)
+
+    def _get_cached_observations(self, id_param, entity_id, start, end, filter_flag, include_details, page_size):
+        """
+        Observations of [start, end], read from the observation cache for settled buckets and
+        from ER for the live edge.
+        """
+        cache = self.observation_cache
+        start = to_datetime(start)
+        end = to_datetime(end) if end is not None else None
+        settled_until = cache.settled_until()
+        bucket_start = cache.floor(start)
+        while bucket_start < settled_until and (end is None or bucket_start <= end):
+            bucket_end = bucket_start + cache.bucket
+            # Caches with other bucket sizes may share the directory
+            key = cache.key(self.service_root, id_param, entity_id, bucket_start.isoformat(),
+                            int(cache.bucket.total_seconds()), include_details, filter_flag)
+            observations = cache.load(key)
+            if observations is None:
+                observations = list(self.get_observations(
+                    **{id_param: entity_id}, start=bucket_start, end=bucket_end - RESOLUTION,
+                    filter_flag=filter_flag, include_details=include_details, page_size=page_size))
+                cache.store(key, observations)
+            if bucket_start < start or (end is not None and bucket_end > end):
+                # A bucket on an edge of the window holds observations outside it
+                observations = [o for o in observations
+                                if start <= to_datetime(o['recorded_at']) and (end is None or to_datetime(o['recorded_at']) <= end)]
+            yield from observations
+            bucket_start = bucket_end
+        live_start = max(start, settled_until)
+        if end is None or live_start <= end:
+            yield from self.get_observations(**{id_param: entity_id}, start=live_start, end=end,
+                                             filter_flag=filter_flag, include_details=include_details,
+                                             page_size=page_size)
 
     def get_observations(self, subject_id=None, source_id=None, start=None, end=None,
-                         filter_flag=0, include_details=True, page_size=10000):
+                         filter_flag=0, include_details=True, page_size=10000, stream=False,
+                         resume_from=None, on_checkpoint=None, created_after=None):
+        """
+        :param created_after: Only observations created (received by ER) after this datetime or ISO 8601 string.
+        :param stream: Parse each page while it downloads and yield observations as they arrive,
+                       instead of loading the whole page first.
+        :param resume_from: PaginationCheckpoint (or its dict) of an interrupted scan with the same
+                            filters; observations are yielded from the page it stopped at.
+        :param on_checkpoint: Called with a PaginationCheckpoint after each page is consumed.
+        """
         p = {}
         if start is not None and isinstance(start, datetime):
             p['since'] = start.isoformat()
         if end is not None and isinstance(end, datetime):
             p['until'] = end.isoformat()
+        if created_after is not None:
+            p['created_after'] = created_after.isoformat() if isinstance(created_after, datetime) else created_after
         if subject_id:
             p['subject_id'] = subject_id
         elif source_id:
@@ -981,19 +1420,8 @@ class ERClient(object):
         p['include_details'] = include_details
         p['page_size'] = page_size  # current limit
 
-        results = self._get(path='observations', params=p)
-
-        while True:
-            if results and results.get('results'):
-                for r in results['results']:
-                    yield r
-
-            if results and results['next']:
-                url, params = split_link(results['next'])
-                p['page'] = params['page']
-                results = self._get(path='observations', params=p)
-            else:
-                break
+        yield from self._get_data('observations', p, stream=stream, resume_from=resume_from,
+                                  on_checkpoint=on_checkpoint)
 
     def get_subjects(self, subject_group_id=None, **kwargs):
         """
@@ -1052,7 +1480,7 @@ class ERClient(object):
         p['flat'] = flat
         p['group_name'] = group_name
 
-        return self._get('subjectgroups', params=p)
+        return self._get('subjectgroups', params=p, revalidate=True)
 
     def add_subjects_to_subjectgroup(self, group_id, subjects):
         """
@@ -1103,22 +1531,7 @@ class ERClient(object):
 
     def get_sources(self, page_size=100):
         """Return all sources"""
-        params = dict(page_size=page_size)
-        params = dict(page_size=page_size)
-        sources = 'sources'
-        results = self._get(path=sources, params=params)
-
-        while True:
-            if results and results.get('results'):
-                for r in results['results']:
-                    yield r
-
-            if results and results['next']:
-                _, qparam = split_link(results['next'])
-                params['page'] = qparam['page']
-                results = self._get(path=sources, params=params)
-            else:
-                break
+        yield from self._get_data('sources', dict(page_size=page_size))
 
     def get_users(self):
         return self._get('users')
@@ -1133,7 +1546,15 @@ class AsyncERClient(object):
 
     DEFAULT_CONNECT_TIMEOUT_SECONDS = 3.1
     DEFAULT_DATA_TIMEOUT_SECONDS = 20
+    STREAM_CHUNK_SIZE = 64 * 1024
     DEFAULT_CONNECTION_RETRIES = 5
+    DEFAULT_MAX_CONNECTIONS = 100
+    DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+    DEFAULT_KEEPALIVE_EXPIRY_SECONDS = 5
+    DEFAULT_AUTH_REFRESH_MARGIN_SECONDS = 60
+    MAX_AUTH_RENEWAL_BACKOFF_SECONDS = 30
+    SERVICE_DOWN_STATUSES = (httpx.codes.BAD_GATEWAY,
+                             httpx.codes.SERVICE_UNAVAILABLE, httpx.codes.GATEWAY_TIMEOUT)
 
     def __init__(self, **kwargs):
         """
@@ -1156,6 +1577,27 @@ class AsyncERClient(object):
         :param max_http_retries: Number of retries on connection errors. default is 5
         :param connect_timeout [seconds]: Maximum amount of time to wait until a socket connection to the requested host is established. Default is 3.1
         :param data_timeout [seconds]:  Maximum duration to wait for a chunk of data to be sent or received. Default is 20
+        :param pool_timeout [seconds]: Maximum time to wait for a connection from the pool. Default is connect_timeout
+        :param http2: Multiplex concurrent requests over a few HTTP/2 connections. Requires the http2 extra (pip install earthranger-client[http2]). Default is False
+        :param max_connections: Maximum number of open connections. Default is 100
+        :param max_keepalive_connections: Maximum number of idle connections kept open for reuse. Default is 20
+        :param keepalive_expiry [seconds]: Close idle connections after this long. Default is 5
+        :param auth_refresh_margin [seconds]: Renew the token in the background when it is this close to expiring, so requests never wait on the token endpoint. A failed renewal is tried again after a quarter of the margin (at most 30 seconds). Set to 0 to disable. Default is 60
+        :param token_cache: Optional FileTokenCache shared with other processes. It is checked before requesting a token and updated after a successful login or refresh.
+        :param retry_policy: RetryPolicy applied to failed requests (e.g. 429/503 honoring Retry-After). Default is no retries, errors are raised immediately with their retry_after.
+        :param rate_limiter: Optional RateLimiter that paces requests per endpoint family (e.g. observations, sensors/, activity/events).
+        :param json_codec: Codec (or codec name, 'json' or 'orjson') used to encode request bodies and decode responses. Default is the standard library json.
+        :param compress_requests: True to gzip request bodies of 1 KB or more (e.g. bulk observations), or a RequestCompression to choose the encoding, threshold and level. Turned off automatically if the server rejects compressed bodies.
+        :param http_cache: True or an HTTPCache to keep metadata responses (event types, event categories, subject groups...) and revalidate them with If-None-Match/If-Modified-Since instead of downloading them again.
+        :param circuit_breaker: True to share a CircuitBreaker with every client of this service_root, or a CircuitBreaker instance. While open, requests fail fast with ERClientServiceUnreachable.
+        :param coalesce_requests: Let concurrent identical GETs share one request and its result, instead of each sending its own. Default is False
+        :param entity_cache: True or an EntityCache to cache get_source_by_manufacturer_id, get_source_subjects and get_subject_sources results (and their 404s) in memory.
+        :param prefetch_pages: Pages that get_events() and get_observations() fetch ahead in the background while the current page is consumed. Default is 0 (fetch a page only when the previous one is consumed)
+        :param observation_interval [seconds]: Minimum time between observations of the same source sent with schedule_sensor_observation(). Default is 1
+        :param max_concurrent_sources: Maximum observation posts in flight across sources for schedule_sensor_observation(). Default is 50
+        :param batch_observations: True, or a dict of ObservationBatcher settings (max_batch_size, max_batch_bytes, max_latency, max_concurrency), to collect single observations passed to post_sensor_observation() and post them in batches per sensor_type. Default is False
+        :param spool: A directory or an ObservationSpool where post_observation() and post_sensor_observation() keep what they can't post while ER is unreachable. Spooled observations are posted in the background, in order, once ER is back.
+        :param deduplicate_observations: True, a file or an ObservationDeduplicator to drop observations whose (manufacturer_id, recorded_at) was posted already with post_observation() or post_sensor_observation(). A file keeps the index between runs.
 
         """
 
@@ -1164,6 +1606,36 @@ class AsyncERClient(object):
         self._http_session = None
         self.max_retries = kwargs.get(
             'max_http_retries', self.DEFAULT_CONNECTION_RETRIES)
+        self.retry_policy = kwargs.get(
+            'retry_policy') or RetryPolicy(max_retries=0)
+        self.rate_limiter = kwargs.get('rate_limiter')
+        self.circuit_breaker = kwargs.get('circuit_breaker')
+        self.json_codec = get_codec(kwargs.get('json_codec'))
+        self.request_compression = RequestCompression.from_option(
+            kwargs.get('compress_requests'))
+        self.http_cache = HTTPCache.from_option(kwargs.get('http_cache'))
+        self.entity_cache = EntityCache.from_option(kwargs.get('entity_cache'))
+        self._single_flight = SingleFlight() if kwargs.get('coalesce_requests') else None
+        self.prefetch_pages = kwargs.get('prefetch_pages', 0)
+        self.auth_refresh_margin = kwargs.get(
+            'auth_refresh_margin', self.DEFAULT_AUTH_REFRESH_MARGIN_SECONDS)
+        # In-flight token renewal shared by every task waiting for a token
+        self._auth_renewal = None
+        self._auth_renewal_failed_at = None
+        self.observation_interval = kwargs.get(
+            'observation_interval', ObservationScheduler.DEFAULT_INTERVAL_SECONDS)
+        self.max_concurrent_sources = kwargs.get(
+            'max_concurrent_sources', ObservationScheduler.DEFAULT_MAX_CONCURRENCY)
+        self._observation_scheduler = None
+        batch_observations = kwargs.get('batch_observations')
+        self._observation_batcher_settings = (
+            batch_observations if isinstance(batch_observations, dict) else {} if batch_observations else None)
+        self._observation_batcher = None
+        self.spool = ObservationSpool.from_option(kwargs.get('spool'))
+        self._spool_retry_at = 0
+        self._spool_replay = None
+        self.observation_deduplicator = ObservationDeduplicator.from_option(
+            kwargs.get('deduplicate_observations'))
 
         raw_service_root = kwargs.get('service_root') or ""
         # Normalize via urlparse: if path contains /api (e.g. /api or /api/v1.0), keep only scheme+netloc+path before /api.
@@ -1182,6 +1654,7 @@ class AsyncERClient(object):
         self.username = kwargs.get('username')
         self.password = kwargs.get('password')
         self.realtime_url = kwargs.get('realtime_url')
+        self.token_cache = kwargs.get('token_cache')
 
         if kwargs.get('token'):
             self.token = kwargs.get('token')
@@ -1189,21 +1662,38 @@ class AsyncERClient(object):
                              access_token=kwargs.get('token'))
             self.auth_expires = datetime(2099, 1, 1, tzinfo=pytz.utc)
 
+        if self.circuit_breaker is True:
+            self.circuit_breaker = CircuitBreaker.for_service(self.service_root)
+
         # ToDo: rename the agent name to er-client, or should we keep it for backward compatibility?
         self.user_agent = f'das-client/{version_string}'
         self.logger = logging.getLogger(self.__class__.__name__)
 
-        transport = httpx.AsyncHTTPTransport(retries=self.max_retries)
+        limits = httpx.Limits(
+            max_connections=kwargs.get(
+                'max_connections', self.DEFAULT_MAX_CONNECTIONS),
+            max_keepalive_connections=kwargs.get(
+                'max_keepalive_connections', self.DEFAULT_MAX_KEEPALIVE_CONNECTIONS),
+            keepalive_expiry=kwargs.get(
+                'keepalive_expiry', self.DEFAULT_KEEPALIVE_EXPIRY_SECONDS)
+        )
+        transport = httpx.AsyncHTTPTransport(
+            retries=self.max_retries, http2=kwargs.get('http2', False), limits=limits)
         connect_timeout = kwargs.get(
             'connect_timeout', self.DEFAULT_CONNECT_TIMEOUT_SECONDS)
         data_timeout = kwargs.get(
             'data_timeout', self.DEFAULT_DATA_TIMEOUT_SECONDS)
         timeout = httpx.Timeout(
-            data_timeout, connect=connect_timeout, pool=connect_timeout)
+            data_timeout, connect=connect_timeout, pool=kwargs.get('pool_timeout', connect_timeout))
         self._http_session = httpx.AsyncClient(
             transport=transport, timeout=timeout)
 
     async def close(self):
+        await self._close_observation_scheduler()
+        await self._close_observation_batcher()
+        await self._cancel_spool_replay()
+        self._close_observation_stores()
+        await self._cancel_auth_renewal()
         await self._http_session.aclose()
 
     # Support using this client as an async context manager.
@@ -1212,23 +1702,44 @@ class AsyncERClient(object):
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
+        await self._close_observation_scheduler()
+        await self._close_observation_batcher()
+        await self._cancel_spool_replay()
+        self._close_observation_stores()
+        await self._cancel_auth_renewal()
         await self._http_session.__aexit__()
 
-    async def post_sensor_observation(self, observation, sensor_type='generic'):
+    async def post_sensor_observation(self, observation, sensor_type='generic', batch=None):
         """
         Post a new observation, or a list of observations.
+
+        :param batch: Post a single observation with the next batch of its sensor_type (see batch_observations)
+                      and wait for that batch's result. Default is the client's batch_observations setting.
         """
+        if batch is None:
+            batch = self._observation_batcher_settings is not None
+        if batch and not isinstance(observation, (list, set)):
+            return await self.observation_batcher.post(observation, sensor_type=sensor_type)
+
         observations_list = observation if isinstance(
             observation, (list, set)) else [observation]
-        for observation in observations_list:
-            self._clean_observation(observation)
+        for o in observations_list:
+            self._clean_observation(o)
 
+        observation, positions = self._drop_posted(observation)
+        if observation is None:
+            return None
         self.logger.debug('Posting observation: %s', observation)
-        result = await self._post(
-            f'sensors/{sensor_type}/{self.provider_key}/status', payload=observation
-        )
+        if self.spool is not None:
+            result = await self._post_or_spool(SENSORS, observation, sensor_type)
+        else:
+            result = await self._post(
+                f'sensors/{sensor_type}/{self.provider_key}/status', payload=observation
+            )
+            self._invalidate_missing_sources(observation)
         self.logger.debug('Result of post is: %s', result)
-        return result
+        self._mark_posted(observation)
+        return self._posted_results(result, observation, positions)
 
     async def post_observation(self, observation):
         """
@@ -1239,8 +1750,187 @@ class AsyncERClient(object):
         else:
             payload = self._clean_observation(observation)
 
+        payload, positions = self._drop_posted(payload)
+        if payload is None:
+            return None
         self.logger.debug('Posting observation: %s', payload)
-        return await self._post('observations', payload=payload)
+        if self.spool is not None:
+            result = await self._post_or_spool(OBSERVATIONS, payload)
+        else:
+            result = await self._post('observations', payload=payload)
+            self._invalidate_missing_sources(payload)
+        self._mark_posted(payload)
+        return self._posted_results(result, payload, positions)
+
+    def _drop_posted(self, payload):
+        """
+        Leave out the observations already posted (see deduplicate_observations).
+        Returns what is left to post (None if nothing is) and, for a list, the positions that
+        map the results back to it (see ObservationDeduplicator.filter).
+        """
+        if self.observation_deduplicator is None:
+            return payload, None
+        if isinstance(payload, (list, set)):
+            observations, positions = self.observation_deduplicator.filter(payload, positions=True)
+        else:
+            observations = payload if self.observation_deduplicator.filter([payload]) else None
+            positions = None
+        if not observations:
+            self.logger.debug('Dropping already posted observations: %s', payload)
+            return None, None
+        return observations, positions
+
+    def _mark_posted(self, payload):
+        if self.observation_deduplicator is not None:
+            self.observation_deduplicator.mark(payload if isinstance(payload, list) else [payload])
+
+    @staticmethod
+    def _posted_results(result, posted, positions):
+        # One result per observation of the caller's list, None for those posted before
+        if positions is None or not isinstance(result, list) or len(result) != len(posted):
+            return result
+        return [None if i is None else result[i] for i in positions]
+
+    async def _post_spool_kind(self, kind, payload, sensor_type=None):
+        if kind == OBSERVATIONS:
+            result = await self._post('observations', payload=payload)
+        else:
+            result = await self._post(f'sensors/{sensor_type}/{self.provider_key}/status', payload=payload)
+        self._invalidate_missing_sources(payload)
+        return result
+
+    @staticmethod
+    def _is_outage(error):
+        # Network errors are raised as ERClientException from the httpx error
+        return (isinstance(error, ERClientServiceUnreachable)
+                or getattr(error, 'status_code', None) in OUTAGE_STATUS_CODES
+                or isinstance(error.__context__, httpx.RequestError))
+
+    async def _post_or_spool(self, kind, payload, sensor_type=None):
+        """
+        Post payload, or append it to the spool while ER is unreachable or older observations
+        are still spooled, so observations reach ER in order. Returns None when spooled.
+        """
+        if (not self.spool.is_empty and self._spool_replay is None
+                and time.monotonic() >= self._spool_retry_at):
+            self._start_spool_replay()
+        if self.spool.is_empty and self._spool_replay is None:
+            try:
+                return await self._post_spool_kind(kind, payload, sensor_type)
+            except Exception as e:
+                if not self._is_outage(e):
+                    raise
+                self.logger.warning(f'ER is unreachable, spooling {kind}: {e}')
+                self._spool_retry_at = time.monotonic() + self.spool.retry_interval
+        self.spool.append(kind, payload, sensor_type)
+        return None
+
+    def _start_spool_replay(self):
+        self._spool_replay = asyncio.ensure_future(self._replay_spool())
+        self._spool_replay.add_done_callback(self._spool_replay_done)
+        return self._spool_replay
+
+    def _spool_replay_done(self, task):
+        self._spool_replay = None
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error(f'Replaying the observation spool failed: {task.exception()}')
+
+    async def replay_spool(self):
+        """
+        Post the spooled observations in order, in batches, stopping at the first outage.
+        Observations that ER rejects (e.g. 400 Bad Request) are logged and dropped, so they don't hold back the rest.
+
+        :return: Number of observations posted.
+        """
+        replay = self._spool_replay or self._start_spool_replay()
+        return await asyncio.shield(replay)
+
+    async def _replay_spool(self):
+        posted = 0
+        while True:
+            batch = self.spool.next_batch()
+            if batch is None:
+                return posted
+            kind, sensor_type, entries = batch
+            try:
+                await self._post_spool_kind(
+                    kind, [o for _, observations in entries for o in observations], sensor_type)
+            except Exception as e:
+                if self._is_outage(e):
+                    self._spool_retry_at = time.monotonic() + self.spool.retry_interval
+                    return posted
+                # Post the batch's records one by one to drop only the rejected ones
+                for position, observations in entries:
+                    try:
+                        await self._post_spool_kind(kind, observations, sensor_type)
+                    except Exception as e:
+                        if self._is_outage(e):
+                            self._spool_retry_at = time.monotonic() + self.spool.retry_interval
+                            return posted
+                        self.logger.error(f'Dropping spooled {kind} rejected by ER: {e}',
+                                          extra=dict(observations=observations))
+                    else:
+                        posted += len(observations)
+                    self.spool.ack(position)
+                continue
+            posted += sum(len(observations) for _, observations in entries)
+            self.spool.ack(entries[-1][0])
+
+    async def _cancel_spool_replay(self):
+        replay = self._spool_replay
+        if replay is not None:
+            replay.cancel()
+            await asyncio.gather(replay, return_exceptions=True)
+
+    def _close_observation_stores(self):
+        if self.spool is not None:
+            self.spool.close()
+        if self.observation_deduplicator is not None:
+            self.observation_deduplicator.close()
+
+    @property
+    def observation_scheduler(self):
+        if self._observation_scheduler is None:
+            self._observation_scheduler = ObservationScheduler(
+                self, interval=self.observation_interval, max_concurrency=self.max_concurrent_sources)
+        return self._observation_scheduler
+
+    @property
+    def observation_batcher(self):
+        if self._observation_batcher is None:
+            self._observation_batcher = ObservationBatcher(self, **(self._observation_batcher_settings or {}))
+        return self._observation_batcher
+
+    async def flush_observation_batches(self):
+        """Post every pending observation batch now and wait for the posts to finish."""
+        if self._observation_batcher is not None:
+            await self._observation_batcher.flush()
+
+    async def _close_observation_batcher(self):
+        batcher, self._observation_batcher = self._observation_batcher, None
+        if batcher is not None:
+            await batcher.close()
+
+    async def schedule_sensor_observation(self, observation, sensor_type='generic'):
+        """
+        Queue an observation, or a list of observations, to be posted one per source per observation_interval.
+        Observations of different sources are posted concurrently.
+
+        :return: A future (or a list of futures) resolved with the result of each post
+        """
+        if isinstance(observation, (list, set)):
+            return [await self.observation_scheduler.submit(o, sensor_type=sensor_type) for o in observation]
+        return await self.observation_scheduler.submit(observation, sensor_type=sensor_type)
+
+    async def flush_scheduled_observations(self):
+        """Wait until every scheduled observation has been posted."""
+        if self._observation_scheduler is not None:
+            await self._observation_scheduler.join()
+
+    async def _close_observation_scheduler(self):
+        scheduler, self._observation_scheduler = self._observation_scheduler, None
+        if scheduler is not None:
+            await scheduler.close()
 
     async def post_report(self, data):
         payload = self._clean_event(data)
@@ -1322,15 +2012,81 @@ class AsyncERClient(object):
         page_size: Change the page size. Default 100.
         batch_size: The generator returns observations in batches (list) instead of one by one. Default 0 (means no batching)
                     If both page_size and batch_size are specified, the page_size will be modified to match batch_size.
+        prefetch_pages: Pages fetched ahead while the current one is consumed. Default is the client's prefetch_pages.
+        resume_from: PaginationCheckpoint (or its dict) of an interrupted scan with the same params. Events are
+                     yielded from the page it stopped at.
+        on_checkpoint: Called with a PaginationCheckpoint after each page is consumed.
         """
         params = {**kwargs}
+        prefetch_pages = params.pop('prefetch_pages', None)
+        resume_from = params.pop('resume_from', None)
+        on_checkpoint = params.pop('on_checkpoint', None)
         batch_size = kwargs.get('batch_size', 0)
         if batch_size and kwargs.get('page_size'):
             params['page_size'] = batch_size
         if not params.get('page_size'):
             params['page_size'] = 100
-        async for event in self._get_data(endpoint='activity/events', params=params, batch_size=batch_size):
-            yield event
+        events = self._get_data(endpoint='activity/events', params=params, batch_size=batch_size,
+                                prefetch_pages=prefetch_pages, resume_from=resume_from,
+                                on_checkpoint=on_checkpoint)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()  # Stop prefetching right away if the caller stops early
+
+    async def scan_events(self, start, end, partitions=ScanPlanner.DEFAULT_PARTITIONS, ordered=False,
+                          split_threshold=None, max_concurrency=None, **kwargs):
+        """
+        Like get_events() over [start, end], but the window is split into `partitions` sub-windows
+        (date_range filters) that are paginated concurrently.
+
+        start: Start of the date_range (datetime or ISO 8601).
+        end: End of the date_range (datetime or ISO 8601).
+        partitions: Number of sub-windows. Default 8.
+        ordered: Yield sub-windows one after the other in chronological order instead of events as they arrive.
+                 Events within a sub-window keep the server's order. Default False.
+        split_threshold: Halve sub-windows holding more events than this before scanning. Default None (no re-splitting).
+        max_concurrency: Sub-windows scanned at once. Default is all of them.
+        Other kwargs are passed to get_events(); a filter is combined with each sub-window's date_range.
+        """
+        planner = ScanPlanner(start, end, partitions=partitions, split_threshold=split_threshold)
+        event_filter = kwargs.pop('filter', None)
+        count_params = event_count_params(kwargs)
+        windows = await planner.plan_async(lambda window: self._count_window(
+            'activity/events', {**count_params, 'filter': event_window_filter(event_filter, window)}))
+        events = scan_windows_async(
+            windows, lambda window: self.get_events(filter=event_window_filter(event_filter, window), **kwargs),
+            ordered=ordered, max_concurrency=max_concurrency)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+
+    async def scan_observations(self, start, end, partitions=ScanPlanner.DEFAULT_PARTITIONS, ordered=False,
+                                split_threshold=None, max_concurrency=None, **kwargs):
+        """
+        Like get_observations() over [start, end], but the window is split into `partitions`
+        sub-windows that are paginated concurrently.
+        See scan_events() for the parameters; other kwargs are passed to get_observations().
+        """
+        planner = ScanPlanner(start, end, partitions=partitions, split_threshold=split_threshold)
+        filters = {k: kwargs[k] for k in ('subject_id', 'source_id') if kwargs.get(k)}
+        windows = await planner.plan_async(lambda window: self._count_window(
+            'observations', observation_window_params(filters, window)))
+        observations = scan_windows_async(
+            windows, lambda window: self.get_observations(start=window.start, end=window.end, **kwargs),
+            ordered=ordered, max_concurrency=max_concurrency)
+        try:
+            async for observation in observations:
+                yield observation
+        finally:
+            await observations.aclose()
+
+    async def _count_window(self, path, params):
+        response = await self._get(path, params={**params, 'page': 1, 'page_size': 1})
+        return response.get('count') if isinstance(response, dict) else None
 
     async def get_event(self, *, event_id=None, include_details=True, include_updates=False, include_notes=False, include_related_events=False, include_files=False):
         params = {
@@ -1352,9 +2108,14 @@ class AsyncERClient(object):
         start: get observations after this date (ISO8061 or datetime), include timezone
         end: get observations up to this date (ISO8061 or datetime), include timezone
         include_details: brings back the observation additional field. Default True.
-        created_after.
+        created_after: get observations created (received by ER) after this date (ISO8061 or datetime).
         page_size: Change the page size. Default 100.
         batch_size: The generator returns observations in batches (list) instead of one by one. Default 0 (means no batching)
+        stream: Parse each page while it downloads and yield observations as they arrive. Default False.
+        prefetch_pages: Pages fetched ahead while the current one is consumed. Default is the client's prefetch_pages.
+        resume_from: PaginationCheckpoint (or its dict) of an interrupted scan with the same filters. Observations
+                     are yielded from the page it stopped at.
+        on_checkpoint: Called with a PaginationCheckpoint after each page is consumed.
         """
         subject_id = kwargs.get('subject_id')
         source_id = kwargs.get('source_id')
@@ -1371,6 +2132,10 @@ class AsyncERClient(object):
         if end:
             params['until'] = end.isoformat() if isinstance(
                 end, datetime) else end
+        if kwargs.get('created_after'):
+            created_after = kwargs['created_after']
+            params['created_after'] = created_after.isoformat() if isinstance(
+                created_after, datetime) else created_after
         if subject_id:
             params['subject_id'] = subject_id
         elif source_id:
@@ -1381,8 +2146,16 @@ class AsyncERClient(object):
         params['page_size'] = page_size  # current limit
         if batch_size and page_size:
             params['page_size'] = batch_size
-        async for observation in self._get_data(endpoint='observations', params=params, batch_size=batch_size):
-            yield observation
+        observations = self._get_data(endpoint='observations', params=params, batch_size=batch_size,
+                                      stream=kwargs.get('stream', False),
+                                      prefetch_pages=kwargs.get('prefetch_pages'),
+                                      resume_from=kwargs.get('resume_from'),
+                                      on_checkpoint=kwargs.get('on_checkpoint'))
+        try:
+            async for observation in observations:
+                yield observation
+        finally:
+            await observations.aclose()  # Stop prefetching right away if the caller stops early
 
     async def post_camera_trap_report(self, camera_trap_payload, file=None):
         camera_trap_report_path = f'sensors/camera-trap/{self.provider_key}/status/'
@@ -1423,7 +2196,7 @@ class AsyncERClient(object):
         :raises ERClientNotFound: If source not found (404)
         """
         self.logger.debug(f'Getting source: {manufacturer_id}')
-        return await self._get(f'source/{manufacturer_id}/')
+        return await self._get_cached('get_source_by_manufacturer_id', manufacturer_id, f'source/{manufacturer_id}/')
 
     async def get_source_subjects(self, source_id):
         """
@@ -1433,7 +2206,7 @@ class AsyncERClient(object):
         :return: List of subject data
         """
         self.logger.debug(f'Getting subjects for source: {source_id}')
-        return await self._get(f'source/{source_id}/subjects')
+        return await self._get_cached('get_source_subjects', source_id, f'source/{source_id}/subjects')
 
     async def patch_subject(self, subject_id, data):
         """
@@ -1444,7 +2217,10 @@ class AsyncERClient(object):
         :return: Updated subject data
         """
         self.logger.debug(f'Patching subject {subject_id}: {data}')
-        return await self._patch(f'subject/{subject_id}', payload=data)
+        try:
+            return await self._patch(f'subject/{subject_id}', payload=data)
+        finally:
+            self._invalidate_subjects([subject_id])
 
     async def delete_subject(self, subject_id):
         """
@@ -1455,7 +2231,10 @@ class AsyncERClient(object):
         :param subject_id: The subject UUID
         """
         self.logger.debug(f'Deleting subject {subject_id}')
-        return await self._delete(f'subject/{subject_id}/')
+        try:
+            return await self._delete(f'subject/{subject_id}/')
+        finally:
+            self._invalidate_subjects([subject_id])
 
     async def delete_source(self, source_id, async_mode: bool = False):
         """
@@ -1469,7 +2248,10 @@ class AsyncERClient(object):
         """
         self.logger.debug(f'Deleting source {source_id}')
         params = {"async": "true"} if async_mode else None
-        return await self._delete(f'source/{source_id}/', params=params)
+        try:
+            return await self._delete(f'source/{source_id}/', params=params)
+        finally:
+            self._invalidate_source(source_id)
 
     async def add_subjects_to_subjectgroup(self, group_id, subjects):
         """
@@ -1481,7 +2263,11 @@ class AsyncERClient(object):
         """
         self.logger.debug(
             f'Adding subjects to subjectgroup {group_id}: {subjects}')
-        return await self._post(f'subjectgroup/{group_id}/subjects/', payload=subjects)
+        subject_ids = self._subject_ids(subjects)
+        try:
+            return await self._post(f'subjectgroup/{group_id}/subjects/', payload=subjects)
+        finally:
+            self._invalidate_subjects(subject_ids)
 
     async def remove_subjects_from_subjectgroup(self, group_id, subjects):
         """
@@ -1493,11 +2279,66 @@ class AsyncERClient(object):
         """
         self.logger.debug(
             f'Removing subjects from subjectgroup {group_id}: {subjects}')
-        return await self._call(
-            f'subjectgroup/{group_id}/subjects/',
-            payload=subjects,
-            method="DELETE"
-        )
+        subject_ids = self._subject_ids(subjects)
+        try:
+            return await self._call(
+                f'subjectgroup/{group_id}/subjects/',
+                payload=subjects,
+                method="DELETE"
+            )
+        finally:
+            self._invalidate_subjects(subject_ids)
+
+    async def _get_cached(self, method, key, path, params=None):
+        """
+        GET through the entity cache, if enabled. Results and 404s are cached under (method, key).
+        """
+        if self.entity_cache is None:
+            return await self._get(path, params=params)
+        key = str(key)
+        result = self.entity_cache.get(method, key)
+        if result is not EntityCache.MISS:
+            return result
+        try:
+            result = await self._get(path, params=params)
+        except ERClientNotFound:
+            self.entity_cache.set_not_found(method, key)
+            raise
+        self.entity_cache.set(method, key, result)
+        return result
+
+    @staticmethod
+    def _subject_ids(subjects):
+        # Taken up front, so that malformed subjects leave ER to report the error
+        return [subject['id'] for subject in subjects if isinstance(subject, dict) and 'id' in subject]
+
+    def _invalidate_subjects(self, subject_ids):
+        if self.entity_cache is None:
+            return
+        subject_ids = {str(subject_id) for subject_id in subject_ids}
+        for subject_id in subject_ids:
+            self.entity_cache.invalidate('get_subject_sources', subject_id)
+        self.entity_cache.invalidate(
+            'get_source_subjects', where=lambda subjects: references(subjects, subject_ids))
+
+    def _invalidate_source(self, source_id):
+        if self.entity_cache is None:
+            return
+        source_ids = {str(source_id)}
+        self.entity_cache.invalidate('get_source_subjects', str(source_id))
+        self.entity_cache.invalidate(
+            'get_source_by_manufacturer_id', where=lambda source: references(source, source_ids))
+        self.entity_cache.invalidate(
+            'get_subject_sources', where=lambda sources: references(sources, source_ids))
+
+    def _invalidate_missing_sources(self, payload):
+        # ER creates the sources of posted observations, so remembered 404s for them are stale
+        if self.entity_cache is None:
+            return
+        observations = payload if isinstance(payload, (list, set)) else [payload]
+        manufacturer_ids = {str(o.get('manufacturer_id') or o.get('source')) for o in observations
+                            if isinstance(o, dict) and (o.get('manufacturer_id') or o.get('source'))}
+        self.entity_cache.invalidate_not_found('get_source_by_manufacturer_id', manufacturer_ids)
 
     def _clean_observation(self, observation):
         if hasattr(observation['recorded_at'], 'isoformat'):
@@ -1510,19 +2351,119 @@ class AsyncERClient(object):
     def _auth_is_valid(self):
         return self.auth_expires > datetime.now(tz=timezone.utc)
 
+    def _auth_expires_soon(self):
+        if not self.auth_refresh_margin or not self.auth or not self.auth.get('refresh_token'):
+            return False
+        margin = timedelta(seconds=self.auth_refresh_margin)
+        return self.auth_expires - margin <= datetime.now(tz=timezone.utc)
+
     async def auth_headers(self):
-        if self.auth:
-            if not self._auth_is_valid():
-                if not await self.refresh_token():
-                    await self.login()
-        else:
-            await self.login()
+        if not self.auth or not self._auth_is_valid():
+            await self._renew_auth()
+        elif self._auth_expires_soon() and not self._auth_renewal_backing_off():
+            # The current token is still good: use it and renew in the background
+            self._start_auth_renewal(background=True)
 
+        auth = self.auth
         return {
-            'Authorization': f'{self.auth["token_type"]} {self.auth["access_token"]}',
+            'Authorization': f'{auth["token_type"]} {auth["access_token"]}',
             'Accept-Type': 'application/json'
         }
 
+    def _auth_renewal_backing_off(self):
+        # After a failed background renewal, wait a bit before the next one instead of trying on every request
+        if self._auth_renewal_failed_at is None:
+            return False
+        backoff = min(self.auth_refresh_margin / 4, self.MAX_AUTH_RENEWAL_BACKOFF_SECONDS)
+        return time.monotonic() - self._auth_renewal_failed_at < backoff
+
+    def _start_auth_renewal(self, background=False):
+        # Single-flight: concurrent callers share one token request
+        if self._auth_renewal is None or self._auth_renewal.done():
+            renewal = self._renew_auth_in_background() if background else self._request_new_auth()
+            self._auth_renewal = asyncio.ensure_future(renewal)
+        return self._auth_renewal
+
+    async def _renew_auth(self):
+        # Shield the shared renewal so a cancelled caller doesn't cancel it for everyone else
+        await asyncio.shield(self._start_auth_renewal())
+        if not self.auth or not self._auth_is_valid():
+            # We joined a background renewal that failed quietly; renew in the foreground
+            await asyncio.shield(self._start_auth_renewal())
+
+    async def _request_new_auth(self):
+        if self.token_cache is None:
+            return await self._login_or_refresh()
+
+        # Hold the cache lock across the token request so only one process (or client) renews at a time.
+        # The lock is taken in an executor thread and released from another, so it is owned by this renewal.
+        owner = object()
+        await self._acquire_token_cache(owner)
+        try:
+            if await self._load_cached_auth(owner):
+                return
+            await self._login_or_refresh()
+            await self._run_in_executor(
+                self.token_cache.store, self._token_cache_key(), self.auth, self.auth_expires, owner)
+        finally:
+            self.token_cache.release(owner)
+
+    async def _login_or_refresh(self):
+        if self.auth:
+            if not await self.refresh_token():
+                await self.login()
+        else:
+            await self.login()
+
+    async def _acquire_token_cache(self, owner):
+        acquiring = asyncio.ensure_future(self._run_in_executor(self.token_cache.acquire, owner))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The executor thread still gets the lock: give it back as soon as it does
+            acquiring.add_done_callback(
+                lambda f: f.cancelled() or f.exception() is not None or self.token_cache.release(owner))
+            raise
+
+    def _token_cache_key(self):
+        return FileTokenCache.make_key(self.service_root, self.client_id, self.username)
+
+    async def _load_cached_auth(self, owner=None):
+        cached = await self._run_in_executor(self.token_cache.load, self._token_cache_key(), owner)
+        # Only adopt a token newer than ours (e.g. one another process just renewed)
+        if cached and cached[1] > self.auth_expires:
+            self.auth_expires = cached[1]
+            self.auth = cached[0]
+            return True
+        return False
+
+    async def _run_in_executor(self, func, *args):
+        # Keep blocking file I/O (and lock waits) off the event loop
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    async def _renew_auth_in_background(self):
+        auth, auth_expires = self.auth, self.auth_expires
+        try:
+            await self._request_new_auth()
+        except Exception as e:
+            self.logger.warning(f'Background token refresh failed: {e}')
+            self._auth_renewal_failed_at = time.monotonic()
+            if self.auth is None:
+                # Keep using the previous token until it actually expires
+                self.auth, self.auth_expires = auth, auth_expires
+        else:
+            self._auth_renewal_failed_at = None
+
+    async def _cancel_auth_renewal(self):
+        renewal, self._auth_renewal = self._auth_renewal, None
+        if renewal is not None and not renewal.done():
+            renewal.cancel()
+            try:
+                await renewal
+            except (asyncio.CancelledError, Exception):
+                pass
+
     async def refresh_token(self):
         return await self._token_request(
             payload={
@@ -1545,6 +2486,12 @@ class AsyncERClient(object):
     async def get_me(self):
         return await self._get('user/me')
 
+    async def pulse(self):
+        """
+        Convenience method for getting status of the ER api.
+        """
+        return await self._get('status')
+
     async def _token_request(self, payload):
         response = await self._http_session.post(self.token_url, data=payload)
 
@@ -1553,7 +2500,7 @@ class AsyncERClient(object):
             self.auth_expires = pytz.utc.localize(datetime.min)
             response.raise_for_status()
 
-        self.auth = response.json()
+        self.auth = self.json_codec.loads(response.content)
         expires_in = int(self.auth['expires_in']) - 5 * 60
         self.auth_expires = datetime.now(
             tz=timezone.utc) + timedelta(seconds=expires_in)
@@ -1582,14 +2529,21 @@ class AsyncERClient(object):
                 **auth_headers
             }
             request_url = self._er_url(path, base_url)
-            try:
-                response = await self._http_session.post(
+
+            def send():
+                # Files are consumed by each attempt; rewind them before a retry
+                for f in (files or {}).values():
+                    if hasattr(f, 'seek'):
+                        f.seek(0)
+                return self._http_session.post(
                     request_url,
                     data=body,  # # payload is automatically encoded as form data
                     headers=headers,
                     files=files
                 )
-                response.raise_for_status()
+
+            try:
+                response = await self._send_with_retries("POST", path, send)
             except httpx.RequestError as e:
                 # Network errors, timeouts
                 # ToDo: Check if we want a more granular error handling defining more specific exception classes
@@ -1604,7 +2558,7 @@ class AsyncERClient(object):
                 self._handle_http_status_error(
                     path, "POST", e, request_url=request_url)
             else:  # Parse the response
-                json_response = response.json()
+                json_response = self.json_codec.loads(response.content)
                 return json_response.get('data', json_response)
 
     async def get_event_types(self, include_inactive=False, include_schema=False, version=DEFAULT_VERSION):
@@ -1619,14 +2573,16 @@ class AsyncERClient(object):
             path,
             base_url=base_url,
             params={"include_inactive": include_inactive,
-                    "include_schema": include_schema}
+                    "include_schema": include_schema},
+            revalidate=True
         )
 
     async def get_event_categories(self, include_inactive=False):
         """Get event categories."""
         return await self._get(
             'activity/events/categories',
-            params={"include_inactive": include_inactive}
+            params={"include_inactive": include_inactive},
+            revalidate=True
         )
 
     async def post_event_category(self, data):
@@ -1658,7 +2614,7 @@ class AsyncERClient(object):
         base_url = self._api_root(version)
         params = {
             "include_schema": include_schema} if version == VERSION_2_0 else None
-        return await self._get(path, base_url=base_url, params=params)
+        return await self._get(path, base_url=base_url, params=params, revalidate=True)
 
     async def post_event_type(self, event_type, version=DEFAULT_VERSION):
         """Post a new event type."""
@@ -1709,7 +2665,7 @@ class AsyncERClient(object):
         p['flat'] = flat
         p['group_name'] = group_name
 
-        return await self._get('subjectgroups', params=p)
+        return await self._get('subjectgroups', params=p, revalidate=True)
 
     async def get_subject_sources(self, subject_id):
         """
@@ -1721,7 +2677,7 @@ class AsyncERClient(object):
         Returns:
             list: list of sources for the subject
         """
-        return await self._get(f'subject/{subject_id}/sources', params={})
+        return await self._get_cached('get_subject_sources', subject_id, f'subject/{subject_id}/sources', params={})
 
     async def get_source_assignments(self, subject_ids: List[str] = None, source_ids: List[str] = None):
         """
@@ -1746,40 +2702,171 @@ class AsyncERClient(object):
         Returns:
             dict: feature group data
         """
-        return await self._get(f"spatialfeaturegroup/{feature_group_id}", params={})
+        return await self._get(f"spatialfeaturegroup/{feature_group_id}", params={}, revalidate=True)
 
-    async def _get_data(self, endpoint, params, batch_size=0):
+    async def _get_data(self, endpoint, params, batch_size=0, stream=False, prefetch_pages=None,
+                        resume_from=None, on_checkpoint=None):
         if "page" not in params:  # Use cursor paginator unless the user has specified a page
             params["use_cursor"] = "true"
         if batch_size > params.get("page_size", 0):
             params["page_size"] = batch_size
-        response = await self._get(endpoint, params=params)
-        while results := response.get('results'):
-            if batch_size > 0:
-                for batch in self._get_batches(results, batch_size):
-                    yield batch
-            else:
-                for obj in results:
+        checkpoint = start_checkpoint(endpoint, params, resume_from)
+        page_params = params if resume_from is None else checkpoint.next_params
+        if page_params is None:
+            return  # The scan being resumed was finished
+
+        def page_done(next_params, count):
+            nonlocal checkpoint
+            checkpoint = checkpoint.advance(next_params, count)
+            if on_checkpoint:
+                on_checkpoint(checkpoint)
+
+        if stream:
+            objs = self._get_data_streamed(endpoint, params, batch_size, page_params, page_done)
+            try:
+                async for obj in objs:
                     yield obj
+            finally:
+                await objs.aclose()
+            return
+        if prefetch_pages is None:
+            prefetch_pages = self.prefetch_pages
+        if prefetch_pages > 0:
+            pages = self._prefetch_pages(endpoint, params, prefetch_pages, page_params)
+        else:
+            pages = self._get_pages(endpoint, params, page_params)
+        try:
+            async for results, next_params in pages:
+                if batch_size > 0:
+                    for batch in self._get_batches(results, batch_size):
+                        yield batch
+                else:
+                    for obj in results:
+                        yield obj
+                page_done(next_params, len(results))
+        finally:
+            await pages.aclose()
 
-            # Deal with pagination
-            if response.get('next') and 'page' not in params:
-                url, query_params = split_link(response['next'])
-                # Try to discover the pagination method
-                if "page" in query_params:
-                    new_params = {**params, 'page': query_params['page']}
-                elif "cursor" in query_params:
-                    new_params = {**params, 'cursor': query_params['cursor']}
-                elif "offset" in query_params:
-                    new_params = {**params, 'offset': query_params['offset']}
-                else:  # Unknown pagination method
-                    break
-                response = await self._get(endpoint, params=new_params)
+    async def _get_pages(self, endpoint, params, page_params=None):
+        """
+        Yield (results, next page params) for each page, starting at page_params (default params).
+        The last page has no next params.
+        """
+        page_params = params if page_params is None else page_params
+        while page_params is not None:
+            response = await self._get(endpoint, params=page_params)
+            results = response.get('results') or []
+            page_params = self._next_page_params(response, params) if results else None
+            yield results, page_params
+
+    async def _prefetch_pages(self, endpoint, params, depth, page_params=None):
+        """
+        Like _get_pages(), but a background task keeps fetching the next pages while the caller
+        consumes the current one. At most `depth` fetched pages wait to be consumed.
+        """
+        queue = asyncio.Queue(maxsize=depth)
+        done = object()
+
+        async def fetch_pages():
+            try:
+                async for page in self._get_pages(endpoint, params, page_params):
+                    await queue.put(page)
+            except Exception as e:
+                await queue.put(e)
             else:
-                break
+                await queue.put(done)
+
+        fetcher = asyncio.ensure_future(fetch_pages())
+        try:
+            while True:
+                page = await queue.get()
+                if page is done:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            # The caller may stop early: don't keep fetching pages nobody will read
+            fetcher.cancel()
+            await asyncio.gather(fetcher, return_exceptions=True)
+
+    async def _get_data_streamed(self, endpoint, params, batch_size=0, page_params=None, page_done=None):
+        page_params = params if page_params is None else page_params
+        while page_params is not None:
+            parser = ResultsStreamParser()
+            batch = []
+            count = 0
+            objs = self._get_stream(endpoint, parser, params=page_params)
+            try:
+                async for obj in objs:
+                    count += 1
+                    if batch_size > 0:
+                        batch.append(obj)
+                        if len(batch) == batch_size:
+                            yield batch
+                            batch = []
+                    else:
+                        yield obj
+            finally:
+                await objs.aclose()  # Release the connection if the caller stops early
+            if batch:
+                yield batch
+            page_params = self._next_page_params(parser.page, params) if count else None
+            if page_done:
+                page_done(page_params, count)
+
+    def _next_page_params(self, response, params):
+        return next_page_params(response, params)
+
+    async def _get_stream(self, path, parser, params=None, base_url=None):
+        """
+        Yield the items of a paginated response's results while the response downloads.
+        The rest of the response is left in parser.envelope.
+        """
+        try:
+            auth_headers = await self.auth_headers()
+        except httpx.HTTPStatusError as e:
+            self._handle_http_status_error(path, "GET", e)
+        headers = {'User-Agent': self.user_agent, **auth_headers}
+        request_url = self._er_url(path, base_url)
+
+        async def send():
+            request = self._http_session.build_request(
+                "GET", request_url, params=params or {}, headers=headers)
+            response = await self._http_session.send(request, stream=True)
+            if response.is_error:
+                await response.aread()  # Error handling needs the body
+            return response
 
-    async def _get(self, path, base_url=None, params=None):
-        return await self._call(path=path, payload=None, method="GET", params=params, base_url=base_url)
+        try:
+            response = await self._send_with_retries("GET", path, send)
+        except httpx.RequestError as e:
+            reason = str(e)
+            self.logger.error('Request to ER failed', extra=dict(provider_key=self.provider_key,
+                                                                 url=request_url,
+                                                                 status_code=None,
+                                                                 reason=reason,
+                                                                 text=""))
+            raise ERClientException(f'Request to ER failed: {reason}')
+        except httpx.HTTPStatusError as e:
+            self._handle_http_status_error(
+                path, "GET", e, request_url=request_url)
+        try:
+            async for chunk in response.aiter_bytes():
+                for obj in parser.feed(chunk):
+                    yield obj
+            for obj in parser.close():
+                yield obj
+        finally:
+            await response.aclose()
+
+    async def _get(self, path, base_url=None, params=None, revalidate=False):
+        if self._single_flight is None:
+            return await self._call(path=path, payload=None, method="GET", params=params, base_url=base_url,
+                                    revalidate=revalidate)
+        key = SingleFlight.key("GET", self._er_url(path, base_url), params)
+        return await self._single_flight.do(key, lambda: self._call(
+            path=path, payload=None, method="GET", params=params, base_url=base_url, revalidate=revalidate))
 
     async def get_file(self, url):
         """
@@ -1826,7 +2913,7 @@ class AsyncERClient(object):
             path=path, payload=None, method="DELETE", params=params, base_url=base_url
         )
 
-    async def _call(self, path, payload, method, params=None, base_url=None):
+    async def _call(self, path, payload, method, params=None, base_url=None, revalidate=False):
         try:
             auth_headers = await self.auth_headers()
         except httpx.HTTPStatusError as e:
@@ -1839,18 +2926,42 @@ class AsyncERClient(object):
                 **auth_headers
             }
             request_url = self._er_url(path, base_url)
-            try:
-                response = await self._http_session.request(
+            body = self.json_codec.dumps(payload) if method in [
+                "POST", "PUT", "PATCH"] or (
+                method == "DELETE" and payload is not None) else None
+            compressed = self.request_compression.compress(
+                body) if self.request_compression else None
+
+            cache_key = cached = None
+            if revalidate and self.http_cache is not None:
+                cache_key = self.http_cache.key(request_url, params)
+                cached = self.http_cache.get(cache_key)
+                if cached is not None:
+                    headers.update(cached.validators())
+
+            def send(content, request_headers):
+                return self._send_with_retries(method, path, lambda: self._http_session.request(
                     method,
                     request_url,
-                    # payload is automatically encoded as json data
-                    json=payload if method in [
-                        "POST", "PUT", "PATCH"] or (
-                        method == "DELETE" and payload is not None) else None,
+                    content=content,
                     params=params,
-                    headers=headers
-                )
-                response.raise_for_status()
+                    headers=request_headers
+                ))
+
+            try:
+                if compressed is not None:
+                    try:
+                        response = await send(compressed, self.request_compression.headers(headers))
+                    except httpx.HTTPStatusError as e:
+                        if not self.request_compression.is_rejection(e.response.status_code, e.response.text):
+                            raise
+                        response = await send(body, headers)
+                        # The body was fine, so the server can't decode compressed requests
+                        self.logger.warning(
+                            'ER rejected a compressed request body, sending uncompressed bodies from now on')
+                        self.request_compression.disable()
+                else:
+                    response = await send(body, headers)
             except httpx.RequestError as e:
                 # Network errors, timeouts
                 # ToDo: Check if we want a more granular error handling defining more specific exception classes
@@ -1862,16 +2973,92 @@ class AsyncERClient(object):
                                                                      text=""))
                 raise ERClientException(f'Request to ER failed: {reason}')
             except httpx.HTTPStatusError as e:
-                self._handle_http_status_error(
-                    path, method, e, request_url=request_url)
+                if cached is None or e.response.status_code != httpx.codes.NOT_MODIFIED:
+                    self._handle_http_status_error(
+                        path, method, e, request_url=request_url)
+                self.http_cache.record(not_modified=True)
+                content = cached.content
             else:  # Parse the response (204 No Content has no body)
                 if response.status_code == httpx.codes.NO_CONTENT:
                     return True  # DELETE/empty success
 
-                json_response = response.json()
-                if isinstance(json_response, dict):
-                    return json_response.get('data', json_response)
-                return json_response
+                content = response.content
+                if cache_key is not None:
+                    self.http_cache.record(not_modified=False)
+                    self.http_cache.store(cache_key, response.headers, content)
+
+            json_response = self.json_codec.loads(content)
+            if isinstance(json_response, dict):
+                return json_response.get('data', json_response)
+            return json_response
+
+    async def _send_with_retries(self, method, path, send):
+        """
+        Await send() until it succeeds or the retry policy gives up, sleeping between attempts.
+        Raises the last httpx.RequestError or httpx.HTTPStatusError.
+        """
+        attempts = 0
+        while True:
+            attempts += 1
+            if self.circuit_breaker is not None:
+                await self._check_circuit()
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(path)
+            try:
+                try:
+                    response = await send()
+                finally:
+                    if method != "GET" and self._single_flight is not None:
+                        # GETs in flight may not see this write, don't let new GETs join them
+                        self._single_flight.forget()
+                self._record_service_health(response=response)
+                response.raise_for_status()
+                return response
+            except httpx.RequestError as e:
+                self._record_service_health(error=e)
+                # The transport already retries failed connects, so this request was (possibly) sent
+                delay = self.retry_policy.retry_delay(method, attempts)
+                if delay is None:
+                    raise
+                self.logger.warning(
+                    f'{method} attempt {attempts} failed: {e}. Retrying in {delay:.2f}s')
+            except httpx.HTTPStatusError as e:
+                retry_after = parse_retry_after_header(
+                    e.response.headers.get("Retry-After"))
+                delay = self.retry_policy.retry_delay(
+                    method, attempts, status_code=e.response.status_code, retry_after=retry_after)
+                if delay is None:
+                    raise
+                self.logger.warning(
+                    f'{method} attempt {attempts} failed with {e.response.status_code}. Retrying in {delay:.2f}s')
+            await asyncio.sleep(delay)
+
+    async def _check_circuit(self):
+        if self.circuit_breaker.acquire() != CircuitBreaker.HALF_OPEN:
+            return
+        # We are the one caller allowed through: check the service is back before sending real traffic
+        healthy = False
+        try:
+            response = await self._http_session.get(
+                self._er_url('status'), headers={'User-Agent': self.user_agent})
+            healthy = response.status_code not in self.SERVICE_DOWN_STATUSES
+        except httpx.RequestError:
+            pass
+        finally:
+            if healthy:
+                self.circuit_breaker.record_success()
+            else:
+                self.circuit_breaker.record_failure()
+        if not healthy:
+            raise ERClientServiceUnreachable('ER service unavailable, status probe failed')
+
+    def _record_service_health(self, response=None, error=None):
+        if self.circuit_breaker is None:
+            return
+        if error is not None or response.status_code in self.SERVICE_DOWN_STATUSES:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
 
     def _get_batches(self, data, batch_size):
         for i in range(0, len(data), batch_size):
@@ -0,0 +1,52 @@
+"""
+Single-flight coalescing of identical concurrent requests.
+"""
+import asyncio
+import copy
+
+
+class SingleFlight(object):
+    """
+    Runs one call per key at a time: callers that ask for a key while its call is in flight
+    await the same call instead of starting their own, and get a copy of its result (or its error).
+
+    The call runs in its own task, so cancelling the caller that started it doesn't cancel it
+    for the others.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    @staticmethod
+    def key(method, url, params=None):
+        return method, url, tuple(sorted((k, str(v)) for k, v in (params or {}).items()))
+
+    async def do(self, key, fn):
+        """
+        Return the result of fn() for this key, sharing a call already in flight.
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # Each caller gets its own copy, so one can't change another's result
+            return copy.deepcopy(await asyncio.shield(task))
+
+        task = asyncio.ensure_future(fn())
+        # Retrieve the error if everybody waiting was cancelled, so asyncio doesn't log it
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        # Keep the call joinable until it is done, even if the caller that started it is cancelled
+        task.add_done_callback(lambda t: self._calls.get(key) is t and self._calls.pop(key))
+        self._calls[key] = task
+        return await asyncio.shield(task)
+
+    def forget(self):
+        """
+        Let the next callers start new calls instead of joining the ones in flight,
+        e.g. after a write that those calls may not reflect.
+        """
+        self._calls.clear()
+
+    @property
+    def in_flight(self):
+        return len(self._calls)
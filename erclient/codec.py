@@ -0,0 +1,83 @@
+"""
+JSON codecs used by the clients to encode request bodies and decode responses.
+
+Codecs work on bytes: responses are parsed straight from the body without decoding
+them to text first, and payloads are serialized straight to the bytes that are sent.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+
+class JSONCodec(object):
+    """
+    Codec backed by the standard library json module.
+
+    Serializes datetime, date and time as ISO 8601 strings, UUID as strings and Decimal as numbers.
+    """
+
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj, default=self.default, ensure_ascii=False,
+                          separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+    @staticmethod
+    def default(obj):
+        if isinstance(obj, (datetime, date, time)):
+            return obj.isoformat()
+        if isinstance(obj, UUID):
+            return str(obj)
+        if isinstance(obj, Decimal):
+            return float(obj)
+        raise TypeError(
+            f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Codec backed by orjson, several times faster than the standard library on large pages.
+    Requires the orjson extra (pip install earthranger-client[orjson]).
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError:
+            raise ImportError(
+                "OrjsonCodec requires the 'orjson' package. Install it with pip install earthranger-client[orjson]")
+        self._orjson = orjson
+
+    def dumps(self, obj):
+        # orjson handles datetime and UUID natively; Decimal goes through default()
+        return self._orjson.dumps(obj, default=self.default, option=self._orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+CODECS = {
+    JSONCodec.name: JSONCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+
+def get_codec(codec=None):
+    """
+    Return a codec instance from a codec, a codec name ('json', 'orjson') or None (standard library).
+    """
+    if codec is None:
+        return JSONCodec()
+    if isinstance(codec, str):
+        try:
+            return CODECS[codec]()
+        except KeyError:
+            raise ValueError(
+                f'Unknown JSON codec {codec!r}; supported: {list(CODECS)}')
+    return codec
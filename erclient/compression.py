@@ -0,0 +1,70 @@
+"""
+Compression of large request bodies, such as bulk observation uploads.
+"""
+import gzip
+import zlib
+
+
+class RequestCompression(object):
+    """
+    Compresses JSON request bodies of at least `threshold` bytes and labels them with
+    Content-Encoding.
+
+    A server that can't decode the body answers 415, or 400 with an error about the encoding.
+    The client then re-sends the request uncompressed, and if that one is accepted, turns
+    compression off for good. Other 400s are about the request itself and are raised as usual.
+    """
+
+    ENCODINGS = ('gzip', 'deflate')
+    DEFAULT_THRESHOLD_BYTES = 1024
+    DEFAULT_LEVEL = 6
+    # Bits of 400 errors from servers that didn't decompress the body, e.g.
+    # "JSON parse error - 'utf-8' codec can't decode byte 0x8b in position 1"
+    REJECTION_MARKERS = ('encoding', 'compress', 'gzip', 'deflate', "can't decode", 'codec')
+
+    def __init__(self, encoding='gzip', threshold=DEFAULT_THRESHOLD_BYTES, level=DEFAULT_LEVEL):
+        """
+        :param encoding: 'gzip' or 'deflate'.
+        :param threshold [bytes]: Smaller bodies are sent as they are.
+        :param level: Compression level, 1 (fastest) to 9 (smallest).
+        """
+        if encoding not in self.ENCODINGS:
+            raise ValueError(f'Unsupported encoding {encoding!r}; supported: {list(self.ENCODINGS)}')
+        self.encoding = encoding
+        self.threshold = threshold
+        self.level = level
+        self.enabled = True
+
+    @classmethod
+    def from_option(cls, option):
+        """
+        Accept the clients' compress_requests option: True, False/None or a RequestCompression.
+        """
+        if option is True:
+            return cls()
+        return option or None
+
+    def compress(self, body):
+        """
+        Return the compressed body, or None if it should be sent as it is.
+        """
+        if not self.enabled or body is None or len(body) < self.threshold:
+            return None
+        if self.encoding == 'gzip':
+            return gzip.compress(body, compresslevel=self.level, mtime=0)
+        return zlib.compress(body, self.level)
+
+    def headers(self, headers):
+        return {**headers, 'Content-Encoding': self.encoding}
+
+    def is_rejection(self, status_code, text=''):
+        """
+        Whether a response with this status and body means the server can't decode compressed bodies.
+        """
+        if status_code == 415:
+            return True
+        text = (text or '').lower()
+        return status_code == 400 and any(marker in text for marker in self.REJECTION_MARKERS)
+
+    def disable(self):
+        self.enabled = False
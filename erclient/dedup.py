@@ -0,0 +1,174 @@
+"""
+Client-side de-duplication of observations before they are posted. Collars re-send messages and
+replays after an outage post observations again; ER rejects those, at the cost of a round trip each.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta, timezone
+
+from .checkpoint import write_json_atomic
+from .observation_cache import EPOCH
+from .scan import to_datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ObservationDeduplicator(object):
+    """
+    Remembers the (manufacturer_id, recorded_at) of posted observations in hash sets, one per
+    `bucket` of recorded_at, and drops observations that were already posted.
+
+    The index is bounded: buckets more than `window` before the latest recorded_at are forgotten,
+    and so are the oldest buckets once it holds more than max_keys keys. Observations recorded
+    before the oldest bucket kept are let through. Keys are exact (no false positives), so a new
+    observation is never dropped.
+
+    With a path, the index is loaded from that JSON file and saved to it at most every
+    save_interval seconds, and on save() or close(). Safe to share between threads.
+    """
+
+    DEFAULT_WINDOW = timedelta(days=2)
+    DEFAULT_BUCKET = timedelta(hours=1)
+    DEFAULT_MAX_KEYS = 1000000
+    DEFAULT_SAVE_INTERVAL_SECONDS = 10.0
+
+    def __init__(self, path=None, window=DEFAULT_WINDOW, bucket=DEFAULT_BUCKET, max_keys=DEFAULT_MAX_KEYS,
+                 save_interval=DEFAULT_SAVE_INTERVAL_SECONDS):
+        """
+        :param path: JSON file to persist the index to (created if missing). Default is in memory only.
+        :param window [timedelta]: How far back from the latest recorded_at duplicates are detected.
+        :param bucket [timedelta]: Span of recorded_at per hash set; the index forgets one bucket at a time.
+        :param max_keys: Maximum number of keys kept.
+        :param save_interval [seconds]: Minimum time between two saves of the index after marking observations.
+        """
+        self.path = path
+        self.window = window
+        self.bucket = bucket
+        self.max_keys = max_keys
+        self.save_interval = save_interval
+        self.duplicates = 0
+        self.unique = 0
+        self._lock = threading.Lock()
+        self._buckets = {}  # bucket number -> set of keys
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if path:
+            self._load()
+
+    @classmethod
+    def from_option(cls, option):
+        """
+        Accept the clients' deduplicate_observations option: True, False/None, a file or an ObservationDeduplicator.
+        """
+        if option is True:
+            return cls()
+        if not option:
+            return None
+        if isinstance(option, str):
+            return cls(option)
+        return option
+
+    def _entry(self, observation):
+        # (bucket, key) of an observation, or None if it can't be told apart from others
+        source = observation.get('manufacturer_id') or observation.get('source')
+        try:
+            recorded_at = to_datetime(observation.get('recorded_at'))
+        except (AttributeError, TypeError, ValueError):
+            return None
+        if not source:
+            return None
+        # The same time written differently is the same observation
+        key = f'{source}\n{recorded_at.astimezone(timezone.utc).isoformat()}'
+        return (recorded_at - EPOCH) // self.bucket, hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+    def filter(self, observations, positions=False):
+        """
+        The observations that weren't posted yet, without repeats, in order.
+        Call mark() with them once they are posted.
+
+        :param positions: Also return, for each of observations, the index in the result of the
+                          observation posted in its place, or None if it was posted already.
+        """
+        result, first, places = [], {}, []
+        with self._lock:
+            for observation in observations:
+                entry = self._entry(observation)
+                if entry is not None:
+                    bucket, key = entry
+                    if entry in first or key in self._buckets.get(bucket, ()):
+                        self.duplicates += 1
+                        places.append(first.get(entry))
+                        continue
+                    first[entry] = len(result)
+                self.unique += 1
+                places.append(len(result))
+                result.append(observation)
+        return (result, places) if positions else result
+
+    def is_duplicate(self, observation):
+        """
+        Whether observation was posted already. Not counted.
+        """
+        entry = self._entry(observation)
+        with self._lock:
+            return entry is not None and entry[1] in self._buckets.get(entry[0], ())
+
+    def mark(self, observations):
+        """
+        Remember observations as posted.
+        """
+        with self._lock:
+            for observation in observations:
+                entry = self._entry(observation)
+                if entry is not None:
+                    bucket, key = entry
+                    self._buckets.setdefault(bucket, set()).add(key)
+                    self._dirty = True
+            self._evict()
+            save = self.path and self._dirty and time.monotonic() - self._last_save >= self.save_interval
+        if save:
+            self.save()
+
+    def _evict(self):
+        buckets = sorted(self._buckets)
+        if not buckets:
+            return
+        oldest = buckets[-1] - self.window // self.bucket
+        size = sum(len(keys) for keys in self._buckets.values())
+        for bucket in buckets[:-1]:
+            if bucket >= oldest and size <= self.max_keys:
+                break
+            size -= len(self._buckets.pop(bucket))
+
+    @property
+    def size(self):
+        """Number of keys kept."""
+        with self._lock:
+            return sum(len(keys) for keys in self._buckets.values())
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            logger.warning(f'Ignoring the unreadable observation index {self.path}')
+            return
+        self._buckets = {int(bucket): set(keys) for bucket, keys in data.get('buckets', {}).items()}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = dict(buckets={str(bucket): sorted(keys) for bucket, keys in self._buckets.items()})
+            self._dirty = False
+            self._last_save = time.monotonic()
+        write_json_atomic(self.path, data)
+
+    def close(self):
+        if self._dirty:
+            self.save()
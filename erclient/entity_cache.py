@@ -0,0 +1,164 @@
+"""
+In-memory cache for AsyncERClient entity lookups (sources by manufacturer_id, source subjects,
+subject sources), so ingest workers don't pay a round trip per message.
+"""
+import copy
+import time
+from collections import OrderedDict
+
+from .er_errors import ERClientNotFound
+
+CACHED_METHODS = ('get_source_by_manufacturer_id', 'get_source_subjects', 'get_subject_sources')
+
+
+def references(value, ids):
+    """
+    Whether a cached entity, or any entity in a cached list, has one of the given ids.
+    """
+    entities = value if isinstance(value, list) else [value]
+    return any(isinstance(entity, dict) and str(entity.get('id')) in ids for entity in entities)
+
+
+class _Namespace(object):
+    """
+    Entries of one client method, least recently used first.
+    """
+
+    def __init__(self, ttl, negative_ttl, max_entries):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, value, found)
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+class EntityCache(object):
+    """
+    TTL + LRU cache of lookup results, with negative caching of ERClientNotFound.
+
+    Settings apply to every cached method unless overridden per method, e.g.
+
+        EntityCache(ttl=300, methods={'get_source_subjects': {'ttl': 60}, 'get_subject_sources': {'ttl': 0}})
+
+    A ttl of 0 disables caching for that method. The client drops affected entries when it
+    patches or deletes subjects and sources or changes group memberships, and forgets the 404s
+    of sources it posts observations for, but changes made by other clients are only seen once
+    entries expire.
+
+    Meant to be used from a single event loop.
+    """
+
+    MISS = object()
+
+    DEFAULT_TTL_SECONDS = 300
+    DEFAULT_NEGATIVE_TTL_SECONDS = 30
+    DEFAULT_MAX_ENTRIES = 10000
+
+    def __init__(self, ttl=DEFAULT_TTL_SECONDS, negative_ttl=DEFAULT_NEGATIVE_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, methods=None):
+        """
+        :param ttl [seconds]: How long a result is served from the cache.
+        :param negative_ttl [seconds]: How long a 404 is remembered. 0 disables negative caching.
+        :param max_entries: Entries kept per method before the least recently used is dropped.
+        :param methods: Mapping of method name to a dict overriding ttl, negative_ttl and max_entries.
+        """
+        self._namespaces = {}
+        for method in CACHED_METHODS:
+            settings = dict(ttl=ttl, negative_ttl=negative_ttl, max_entries=max_entries)
+            settings.update((methods or {}).get(method) or {})
+            self._namespaces[method] = _Namespace(**settings)
+        unknown = set(methods or {}) - set(CACHED_METHODS)
+        if unknown:
+            raise ValueError(f'Unknown cached methods {sorted(unknown)}; supported: {list(CACHED_METHODS)}')
+
+    @classmethod
+    def from_option(cls, option):
+        """
+        Accept the client's entity_cache option: True, False/None or an EntityCache.
+        """
+        if option is True:
+            return cls()
+        if option is False:
+            return None
+        return option
+
+    def get(self, method, key):
+        """
+        Return a copy of the cached result or MISS.
+
+        :raises ERClientNotFound: if a 404 for this key is remembered
+        """
+        namespace = self._namespaces[method]
+        entry = namespace.entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del namespace.entries[key]
+            entry = None
+        if entry is None:
+            namespace.misses += 1
+            return self.MISS
+        namespace.entries.move_to_end(key)
+        expires_at, value, found = entry
+        if not found:
+            namespace.negative_hits += 1
+            raise ERClientNotFound()
+        namespace.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, method, key, value):
+        namespace = self._namespaces[method]
+        self._store(namespace, key, namespace.ttl, copy.deepcopy(value), True)
+
+    def set_not_found(self, method, key):
+        namespace = self._namespaces[method]
+        self._store(namespace, key, namespace.negative_ttl, None, False)
+
+    def _store(self, namespace, key, ttl, value, found):
+        if not ttl:
+            return
+        namespace.entries[key] = (time.monotonic() + ttl, value, found)
+        namespace.entries.move_to_end(key)
+        while len(namespace.entries) > namespace.max_entries:
+            namespace.entries.popitem(last=False)
+            namespace.evictions += 1
+
+    def invalidate(self, method, key=None, where=None):
+        """
+        Drop the entry for key, the entries whose result matches where(value), or (neither given)
+        every entry of the method.
+        """
+        entries = self._namespaces[method].entries
+        if key is not None:
+            entries.pop(key, None)
+        elif where is not None:
+            for k in [k for k, (_, value, found) in entries.items() if found and where(value)]:
+                del entries[k]
+        else:
+            entries.clear()
+
+    def invalidate_not_found(self, method, keys):
+        """
+        Drop the remembered 404s for keys, e.g. once a post has created what they refer to.
+        """
+        entries = self._namespaces[method].entries
+        for key in keys:
+            entry = entries.get(key)
+            if entry is not None and not entry[2]:
+                del entries[key]
+
+    def clear(self):
+        for namespace in self._namespaces.values():
+            namespace.entries.clear()
+
+    def stats(self):
+        """
+        Hits, negative hits, misses, evictions and current size per method.
+        """
+        return {
+            method: dict(hits=namespace.hits, negative_hits=namespace.negative_hits,
+                         misses=namespace.misses, evictions=namespace.evictions,
+                         size=len(namespace.entries))
+            for method, namespace in self._namespaces.items()
+        }
@@ -0,0 +1,102 @@
+"""
+Conditional GET cache for metadata that rarely changes (event types, categories, subject groups).
+"""
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+
+class CachedResponse(object):
+
+    def __init__(self, etag, last_modified, content):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content = content
+
+    def validators(self):
+        """
+        Headers that ask the server to answer 304 Not Modified if the cached body is still current.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HTTPCache(object):
+    """
+    Keeps the body and validators (ETag, Last-Modified) of GET responses, least recently used
+    first out. Cached requests are revalidated with If-None-Match/If-Modified-Since, so an
+    unchanged resource costs a 304 with no body instead of a full download.
+
+    Responses are cached per URL and query, not per user: only share a cache between
+    clients that use the same credentials. Safe to share between threads.
+    """
+
+    DEFAULT_MAX_ENTRIES = 256
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param max_entries: Responses kept before the least recently used is dropped.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_option(cls, option):
+        """
+        Accept the clients' http_cache option: True, False/None or an HTTPCache.
+        """
+        if option is True:
+            return cls()
+        if option is False:
+            return None
+        return option  # An empty cache is falsy, so don't test its truth value
+
+    @staticmethod
+    def key(url, params=None):
+        params = sorted((k, str(v)) for k, v in (params or {}).items() if v is not None)
+        return f'{url}?{urlencode(params)}' if params else url
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key, headers, content):
+        """
+        Cache a successful response if it carries validators and may be stored.
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if 'no-store' in (headers.get('Cache-Control') or ''):
+            etag = last_modified = None
+        with self._lock:
+            if not (etag or last_modified):
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = CachedResponse(etag, last_modified, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, not_modified):
+        with self._lock:
+            if not_modified:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
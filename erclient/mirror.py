@@ -0,0 +1,221 @@
+"""
+Local SQLite mirror of events, subjects and observations, kept up to date incrementally, so
+repeated analytical reads hit local disk instead of paginating the API.
+"""
+import json
+import sqlite3
+from datetime import timezone
+
+from .change_sync import ChangeSync
+from .scan import to_datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    serial_number INTEGER,
+    event_type TEXT,
+    state TEXT,
+    time TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE INDEX IF NOT EXISTS events_event_type ON events (event_type, time);
+CREATE INDEX IF NOT EXISTS events_serial_number ON events (serial_number);
+
+CREATE TABLE IF NOT EXISTS subjects (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    subject_type TEXT,
+    subject_subtype TEXT,
+    is_active INTEGER,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS observations (
+    id TEXT PRIMARY KEY,
+    subject_id TEXT,
+    source_id TEXT,
+    recorded_at TEXT,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_recorded_at ON observations (recorded_at);
+CREATE INDEX IF NOT EXISTS observations_subject_id ON observations (subject_id, recorded_at);
+CREATE INDEX IF NOT EXISTS observations_source_id ON observations (source_id, recorded_at);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    stream TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+"""
+
+
+def _utc(value):
+    # One format for every timestamp, so they compare as text
+    if not value:
+        return None
+    return to_datetime(value).astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+
+class _SyncStateTable(object):
+    """
+    ChangeSync store in the mirror's database, so data and watermarks are committed together.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def load(self):
+        return {stream: json.loads(state)
+                for stream, state in self.connection.execute('SELECT stream, state FROM sync_state')}
+
+    def save(self, state):
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO sync_state (stream, state) VALUES (?, ?)',
+            [(stream, json.dumps(data)) for stream, data in state.items()])
+
+
+class SQLiteMirror(object):
+    """
+    Replicates events, subjects and observations from an ERClient into a SQLite database:
+
+        mirror = SQLiteMirror(client, 'er.sqlite3')
+        mirror.sync_events()
+        mirror.sync_observations(subject_id=subject_id)
+        mirror.events(event_type='wildlife_sighting_rep', since=start)
+
+    Events and observations are fetched incrementally (see ChangeSync); subjects are fetched in
+    full on each sync. Each sync is one transaction, watermark included, so an interrupted sync
+    leaves the mirror as it was. Meant to be used from one thread.
+    """
+
+    def __init__(self, client, path, overlap=ChangeSync.DEFAULT_OVERLAP, initial=None):
+        """
+        :param client: The ERClient to replicate from.
+        :param path: SQLite database file (created if missing), or ':memory:'.
+        :param overlap [timedelta]: How far before the watermark each sync starts, see ChangeSync.
+        :param initial: Where the first sync of a stream starts (datetime or ISO 8601). Default is everything.
+        """
+        self.client = client
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.overlap = overlap
+        self.initial = initial
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _change_sync(self):
+        return ChangeSync(self.client, store=_SyncStateTable(self.connection),
+                          overlap=self.overlap, initial=self.initial)
+
+    def sync_events(self, stream='events', **kwargs):
+        """
+        Fetch the events that changed since the last sync. kwargs are passed to get_events();
+        use a different stream name for each set of filters.
+
+        :return: Number of events inserted or updated.
+        """
+        with self.connection:
+            rows = [(str(e['id']), e.get('serial_number'), e.get('event_type'), e.get('state'),
+                     _utc(e.get('time')), _utc(e.get('updated_at')), json.dumps(e))
+                    for e in self._change_sync().events(stream=stream, **kwargs)]
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO events (id, serial_number, event_type, state, time, updated_at, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def sync_observations(self, subject_id=None, source_id=None, **kwargs):
+        """
+        Fetch the observations created since the last sync of this subject (or source).
+        kwargs are passed to get_observations().
+
+        :return: Number of observations inserted or updated.
+        """
+        if subject_id:
+            stream = f'observations:subject:{subject_id}'
+        elif source_id:
+            stream = f'observations:source:{source_id}'
+        else:
+            stream = 'observations'
+        observations = self._change_sync().observations(
+            stream=stream, subject_id=subject_id, source_id=source_id, **kwargs)
+        with self.connection:
+            rows = [(str(o['id']), subject_id, o.get('source') or source_id,
+                     _utc(o.get('recorded_at')), _utc(o.get('created_at')), json.dumps(o))
+                    for o in observations]
+            # Observations carry no subject, so keep the one a subject sync stored
+            self.connection.executemany(
+                'INSERT INTO observations (id, subject_id, source_id, recorded_at, created_at, data) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET subject_id=COALESCE(excluded.subject_id, observations.subject_id), '
+                'source_id=excluded.source_id, recorded_at=excluded.recorded_at, '
+                'created_at=excluded.created_at, data=excluded.data', rows)
+        return len(rows)
+
+    def sync_subjects(self, **kwargs):
+        """
+        Fetch all subjects. kwargs are passed to get_subjects(). Subjects deleted in ER are kept.
+
+        :return: Number of subjects inserted or updated.
+        """
+        subjects = self.client.get_subjects(**kwargs) or []
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO subjects (id, name, subject_type, subject_subtype, is_active, data) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(str(s['id']), s.get('name'), s.get('subject_type'), s.get('subject_subtype'),
+                  s.get('is_active'), json.dumps(s)) for s in subjects])
+        return len(subjects)
+
+    def _select(self, table, conditions, order_by=None, limit=None):
+        where = [f'{column} {op} ?' for column, op, value in conditions if value is not None]
+        values = [value for _, _, value in conditions if value is not None]
+        query = f'SELECT data FROM {table}'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        if order_by:
+            query += f' ORDER BY {order_by}'
+        if limit is not None:
+            query += ' LIMIT ?'
+            values.append(limit)
+        return [json.loads(data) for data, in self.connection.execute(query, values)]
+
+    def events(self, since=None, until=None, event_type=None, state=None, serial_number=None, limit=None):
+        """
+        Mirrored events, by time.
+
+        :param since: Events at or after this time (datetime or ISO 8601).
+        :param until: Events at or before this time (datetime or ISO 8601).
+        """
+        return self._select('events', [
+            ('time', '>=', _utc(since)), ('time', '<=', _utc(until)), ('event_type', '=', event_type),
+            ('state', '=', state), ('serial_number', '=', serial_number)], order_by='time', limit=limit)
+
+    def get_event(self, event_id):
+        events = self._select('events', [('id', '=', str(event_id))])
+        return events[0] if events else None
+
+    def observations(self, subject_id=None, source_id=None, since=None, until=None, limit=None):
+        """
+        Mirrored observations, by recorded_at.
+
+        :param since: Observations recorded at or after this time (datetime or ISO 8601).
+        :param until: Observations recorded at or before this time (datetime or ISO 8601).
+        """
+        return self._select('observations', [
+            ('subject_id', '=', subject_id), ('source_id', '=', source_id),
+            ('recorded_at', '>=', _utc(since)), ('recorded_at', '<=', _utc(until))],
+            order_by='recorded_at', limit=limit)
+
+    def subjects(self, subject_type=None, subject_subtype=None, is_active=None):
+        return self._select('subjects', [
+            ('subject_type', '=', subject_type), ('subject_subtype', '=', subject_subtype),
+            ('is_active', '=', is_active)], order_by='name')
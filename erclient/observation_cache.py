@@ -0,0 +1,156 @@
+"""
+On-disk cache of historical observations. Observations older than a few days practically
+never change, so they are downloaded once per time bucket and read from disk afterwards.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_OBSERVATION_CACHE_PATH = os.path.join(
+    os.path.expanduser('~'), '.cache', 'erclient', 'observations')
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class ObservationCache(object):
+    """
+    Gzipped JSON files of the observations of one subject (or source) in one time bucket,
+    least recently used first out once the directory grows past max_bytes.
+
+    Only buckets that ended more than `settle` ago are cached; the live edge is always
+    fetched from ER. Safe to share between threads and processes.
+
+    The directory is scanned once, then its size is kept up to date as files are stored;
+    files stored by other processes are counted at the next scan, when files are evicted.
+    """
+
+    DEFAULT_BUCKET = timedelta(days=1)
+    DEFAULT_SETTLE = timedelta(days=3)
+    DEFAULT_MAX_BYTES = 1024 ** 3
+
+    def __init__(self, path=None, bucket=DEFAULT_BUCKET, settle=DEFAULT_SETTLE, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param path: Cache directory. Defaults to ~/.cache/erclient/observations.
+        :param bucket [timedelta]: Time span of one cached file.
+        :param settle [timedelta]: Age after which observations are considered final.
+        :param max_bytes: Size of the directory above which the least recently used files are deleted.
+        """
+        self.path = path or DEFAULT_OBSERVATION_CACHE_PATH
+        self.bucket = bucket
+        self.settle = settle
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total = None  # Bytes in the directory, known after the first scan
+        os.makedirs(self.path, exist_ok=True)
+
+    @classmethod
+    def from_option(cls, option):
+        """
+        Accept the client's observation_cache option: True, False/None, a directory or an ObservationCache.
+        """
+        if option is True:
+            return cls()
+        if not option:
+            return None
+        if isinstance(option, str):
+            return cls(option)
+        return option
+
+    def floor(self, value):
+        """
+        Start of the bucket holding value.
+        """
+        return EPOCH + (value - EPOCH) // self.bucket * self.bucket
+
+    def settled_until(self, now=None):
+        """
+        End of the last bucket that may be cached.
+        """
+        return self.floor((now or datetime.now(tz=timezone.utc)) - self.settle)
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha256('\n'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, f'{key}.json.gz')
+
+    def load(self, key):
+        """
+        The cached observations, or None.
+        """
+        path = self._file(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                observations = json.load(f)
+        except (OSError, EOFError, ValueError):
+            # Missing, or left incomplete by a crash: fetch it again
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # Recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return observations
+
+    def store(self, key, observations):
+        path = self._file(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f, gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+                gz.write(json.dumps(observations, separators=(',', ':')).encode('utf-8'))
+            size = os.path.getsize(tmp_path)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            if self._total is not None:
+                self._total += size - replaced
+            evict = self._total is None or self._total > self.max_bytes
+        if evict:
+            self._evict()
+
+    def _evict(self):
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.path):
+                if entry.name.endswith('.json.gz'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._total = total
+
+    def size(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.name.endswith('.json.gz'))
+
+    def clear(self):
+        with self._lock:
+            for entry in os.scandir(self.path):
+                if entry.name.endswith('.json.gz'):
+                    os.remove(entry.path)
+            self._total = 0
@@ -0,0 +1,143 @@
+"""
+Concurrent fetching of page-numbered lists for the sync client.
+"""
+import concurrent.futures
+import logging
+import math
+import time
+
+from .er_errors import ERClientNotFound
+from .retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrentPager(object):
+    """
+    Fetches pages 1, 2, 3... of a list with a pool of threads and yields their results.
+
+    At most max_in_flight pages are requested or waiting to be consumed at any time, so memory
+    stays constant however long the list is. A page that fails is fetched again after a backoff,
+    up to `retries` times, waiting as long as the error's retry_after asks when it has one.
+    The number of pages comes from the first page's count, or, when the
+    response has no count, from the first page without a next link.
+    """
+
+    DEFAULT_THREADS = 5
+    DEFAULT_RETRIES = 3
+
+    def __init__(self, fetch_page, page_size, threads=DEFAULT_THREADS, max_in_flight=None,
+                 retries=DEFAULT_RETRIES, retry_policy=None, ordered=False, progress=None):
+        """
+        :param fetch_page: Called with a page number, returns the response (with results, count, next).
+        :param page_size: Objects per page, used to work out the number of pages from the count.
+        :param threads: Pages fetched at the same time.
+        :param max_in_flight: Pages requested or waiting to be consumed. Default is twice the threads.
+        :param retries: Times a failed page is fetched again before giving up.
+        :param retry_policy: RetryPolicy whose backoff spaces the attempts.
+        :param ordered: Yield pages in page order instead of as they arrive.
+        :param progress: Called with (pages_done, total_pages, objects_done) after each page is
+                         consumed. total_pages is None while unknown.
+        """
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.threads = threads
+        self.max_in_flight = max(max_in_flight or threads * 2, 1)
+        self.retries = retries
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.ordered = ordered
+        self.progress = progress
+
+    def __iter__(self):
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.threads)
+        futures = {}  # future -> page
+        try:
+            yield from self._run(executor, futures)
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _fetch(self, page, delay):
+        if delay:
+            time.sleep(delay)
+        return self.fetch_page(page)
+
+    def _run(self, executor, futures):
+        attempts = {}
+        completed = {}  # page -> results fetched but not yielded yet (None past the end)
+        total_pages = None  # from the first page's count
+        last_page = None  # from the first page without a next link, when there is no count
+        first_page_done = False
+        next_to_submit = 1
+        next_to_yield = 1
+        pages_done = 0
+        objects_done = 0
+
+        def submit(page, delay=0):
+            futures[executor.submit(self._fetch, page, delay)] = page
+
+        def end():
+            return total_pages if total_pages is not None else last_page
+
+        while True:
+            # Keep the window full; pages after the first wait until it tells how many there are
+            while (len(futures) + len(completed) < self.max_in_flight
+                   and (next_to_submit == 1 or first_page_done)
+                   and (end() is None or next_to_submit <= end())):
+                submit(next_to_submit)
+                next_to_submit += 1
+
+            if not futures:
+                return
+
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                page = futures.pop(future)
+                try:
+                    response = future.result()
+                except ERClientNotFound:
+                    if page == 1 or total_pages is not None:
+                        raise
+                    # Past the last page of a list without a count
+                    last_page = page - 1 if last_page is None else min(last_page, page - 1)
+                    completed[page] = None
+                    continue
+                except Exception as e:
+                    attempts[page] = attempts.get(page, 0) + 1
+                    if attempts[page] > self.retries:
+                        logger.error(f"Error loading page {page}: {e}")
+                        raise
+                    delay = getattr(e, 'retry_after', None)
+                    if delay is None or not self.retry_policy.respect_retry_after:
+                        delay = self.retry_policy.backoff(attempts[page])
+                    logger.warning(
+                        f"Attempt {attempts[page]} of {self.retries}: error loading page {page}: {e}. Retrying in {delay:.2f}s")
+                    submit(page, delay)
+                    continue
+
+                if not isinstance(response, dict):
+                    response = {'results': response or []}
+                results = response.get('results') or []
+                if page == 1:
+                    first_page_done = True
+                    if response.get('count') is not None:
+                        total_pages = max(1, math.ceil(response['count'] / self.page_size))
+                if total_pages is None and (not results or not response.get('next')):
+                    last_page = page if last_page is None else min(last_page, page)
+                completed[page] = results
+
+            while completed:
+                if self.ordered and next_to_yield not in completed:
+                    break
+                page = next_to_yield if self.ordered else min(completed)
+                results = completed.pop(page)
+                next_to_yield = max(next_to_yield, page + 1)
+                if results is None or (end() is not None and page > end()):
+                    continue  # Asked for before the end was known
+                pages_done += 1
+                for result in results:
+                    yield result
+                objects_done += len(results)
+                if self.progress:
+                    self.progress(pages_done, end(), objects_done)
@@ -0,0 +1,111 @@
+"""
+Client-side rate limiting of ER API requests, per endpoint family.
+"""
+import asyncio
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+_API_ROOT_RE = re.compile(r'(?:^|/)api/v[^/]+/')
+
+
+class TokenBucket(object):
+    """
+    Token bucket refilled at `rate` tokens per second, holding at most `capacity` tokens.
+
+    Callers reserve a token and are told how long to wait for it, so waiters are served
+    in arrival order and requests go out at a steady pace instead of in bursts.
+    Safe to share between threads and event loops.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Take tokens from the bucket and return the seconds to wait before using them.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # The balance may go negative: that is the queue of callers already waiting
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RateLimiter(object):
+    """
+    Token buckets selected by the longest matching endpoint prefix, e.g.
+
+        RateLimiter(limits={'observations': 10, 'sensors/': (20, 40), 'activity/events': 5}, default=25)
+
+    Prefixes are matched against the path relative to the API root (no version segment).
+    A limit is either a rate in requests per second or a (rate, burst) tuple.
+    """
+
+    def __init__(self, limits=None, default=None):
+        """
+        :param limits: Mapping of endpoint prefix to rate or (rate, burst).
+        :param default: Rate or (rate, burst) for requests that match no prefix. None means unlimited.
+        """
+        self._buckets = sorted(
+            ((prefix.lstrip('/'), self._make_bucket(limit)) for prefix, limit in (limits or {}).items()),
+            key=lambda item: len(item[0]), reverse=True)
+        self._default = self._make_bucket(default) if default is not None else None
+
+    @staticmethod
+    def _make_bucket(limit):
+        if isinstance(limit, TokenBucket):
+            return limit
+        if isinstance(limit, (tuple, list)):
+            return TokenBucket(*limit)
+        return TokenBucket(limit)
+
+    @staticmethod
+    def endpoint(path):
+        """
+        Path relative to the API root, e.g. https://site/api/v1.0/observations?x=1 -> observations
+        """
+        if path.startswith('http'):
+            path = urlparse(path).path
+        path = path.lstrip('/')
+        # The service root may sit below a prefix, e.g. https://site/er/api/v1.0/
+        match = _API_ROOT_RE.search(path)
+        return path[match.end():] if match else path
+
+    def bucket_for(self, path):
+        endpoint = self.endpoint(path)
+        for prefix, bucket in self._buckets:
+            if endpoint.startswith(prefix):
+                return bucket
+        return self._default
+
+    def acquire(self, path):
+        bucket = self.bucket_for(path)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def acquire_async(self, path):
+        bucket = self.bucket_for(path)
+        if bucket is not None:
+            await bucket.acquire_async()
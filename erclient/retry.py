@@ -0,0 +1,87 @@
+"""
+Retry policy shared by ERClient and AsyncERClient.
+
+The policy only decides whether and how long to wait; each client runs its own request loop.
+"""
+import random
+
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+
+
+class RetryPolicy(object):
+    """
+    Exponential backoff with jitter that honors the server's Retry-After header.
+
+    POST and PATCH are not idempotent, so by default they are only retried when the
+    response says the server did not act on the request (429, 503) or the connection
+    could not be established at all.
+    """
+
+    DEFAULT_RETRY_STATUSES = frozenset((408, 429, 500, 502, 503, 504))
+    DEFAULT_NON_IDEMPOTENT_RETRY_STATUSES = frozenset((429, 503))
+
+    def __init__(self, max_retries=5, backoff_factor=0.5, max_backoff=30, jitter=True,
+                 retry_statuses=DEFAULT_RETRY_STATUSES,
+                 non_idempotent_retry_statuses=DEFAULT_NON_IDEMPOTENT_RETRY_STATUSES,
+                 respect_retry_after=True, max_retry_after=120, retry_non_idempotent=False):
+        """
+        :param max_retries: Retries after the first attempt. 0 disables retrying.
+        :param backoff_factor [seconds]: Base delay; attempt n waits up to backoff_factor * 2 ** (n - 1).
+        :param max_backoff [seconds]: Upper bound for the computed backoff.
+        :param jitter: Pick a random delay between 0 and the backoff ("full jitter") so clients don't retry in lockstep.
+        :param retry_statuses: HTTP statuses retried for idempotent methods.
+        :param non_idempotent_retry_statuses: HTTP statuses retried for POST and PATCH.
+        :param respect_retry_after: Wait exactly as long as the server's Retry-After asks, instead of the backoff.
+        :param max_retry_after [seconds]: Give up instead of waiting when Retry-After asks for longer than this.
+        :param retry_non_idempotent: Treat POST and PATCH like idempotent methods.
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.non_idempotent_retry_statuses = frozenset(non_idempotent_retry_statuses)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.retry_non_idempotent = retry_non_idempotent
+
+    def copy(self, **overrides):
+        settings = dict(vars(self))
+        settings.update(overrides)
+        return self.__class__(**settings)
+
+    def is_idempotent(self, method):
+        return self.retry_non_idempotent or method.upper() in IDEMPOTENT_METHODS
+
+    def should_retry(self, method, attempt, status_code=None, request_sent=True):
+        """
+        :param attempt: Number of attempts made so far (1 after the first request).
+        :param status_code: HTTP status of the failed response, or None for a connection error.
+        :param request_sent: False when the connection failed before the request was sent.
+        """
+        if attempt > self.max_retries:
+            return False
+        idempotent = self.is_idempotent(method)
+        if status_code is None:
+            return idempotent or not request_sent
+        if idempotent:
+            return status_code in self.retry_statuses
+        return status_code in self.non_idempotent_retry_statuses
+
+    def backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def retry_delay(self, method, attempt, status_code=None, retry_after=None, request_sent=True):
+        """
+        Seconds to wait before the next attempt, or None if the request should not be retried.
+        """
+        if not self.should_retry(method, attempt, status_code=status_code, request_sent=request_sent):
+            return None
+        if retry_after is not None and self.respect_retry_after:
+            if self.max_retry_after is not None and retry_after > self.max_retry_after:
+                return None
+            return retry_after
+        return self.backoff(attempt)
@@ -0,0 +1,240 @@
+"""
+Time-partitioned parallel scans: a long since/until window is split into sub-windows that are
+paginated concurrently, so large historical pulls use several connections instead of one.
+"""
+import asyncio
+import concurrent.futures
+import json
+import queue
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+Window = namedtuple('Window', ['start', 'end'])
+
+# Sub-windows end one microsecond (the resolution of ER timestamps) before the next one
+# starts, so an item on a boundary is returned by exactly one window.
+RESOLUTION = timedelta(microseconds=1)
+
+_DONE = object()
+
+
+def to_datetime(value):
+    """
+    Parse an ISO 8601 string (or take a datetime), assuming UTC when no timezone is given.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class ScanPlanner(object):
+    """
+    Splits [start, end] into `partitions` contiguous windows of equal length. With a
+    split_threshold, a window whose count is above it is halved again (down to min_window),
+    so dense periods are spread over more requests.
+    """
+
+    DEFAULT_PARTITIONS = 8
+    DEFAULT_MIN_WINDOW = timedelta(minutes=1)
+
+    def __init__(self, start, end, partitions=DEFAULT_PARTITIONS, split_threshold=None,
+                 min_window=DEFAULT_MIN_WINDOW):
+        """
+        :param start: Start of the scan (datetime or ISO 8601).
+        :param end: End of the scan (datetime or ISO 8601).
+        :param partitions: Number of windows to start with.
+        :param split_threshold: Halve windows holding more items than this. None disables re-splitting.
+        :param min_window: Windows shorter than twice this are never split.
+        """
+        self.start = to_datetime(start)
+        self.end = to_datetime(end)
+        if self.end <= self.start:
+            raise ValueError('end must be after start')
+        if partitions < 1:
+            raise ValueError('partitions must be at least 1')
+        self.partitions = partitions
+        self.split_threshold = split_threshold
+        self.min_window = min_window
+
+    def windows(self):
+        return self._split(Window(self.start, self.end), self.partitions)
+
+    @staticmethod
+    def _split(window, parts):
+        step = (window.end - window.start) / parts
+        bounds = [window.start + step * i for i in range(parts)] + [window.end + RESOLUTION]
+        return [Window(bounds[i], bounds[i + 1] - RESOLUTION) for i in range(parts)]
+
+    def should_split(self, window, count):
+        return (self.split_threshold is not None and count is not None and count > self.split_threshold
+                and window.end - window.start >= 2 * self.min_window)
+
+    def split(self, window):
+        return self._split(window, 2)
+
+    def plan(self, count_window, max_workers=None):
+        """
+        Return the windows to scan, in chronological order. count_window(window) returns the
+        number of items in a window (or None if unknown); it is only called when re-splitting.
+        """
+        windows = self.windows()
+        if self.split_threshold is None:
+            return windows
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or self.partitions) as executor:
+            while True:
+                counts = list(executor.map(count_window, windows))
+                if not any(self.should_split(w, c) for w, c in zip(windows, counts)):
+                    return windows
+                windows = self._resplit(windows, counts)
+
+    async def plan_async(self, count_window):
+        """
+        Like plan(), for a coroutine count_window.
+        """
+        windows = self.windows()
+        if self.split_threshold is None:
+            return windows
+        while True:
+            counts = await asyncio.gather(*[count_window(w) for w in windows])
+            if not any(self.should_split(w, c) for w, c in zip(windows, counts)):
+                return windows
+            windows = self._resplit(windows, counts)
+
+    def _resplit(self, windows, counts):
+        planned = []
+        for window, count in zip(windows, counts):
+            planned.extend(self.split(window) if self.should_split(window, count) else [window])
+        return planned
+
+
+def observation_window_params(params, window):
+    return {**params, 'since': window.start.isoformat(), 'until': window.end.isoformat()}
+
+
+# get_events() params that narrow down which events are counted
+EVENT_COUNT_PARAMS = ('state', 'event_type', 'updated_since', 'oldest_update_date', 'event_ids')
+
+
+def event_count_params(params):
+    """
+    The params of a scan_events() call that belong in a window's count request.
+    """
+    return {k: v for k, v in params.items() if k in EVENT_COUNT_PARAMS}
+
+
+def event_window_filter(event_filter, window):
+    """
+    The events filter (JSON string or dict) restricted to the window's date_range.
+    """
+    if isinstance(event_filter, str):
+        event_filter = json.loads(event_filter)
+    event_filter = dict(event_filter or {})
+    event_filter['date_range'] = {'lower': window.start.isoformat(), 'upper': window.end.isoformat()}
+    return json.dumps(event_filter)
+
+
+async def scan_windows_async(windows, scan_window, ordered=False, max_concurrency=None, buffer_size=1000):
+    """
+    Iterate scan_window(window), an async iterator of items, for every window concurrently.
+
+    :param ordered: Yield the windows' items in window order (each window in server order).
+                    Otherwise items are yielded as they arrive.
+    :param max_concurrency: Windows scanned at the same time. Default is all of them.
+    :param buffer_size: Items buffered (per window when ordered) before scans wait for the consumer.
+    """
+    queues = [asyncio.Queue(maxsize=buffer_size) for _ in (windows if ordered else [None])]
+    semaphore = asyncio.Semaphore(max_concurrency or len(windows))
+
+    async def scan(index, window):
+        window_queue = queues[index if ordered else 0]
+        items = scan_window(window)
+        try:
+            async for item in items:
+                await window_queue.put(item)
+        except Exception as e:
+            await window_queue.put(e)
+        else:
+            await window_queue.put(_DONE)
+        finally:
+            semaphore.release()
+            await items.aclose()
+
+    async def launch():
+        # Windows are started in order, so an ordered scan always makes progress on the first one
+        for index, window in enumerate(windows):
+            await semaphore.acquire()
+            tasks.append(asyncio.ensure_future(scan(index, window)))
+
+    tasks = []
+    launcher = asyncio.ensure_future(launch())
+    try:
+        remaining = len(windows)
+        index = 0
+        while remaining:
+            item = await queues[index if ordered else 0].get()
+            if item is _DONE:
+                remaining -= 1
+                index += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        launcher.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(launcher, *tasks, return_exceptions=True)
+
+
+def scan_windows(windows, scan_window, ordered=False, max_concurrency=None, buffer_size=1000):
+    """
+    Thread-based scan_windows_async() for the sync client: scan_window(window) is an iterator
+    of items, run in a worker thread per window.
+    """
+    queues = [queue.Queue(maxsize=buffer_size) for _ in (windows if ordered else [None])]
+    stopped = threading.Event()
+
+    def put(window_queue, item):
+        while not stopped.is_set():
+            try:
+                window_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan(index, window):
+        window_queue = queues[index if ordered else 0]
+        if stopped.is_set():
+            return
+        try:
+            for item in scan_window(window):
+                if not put(window_queue, item):
+                    return  # The consumer went away
+        except Exception as e:
+            put(window_queue, e)
+        else:
+            put(window_queue, _DONE)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency or len(windows))
+    try:
+        # The executor starts windows in submission order, so an ordered scan always makes progress
+        for index, window in enumerate(windows):
+            executor.submit(scan, index, window)
+        remaining = len(windows)
+        index = 0
+        while remaining:
+            item = queues[index if ordered else 0].get()
+            if item is _DONE:
+                remaining -= 1
+                index += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stopped.set()
+        executor.shutdown(wait=True)
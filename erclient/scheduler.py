@@ -0,0 +1,141 @@
+"""
+Per-source pacing for sensor observations posted through AsyncERClient.
+
+ER accepts one observation per second per source and answers 409 to anything faster,
+so observations are queued per source and posted in order, one interval apart, while
+different sources are posted concurrently.
+"""
+import asyncio
+
+from .er_errors import ERClientRateLimitExceeded
+
+
+class ObservationScheduler(object):
+    """
+    Queues observations per (sensor_type, source) and posts them through the client.
+
+    Each source gets a worker task that is started on demand and stops after idle_timeout
+    seconds without work.
+    """
+
+    DEFAULT_INTERVAL_SECONDS = 1.0
+    DEFAULT_MAX_CONCURRENCY = 50
+    DEFAULT_IDLE_TIMEOUT_SECONDS = 30
+    DEFAULT_MAX_CONFLICT_RETRIES = 3
+
+    def __init__(self, client, interval=DEFAULT_INTERVAL_SECONDS, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_queue_size=0, idle_timeout=DEFAULT_IDLE_TIMEOUT_SECONDS,
+                 max_conflict_retries=DEFAULT_MAX_CONFLICT_RETRIES):
+        """
+        :param client: The AsyncERClient used to post.
+        :param interval [seconds]: Minimum time between the start of two posts for the same source.
+        :param max_concurrency: Maximum number of posts in flight across all sources.
+        :param max_queue_size: Maximum observations waiting per source; submit() waits for room. 0 means unbounded.
+        :param idle_timeout [seconds]: Stop a source's worker after this long without observations.
+        :param max_conflict_retries: Times to re-post an observation that was rejected with 409 Conflict.
+        """
+        self.client = client
+        self.interval = interval
+        self.max_queue_size = max_queue_size
+        self.idle_timeout = idle_timeout
+        self.max_conflict_retries = max_conflict_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queues = {}
+        self._workers = {}
+
+    @staticmethod
+    def source_key(observation, sensor_type):
+        source = observation.get('manufacturer_id') or observation.get('source')
+        return sensor_type, source
+
+    async def submit(self, observation, sensor_type='generic'):
+        """
+        Queue an observation. Returns a future resolved with the post result (or its error).
+        """
+        key = self.source_key(observation, sensor_type)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue(maxsize=self.max_queue_size)
+            self._workers[key] = asyncio.ensure_future(
+                self._run_source(key, queue))
+        future = asyncio.get_event_loop().create_future()
+        await queue.put((observation, future))
+        return future
+
+    async def post(self, observation, sensor_type='generic'):
+        """
+        Queue an observation and wait until it has been posted.
+        """
+        return await (await self.submit(observation, sensor_type))
+
+    @property
+    def pending(self):
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def join(self):
+        """
+        Wait until every queued observation has been posted.
+        """
+        await asyncio.gather(*[queue.join() for queue in list(self._queues.values())])
+
+    async def close(self):
+        """
+        Post everything still queued, then stop the workers.
+        """
+        await self.join()
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._queues.clear()
+        self._workers.clear()
+
+    async def _run_source(self, key, queue):
+        next_slot = 0
+        while True:
+            try:
+                observation, future = await asyncio.wait_for(queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    del self._queues[key]
+                    del self._workers[key]
+                    return
+                continue
+
+            try:
+                if future.cancelled():
+                    continue
+                next_slot = await self._post(key, observation, future, next_slot)
+            finally:
+                queue.task_done()
+
+    async def _post(self, key, observation, future, next_slot):
+        loop = asyncio.get_event_loop()
+        sensor_type = key[0]
+        conflicts = 0
+        while True:
+            delay = next_slot - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_slot = loop.time() + self.interval
+            try:
+                async with self._semaphore:
+                    # Never batched: pacing is per observation
+                    result = await self.client.post_sensor_observation(
+                        observation, sensor_type=sensor_type, batch=False)
+            except ERClientRateLimitExceeded as e:
+                if e.status_code == 409 and conflicts < self.max_conflict_retries:
+                    # Posted too soon after an observation we didn't send (e.g. another process)
+                    conflicts += 1
+                    if e.retry_after:
+                        next_slot = max(next_slot, loop.time() + e.retry_after)
+                    continue
+                if not future.cancelled():
+                    future.set_exception(e)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+            return next_slot
@@ -0,0 +1,231 @@
+"""
+Write-ahead spool of observation posts, so payloads that can't be posted while ER is unreachable
+are kept on disk and posted later, in order, instead of being dropped.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+
+from .checkpoint import write_json_atomic
+from .codec import JSONCodec
+
+logger = logging.getLogger(__name__)
+
+OUTAGE_STATUS_CODES = (502, 503, 504)
+
+OBSERVATIONS = 'observations'
+SENSORS = 'sensors'
+
+
+class ObservationSpool(object):
+    """
+    Append-only segment files of observation posts, one record per line:
+
+        <crc32 of the JSON, 8 hex digits> <JSON record>
+
+    Records are read back in order from the acknowledged position, which is saved after every
+    successful post; segments that were read to the end are deleted. A record cut short by a
+    crash is discarded when the spool is opened; other records that fail their checksum are
+    logged and skipped, and the records after them are kept.
+
+    fsync policy:
+    - 'always': every append is on disk before append() returns. Default.
+    - 'interval': appends are synced at most every fsync_interval seconds (and on close).
+    - 'never': the operating system decides.
+
+    Safe to share between threads, not between processes.
+    """
+
+    DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+    DEFAULT_FSYNC_INTERVAL_SECONDS = 1.0
+    DEFAULT_RETRY_INTERVAL_SECONDS = 30.0
+    DEFAULT_BATCH_SIZE = 100
+
+    FSYNC_POLICIES = ('always', 'interval', 'never')
+
+    def __init__(self, path, segment_bytes=DEFAULT_SEGMENT_BYTES, fsync='always',
+                 fsync_interval=DEFAULT_FSYNC_INTERVAL_SECONDS, retry_interval=DEFAULT_RETRY_INTERVAL_SECONDS,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        """
+        :param path: Spool directory (created if missing).
+        :param segment_bytes: Size after which a new segment file is started.
+        :param fsync: 'always', 'interval' or 'never'.
+        :param fsync_interval [seconds]: Time between syncs with the 'interval' policy.
+        :param retry_interval [seconds]: Time between attempts to replay the spool while ER is unreachable.
+        :param batch_size: Observations posted together when replaying.
+        """
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f'fsync must be one of {self.FSYNC_POLICIES}')
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.retry_interval = retry_interval
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._last_fsync = time.monotonic()
+        os.makedirs(path, exist_ok=True)
+        self._ack_path = os.path.join(path, 'ack.json')
+        self._ack = self._load_ack()
+        segments = self._segments()
+        if segments:
+            self._segment = segments[-1]
+        else:
+            # Everything was posted: start after the acknowledged position
+            self._segment = self._ack[0] + 1
+            self._ack = (self._segment, 0)
+        self._file = open(self._segment_path(self._segment), 'ab')
+        self._repair_tail()
+
+    @classmethod
+    def from_option(cls, option):
+        """
+        Accept the clients' spool option: None, a directory or an ObservationSpool.
+        """
+        if isinstance(option, str):
+            return cls(option)
+        return option or None
+
+    def _segment_path(self, segment):
+        return os.path.join(self.path, f'{segment:020d}.log')
+
+    def _segments(self):
+        return sorted(int(name[:-4]) for name in os.listdir(self.path)
+                      if name.endswith('.log') and name[:-4].isdigit())
+
+    def _load_ack(self):
+        try:
+            with open(self._ack_path) as f:
+                ack = json.load(f)
+            return ack['segment'], ack['offset']
+        except FileNotFoundError:
+            return 0, 0
+
+    def _repair_tail(self):
+        # Drop a record cut short by a crash, so the next append starts on a line of its own.
+        # Damaged records before it are skipped when read.
+        end = 0
+        with open(self._segment_path(self._segment), 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                end += len(line)
+        if end != self._file.tell():
+            logger.warning(f'Discarding a damaged record at the end of {self._segment_path(self._segment)}')
+            self._file.truncate(end)
+            self._file.seek(end)
+
+    @staticmethod
+    def _encode(record):
+        # Same types as the clients' codecs (UUID, datetime, Decimal...)
+        data = json.dumps(record, default=JSONCodec.default, separators=(',', ':')).encode('utf-8')
+        return b'%08x ' % zlib.crc32(data) + data + b'\n'
+
+    @staticmethod
+    def _decode(line):
+        if not line.endswith(b'\n') or len(line) < 10:
+            return None
+        checksum, data = line[:8], line[9:-1]
+        try:
+            if int(checksum, 16) != zlib.crc32(data):
+                return None
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def append(self, kind, payload, sensor_type=None):
+        """
+        Spool an observation (or a list of observations) for the observations endpoint
+        (kind OBSERVATIONS) or the sensors endpoint of sensor_type (kind SENSORS).
+        """
+        line = self._encode(dict(kind=kind, sensor_type=sensor_type, payload=payload))
+        with self._lock:
+            if self._file.tell() and self._file.tell() + len(line) > self.segment_bytes:
+                self._file.close()
+                self._segment += 1
+                self._file = open(self._segment_path(self._segment), 'ab')
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync == 'always' or (
+                    self.fsync == 'interval' and time.monotonic() - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._file.fileno())
+                self._last_fsync = time.monotonic()
+
+    @property
+    def is_empty(self):
+        with self._lock:
+            return self._ack >= (self._segment, self._file.tell())
+
+    def peek(self, max_records):
+        """
+        Up to max_records records from the acknowledged position, as (position after the record, record).
+        """
+        entries, skipped = [], None
+        with self._lock:
+            segment, offset = self._ack
+            for current in self._segments():
+                if current < segment:
+                    continue
+                with open(self._segment_path(current), 'rb') as f:
+                    if current == segment:
+                        f.seek(offset)
+                    position = f.tell()
+                    for line in f:
+                        position += len(line)
+                        record = self._decode(line)
+                        if record is None:
+                            if current == self._segment and not line.endswith(b'\n'):
+                                break  # Being written
+                            logger.error(f'Skipping a damaged record in {self._segment_path(current)}')
+                            if not entries:
+                                skipped = (current, position)
+                            continue
+                        entries.append(((current, position), record))
+                        if len(entries) >= max_records:
+                            return entries
+            if not entries and skipped:
+                # Only damaged records are left: acknowledge them, so the spool can be empty again
+                self.ack(skipped)
+        return entries
+
+    def ack(self, position):
+        """
+        Mark everything up to position (from peek()) as posted.
+        """
+        with self._lock:
+            self._ack = tuple(position)
+            write_json_atomic(self._ack_path, dict(segment=position[0], offset=position[1]))
+            for segment in self._segments():
+                if segment < position[0] or (segment == position[0] and segment != self._segment
+                                             and position[1] >= os.path.getsize(self._segment_path(segment))):
+                    os.remove(self._segment_path(segment))
+
+    def next_batch(self):
+        """
+        The oldest records that can be posted together: consecutive records for the same endpoint,
+        up to batch_size observations. Returns (kind, sensor_type, [(position, observations)]), or None.
+        """
+        entries = self.peek(self.batch_size)
+        if not entries:
+            return None
+        kind, sensor_type = entries[0][1]['kind'], entries[0][1]['sensor_type']
+        batch, count = [], 0
+        for position, record in entries:
+            observations = record['payload'] if isinstance(record['payload'], list) else [record['payload']]
+            if batch and ((record['kind'], record['sensor_type']) != (kind, sensor_type)
+                          or count + len(observations) > self.batch_size):
+                break
+            batch.append((position, observations))
+            count += len(observations)
+        return kind, sensor_type, batch
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                if self.fsync != 'never':
+                    os.fsync(self._file.fileno())
+                self._file.close()
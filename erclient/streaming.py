@@ -0,0 +1,140 @@
+"""
+Incremental parsing of paginated ER responses, so a page can be consumed while it downloads.
+"""
+import codecs
+import json
+
+RESULTS_PATHS = (('results',), ('data', 'results'))
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+
+class ResultsStreamParser(object):
+    """
+    Push parser for a paginated response body such as {"data": {"next": ..., "results": [...]}}.
+
+    feed() takes the body in chunks of bytes and returns the items of the `results` array that
+    are complete so far, so only the item being downloaded is buffered. Everything around the
+    array (count, next, previous, status) is kept and available as `envelope` once close() has
+    been called, with `results` left empty.
+
+    Items are decoded with the standard library json decoder, whatever codec the client uses.
+    """
+
+    def __init__(self, results_paths=RESULTS_PATHS):
+        """
+        :param results_paths: Key paths of the array to stream, from the top-level object.
+        """
+        self.results_paths = results_paths
+        self.envelope = None
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._envelope = []
+        self._stack = []  # [container, current key] for each open object or array
+        self._expect_key = False
+        self._in_string = False
+        self._escape = False
+        self._key = None  # characters of the object key being read
+        self._in_results = False
+
+    @property
+    def page(self):
+        """
+        The envelope unwrapped like the clients unwrap responses (its `data`, if any).
+        """
+        if isinstance(self.envelope, dict):
+            return self.envelope.get('data', self.envelope)
+        return self.envelope
+
+    def feed(self, chunk):
+        """
+        Parse the next chunk of the body and return the results items it completed.
+        """
+        self._buffer += self._text.decode(chunk)
+        return self._parse(final=False)
+
+    def close(self):
+        """
+        Finish parsing, return the last results items and set `envelope`.
+
+        :raises ValueError: if the body is not valid JSON or is truncated
+        """
+        self._buffer += self._text.decode(b'', final=True)
+        items = self._parse(final=True)
+        if self._stack or self._in_results or self._in_string:
+            raise ValueError('Truncated JSON response body')
+        self.envelope = json.loads(''.join(self._envelope))
+        return items
+
+    def _parse(self, final):
+        items = []
+        buffer = self._buffer
+        end = len(buffer)
+        pos = 0
+        while pos < end:
+            char = buffer[pos]
+            if self._in_results:
+                if char in _WHITESPACE or char == ',':
+                    pos += 1
+                    continue
+                if char == ']':
+                    self._in_results = False
+                    self._envelope.append(char)
+                    pos += 1
+                    continue
+                try:
+                    item, item_end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break  # the item continues in the next chunk
+                if item_end >= end or buffer[item_end] not in _DELIMITERS:
+                    # A number at the end of the chunk may not be complete (1 -> 1.5)
+                    if not final:
+                        break
+                    if item_end < end:
+                        raise ValueError(f'Invalid JSON in response results at {buffer[item_end:item_end + 20]!r}')
+                items.append(item)
+                pos = item_end
+                continue
+
+            pos += 1
+            if self._in_string:
+                if self._key is not None:
+                    self._key.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key is not None:
+                        self._stack[-1][1] = json.loads('"' + ''.join(self._key))
+                        self._key = None
+            elif char == '"':
+                self._in_string = True
+                if self._expect_key:
+                    self._key = []
+                    self._expect_key = False
+            elif char == '{':
+                self._stack.append(['{', None])
+                self._expect_key = True
+            elif char == '[':
+                if self._results_path() in self.results_paths:
+                    self._in_results = True
+                else:
+                    self._stack.append(['[', None])
+            elif char in '}]':
+                self._stack.pop()
+            elif char == ',':
+                self._expect_key = bool(self._stack) and self._stack[-1][0] == '{'
+            self._envelope.append(char)
+
+        self._buffer = buffer[pos:]
+        return items
+
+    def _results_path(self):
+        if any(container != '{' for container, _ in self._stack):
+            return None
+        return tuple(key for _, key in self._stack)
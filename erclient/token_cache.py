@@ -0,0 +1,182 @@
+"""
+On-disk token store shared by every process that talks to the same ER site.
+
+Entries are keyed by service root, client id and username, so short-lived workers
+can reuse a token obtained by another process instead of logging in again.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_TOKEN_CACHE_PATH = os.path.join(
+    os.path.expanduser('~'), '.cache', 'erclient', 'tokens.json')
+
+
+class FileTokenCache(object):
+    """
+    A JSON file of tokens guarded by an exclusive lock file.
+
+    The lock is held by at most one process (and one owner within it) at a time and is
+    re-entrant, so a client can hold it across "check the cache, request a token, store it".
+    The owner is the calling thread, or any object passed as owner, so that a coroutine can
+    take the lock in one executor thread and release it from another.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: Location of the cache file. Defaults to ~/.cache/erclient/tokens.json.
+            The file is created with owner-only permissions since it holds credentials.
+        """
+        self.path = path or DEFAULT_TOKEN_CACHE_PATH
+        self.lock_path = f'{self.path}.lock'
+        self._state = threading.Condition()
+        self._owner = None
+        self._lock_depth = 0
+        self._lock_file = None
+
+    @staticmethod
+    def make_key(service_root, client_id, username):
+        raw = '\n'.join(str(part or '') for part in (service_root, client_id, username))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @contextmanager
+    def locked(self, owner=None):
+        self.acquire(owner)
+        try:
+            yield self
+        finally:
+            self.release(owner)
+
+    def acquire(self, owner=None):
+        """
+        Wait for the lock and take it for owner (default: the calling thread).
+        """
+        owner = threading.get_ident() if owner is None else owner
+        with self._state:
+            while self._lock_depth and self._owner != owner:
+                self._state.wait()
+            self._lock_depth += 1
+            if self._lock_depth > 1:
+                return
+            self._owner = owner
+        try:
+            self._acquire_file_lock()
+        except BaseException:
+            with self._state:
+                self._lock_depth = 0
+                self._owner = None
+                self._state.notify_all()
+            raise
+
+    def release(self, owner=None):
+        owner = threading.get_ident() if owner is None else owner
+        with self._state:
+            if not self._lock_depth or self._owner != owner:
+                raise RuntimeError('The token cache lock is not held by this owner')
+            self._lock_depth -= 1
+            if self._lock_depth:
+                return
+            try:
+                self._release_file_lock()
+            finally:
+                self._owner = None
+                self._state.notify_all()
+
+    def load(self, key, owner=None):
+        """
+        Return (auth, auth_expires) for the key, or None if there is no unexpired token.
+        """
+        with self.locked(owner):
+            entry = self._read().get(key)
+        if not entry:
+            return None
+        try:
+            auth_expires = datetime.fromisoformat(entry['auth_expires'])
+            auth = entry['auth']
+        except (KeyError, TypeError, ValueError):
+            return None
+        if auth_expires <= datetime.now(tz=timezone.utc):
+            return None
+        return auth, auth_expires
+
+    def store(self, key, auth, auth_expires, owner=None):
+        with self.locked(owner):
+            entries = self._read()
+            entries[key] = {'auth': auth, 'auth_expires': auth_expires.isoformat()}
+            self._write(self._drop_expired(entries))
+
+    def delete(self, key):
+        with self.locked():
+            entries = self._read()
+            if entries.pop(key, None) is not None:
+                self._write(entries)
+
+    def _drop_expired(self, entries):
+        now = datetime.now(tz=timezone.utc)
+        fresh = {}
+        for key, entry in entries.items():
+            try:
+                if datetime.fromisoformat(entry['auth_expires']) > now:
+                    fresh[key] = entry
+            except (KeyError, TypeError, ValueError):
+                continue
+        return fresh
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        # Write to a temporary file and swap it in, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tokens-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _acquire_file_lock(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        lock_file = open(self.lock_path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        except BaseException:
+            lock_file.close()
+            raise
+        self._lock_file = lock_file
+
+    def _release_file_lock(self):
+        lock_file, self._lock_file = self._lock_file, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            lock_file.close()
@@ -0,0 +1,175 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import respx
+
+from erclient.client import AsyncERClient
+
+
+@pytest.fixture
+def token_response():
+    return {
+        "access_token": "new-access-token",
+        "refresh_token": "new-refresh-token",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+    }
+
+
+@pytest.fixture
+def er_client_with_expired_token(er_server_info):
+    server_info = {k: v for k, v in er_server_info.items() if k != "token"}
+    client = AsyncERClient(**server_info)
+    client.auth = {
+        "access_token": "old-access-token",
+        "refresh_token": "old-refresh-token",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+    }
+    client.auth_expires = datetime.now(tz=timezone.utc) - timedelta(seconds=1)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_token_refresh(er_client_with_expired_token, er_server_info, token_response):
+    er_client = er_client_with_expired_token
+    async with respx.mock(assert_all_called=False) as respx_mock:
+        async def slow_token(request):
+            await asyncio.sleep(0.05)
+            return httpx.Response(httpx.codes.OK, json=token_response)
+
+        token_route = respx_mock.post(er_server_info["token_url"])
+        token_route.side_effect = slow_token
+        me_route = respx_mock.get(f'{er_client._api_root("v1.0")}/user/me')
+        me_route.return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {"username": "test"}})
+
+        results = await asyncio.gather(*[er_client.get_me() for _ in range(50)])
+
+        assert token_route.call_count == 1
+        assert me_route.call_count == 50
+        assert all(r == {"username": "test"} for r in results)
+        for call in me_route.calls:
+            assert call.request.headers["Authorization"] == "Bearer new-access-token"
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_falls_back_to_single_login(er_client_with_expired_token, er_server_info, token_response):
+    er_client = er_client_with_expired_token
+    async with respx.mock(assert_all_called=False) as respx_mock:
+        token_route = respx_mock.post(er_server_info["token_url"])
+        token_route.side_effect = (
+            httpx.Response(httpx.codes.BAD_REQUEST, json={"error": "invalid_grant"}),
+            httpx.Response(httpx.codes.OK, json=token_response),
+        )
+        me_route = respx_mock.get(f'{er_client._api_root("v1.0")}/user/me')
+        me_route.return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {"username": "test"}})
+
+        # The first token request fails with an error, which is propagated to every waiter
+        results = await asyncio.gather(*[er_client.get_me() for _ in range(10)], return_exceptions=True)
+        assert token_route.call_count == 1
+        assert all(isinstance(r, Exception) for r in results)
+
+        # The next call logs in again, once
+        results = await asyncio.gather(*[er_client.get_me() for _ in range(10)])
+        assert token_route.call_count == 2
+        assert b"grant_type=password" in token_route.calls.last.request.content
+        assert all(r == {"username": "test"} for r in results)
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_token_is_refreshed_in_background_before_expiry(er_client_with_expired_token, er_server_info, token_response):
+    er_client = er_client_with_expired_token
+    # Still valid, but within the refresh margin
+    er_client.auth_expires = datetime.now(tz=timezone.utc) + timedelta(seconds=30)
+    async with respx.mock(assert_all_called=False) as respx_mock:
+        token_route = respx_mock.post(er_server_info["token_url"])
+        token_route.return_value = httpx.Response(
+            httpx.codes.OK, json=token_response)
+        me_route = respx_mock.get(f'{er_client._api_root("v1.0")}/user/me')
+        me_route.return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {"username": "test"}})
+
+        await asyncio.gather(*[er_client.get_me() for _ in range(5)])
+
+        # Requests didn't wait for the refresh, they used the current token
+        for call in me_route.calls:
+            assert call.request.headers["Authorization"] == "Bearer old-access-token"
+
+        await er_client._auth_renewal
+        assert token_route.call_count == 1
+        assert b"grant_type=refresh_token" in token_route.calls.last.request.content
+        assert er_client.auth["access_token"] == "new-access-token"
+
+        await er_client.get_me()
+        assert me_route.calls.last.request.headers["Authorization"] == "Bearer new-access-token"
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_background_refresh_keeps_current_token(er_client_with_expired_token, er_server_info):
+    er_client = er_client_with_expired_token
+    auth_expires = datetime.now(tz=timezone.utc) + timedelta(seconds=30)
+    er_client.auth_expires = auth_expires
+    async with respx.mock(assert_all_called=False) as respx_mock:
+        token_route = respx_mock.post(er_server_info["token_url"])
+        token_route.return_value = httpx.Response(
+            httpx.codes.SERVICE_UNAVAILABLE, json={})
+        me_route = respx_mock.get(f'{er_client._api_root("v1.0")}/user/me')
+        me_route.return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {"username": "test"}})
+
+        await er_client.get_me()
+        await er_client._auth_renewal
+
+        assert token_route.called
+        assert er_client.auth["access_token"] == "old-access-token"
+        assert er_client.auth_expires == auth_expires
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_background_refresh_backs_off(er_client_with_expired_token, er_server_info):
+    er_client = er_client_with_expired_token
+    er_client.auth_expires = datetime.now(tz=timezone.utc) + timedelta(seconds=30)
+    async with respx.mock(assert_all_called=False) as respx_mock:
+        token_route = respx_mock.post(er_server_info["token_url"])
+        token_route.return_value = httpx.Response(
+            httpx.codes.SERVICE_UNAVAILABLE, json={})
+
+        await er_client.auth_headers()
+        await er_client._auth_renewal
+        attempts = token_route.call_count
+        assert attempts
+
+        for _ in range(20):
+            assert (await er_client.auth_headers())["Authorization"] == "Bearer old-access-token"
+        await er_client._auth_renewal
+        assert token_route.call_count == attempts
+
+        # Once the backoff has passed, the next request tries again
+        er_client._auth_renewal_failed_at -= er_client.MAX_AUTH_RENEWAL_BACKOFF_SECONDS
+        await er_client.auth_headers()
+        await er_client._auth_renewal
+        assert token_route.call_count == 2 * attempts
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_static_token_is_never_refreshed(er_client, er_server_info):
+    async with respx.mock(assert_all_called=False) as respx_mock:
+        token_route = respx_mock.post(er_server_info["token_url"])
+        me_route = respx_mock.get(f'{er_client._api_root("v1.0")}/user/me')
+        me_route.return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {"username": "test"}})
+
+        await er_client.get_me()
+
+        assert not token_route.called
+        assert er_client._auth_renewal is None
+        await er_client.close()
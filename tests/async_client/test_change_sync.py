@@ -0,0 +1,45 @@
+import httpx
+import pytest
+import respx
+
+from erclient import AsyncChangeSync
+
+
+def _page(results):
+    return httpx.Response(httpx.codes.OK, json={"data": {"next": None, "results": results}})
+
+
+@pytest.mark.asyncio
+async def test_observations_sync_fetches_deltas(er_client):
+    first = [{"id": "o1", "created_at": "2024-01-01T10:00:00+00:00"}]
+    second = [{"id": "o1", "created_at": "2024-01-01T10:00:00+00:00"},
+              {"id": "o2", "created_at": "2024-01-01T10:01:00+00:00"}]
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("observations")
+        route.side_effect = [_page(first), _page(second)]
+        sync = AsyncChangeSync(er_client)
+        assert [o async for o in sync.observations(source_id="source-1")] == first
+        assert "created_after" not in route.calls[0].request.url.params
+        assert [o async for o in sync.observations(source_id="source-1")] == [second[1]]
+        assert route.calls[1].request.url.params["created_after"] == "2024-01-01T09:58:00+00:00"
+        assert route.calls[1].request.url.params["source_id"] == "source-1"
+    await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_run_keeps_the_watermark(er_client):
+    events = [{"id": "e1", "updated_at": "2024-01-01T10:00:00+00:00"},
+              {"id": "e2", "updated_at": "2024-01-01T10:01:00+00:00"}]
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        respx_mock.get("activity/events").side_effect = [_page(events), _page(events)]
+        sync = AsyncChangeSync(er_client)
+        run = sync.events()
+        assert await run.__anext__() == events[0]
+        await run.aclose()
+        assert sync.stream("events").watermark is None
+        assert [e async for e in sync.events()] == events
+    await er_client.close()
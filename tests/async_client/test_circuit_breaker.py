@@ -0,0 +1,102 @@
+from unittest import mock
+
+import httpx
+import pytest
+import respx
+
+from erclient import (CircuitBreaker, ERClientInternalError,
+                      ERClientServiceUnreachable)
+from erclient.client import AsyncERClient
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(failure_threshold=3, recovery_timeout=30)
+
+
+@pytest.fixture
+def er_client(er_server_info, breaker):
+    return AsyncERClient(**er_server_info, circuit_breaker=breaker)
+
+
+@pytest.mark.asyncio
+async def test_fails_fast_once_open(er_client, breaker, report):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('activity/events')
+        route.side_effect = (
+            httpx.Response(httpx.codes.BAD_GATEWAY, json={}),
+            httpx.ConnectError("connection refused"),
+            httpx.Response(httpx.codes.GATEWAY_TIMEOUT, json={}),
+        )
+
+        for _ in range(3):
+            with pytest.raises(Exception):
+                await er_client.post_report(report)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        with pytest.raises(ERClientServiceUnreachable):
+            await er_client.post_report(report)
+        assert route.call_count == 3
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_other_errors_do_not_open_the_circuit(er_client, breaker, report):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('activity/events')
+        route.return_value = httpx.Response(httpx.codes.INTERNAL_SERVER_ERROR, json={})
+
+        for _ in range(5):
+            with pytest.raises(ERClientInternalError):
+                await er_client.post_report(report)
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert route.call_count == 5
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_recovers_after_a_successful_status_probe(er_client, breaker, report):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        status_route = respx_mock.get('status')
+        status_route.side_effect = (
+            httpx.Response(httpx.codes.SERVICE_UNAVAILABLE, json={}),
+            httpx.Response(httpx.codes.OK, json={"data": {}}),
+        )
+        route = respx_mock.post('activity/events')
+        route.return_value = httpx.Response(httpx.codes.CREATED, json={"data": {"id": "1"}})
+
+        with mock.patch("erclient.circuit_breaker.time.monotonic", return_value=100):
+            for _ in range(3):
+                breaker.record_failure()
+
+        with mock.patch("erclient.circuit_breaker.time.monotonic", return_value=131):
+            # The probe fails: stay open and don't send the report
+            with pytest.raises(ERClientServiceUnreachable):
+                await er_client.post_report(report)
+            assert breaker.state == CircuitBreaker.OPEN
+            assert not route.called
+
+        with mock.patch("erclient.circuit_breaker.time.monotonic", return_value=162):
+            assert await er_client.post_report(report) == {"id": "1"}
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert status_route.call_count == 2
+        assert route.call_count == 1
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_true_shares_one_per_service_root(er_server_info):
+    first = AsyncERClient(**er_server_info, circuit_breaker=True)
+    second = AsyncERClient(**er_server_info, circuit_breaker=True)
+    assert first.circuit_breaker is second.circuit_breaker
+    assert first.circuit_breaker is CircuitBreaker.for_service(first.service_root)
+    await first.close()
+    await second.close()
@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from erclient import AsyncERClient
+
+
+@pytest.fixture
+def er_client(er_server_info):
+    return AsyncERClient(coalesce_requests=True, **er_server_info)
+
+
+def _slow_response(json):
+    async def side_effect(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(httpx.codes.OK, json=json)
+    return side_effect
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_gets_share_one_request(er_client):
+    source = {"id": "4a2a5a1c", "manufacturer_id": "018910980"}
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("source/018910980/")
+        route.side_effect = _slow_response({"data": source})
+        results = await asyncio.gather(
+            *[er_client.get_source_by_manufacturer_id("018910980") for _ in range(50)])
+        assert route.call_count == 1
+        assert all(result == source for result in results)
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_different_params_are_not_coalesced(er_client):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("activity/events/categories")
+        route.side_effect = _slow_response({"data": []})
+        await asyncio.gather(er_client.get_event_categories(include_inactive=True),
+                             er_client.get_event_categories(include_inactive=False),
+                             er_client.get_event_categories(include_inactive=False))
+        assert route.call_count == 2
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_gets_after_a_write_do_not_join_earlier_gets(er_client):
+    subject_id = "d8ad9955-8301-43c4-9000-9a02f1cba675"
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get(f"subject/{subject_id}/sources")
+        route.side_effect = _slow_response({"data": []})
+        respx_mock.patch(f"subject/{subject_id}").return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {}})
+
+        before_write = asyncio.ensure_future(er_client.get_subject_sources(subject_id))
+        await asyncio.sleep(0.01)
+        await er_client.patch_subject(subject_id, {"is_active": False})
+        await asyncio.gather(before_write, er_client.get_subject_sources(subject_id))
+        assert route.call_count == 2
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_gets_are_not_coalesced_by_default(er_server_info):
+    er_client = AsyncERClient(**er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("source/018910980/")
+        route.side_effect = _slow_response({"data": {}})
+        await asyncio.gather(*[er_client.get_source_by_manufacturer_id("018910980") for _ in range(3)])
+        assert route.call_count == 3
+        await er_client.close()
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+import respx
+
+from erclient.client import AsyncERClient
+
+
+@pytest.mark.asyncio
+async def test_default_transport_uses_http1_and_default_limits(er_server_info):
+    with patch("erclient.client.httpx.AsyncHTTPTransport", wraps=httpx.AsyncHTTPTransport) as transport:
+        er_client = AsyncERClient(**er_server_info)
+
+    kwargs = transport.call_args[1]
+    assert kwargs["http2"] is False
+    assert kwargs["retries"] == AsyncERClient.DEFAULT_CONNECTION_RETRIES
+    assert kwargs["limits"] == httpx.Limits(
+        max_connections=AsyncERClient.DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections=AsyncERClient.DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=AsyncERClient.DEFAULT_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    assert er_client._http_session.timeout.pool == AsyncERClient.DEFAULT_CONNECT_TIMEOUT_SECONDS
+    await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_http2_and_pool_limits_are_configurable(er_server_info):
+    pytest.importorskip("h2")
+    with patch("erclient.client.httpx.AsyncHTTPTransport", wraps=httpx.AsyncHTTPTransport) as transport:
+        er_client = AsyncERClient(**er_server_info, http2=True, max_connections=10,
+                                  max_keepalive_connections=5, keepalive_expiry=30, pool_timeout=60)
+
+    kwargs = transport.call_args[1]
+    assert kwargs["http2"] is True
+    assert kwargs["limits"] == httpx.Limits(
+        max_connections=10, max_keepalive_connections=5, keepalive_expiry=30)
+    assert er_client._http_session.timeout.pool == 60
+
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get('user/me')
+        route.return_value = httpx.Response(httpx.codes.OK, json={"data": {"username": "test"}})
+        assert await er_client.get_me() == {"username": "test"}
+    await er_client.close()
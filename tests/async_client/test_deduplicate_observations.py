@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import respx
+
+from erclient import ObservationDeduplicator
+from erclient.client import AsyncERClient
+
+
+def _observation(i):
+    return {"manufacturer_id": "collar-1", "recorded_at": f"2023-01-11T19:41:{i:02d}+00:00"}
+
+
+@pytest.mark.asyncio
+async def test_already_posted_observations_are_not_sent_again(er_server_info, tmp_path):
+    path = str(tmp_path / "posted.json")
+    er_client = AsyncERClient(**er_server_info, deduplicate_observations=path)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        posted = []
+
+        def record(request):
+            posted.append(json.loads(request.content))
+            return httpx.Response(httpx.codes.CREATED, json={"data": {}})
+
+        respx_mock.post(f'sensors/generic/{er_client.provider_key}/status').side_effect = record
+        await er_client.post_sensor_observation(_observation(0))
+        assert await er_client.post_sensor_observation(_observation(0)) is None
+        await er_client.post_sensor_observation([_observation(0), _observation(1)])
+        assert posted == [_observation(0), [_observation(1)]]
+        await er_client.close()
+
+        # Replayed after a restart
+        er_client = AsyncERClient(**er_server_info, deduplicate_observations=path)
+        assert er_client.observation_deduplicator.size == 2
+        assert await er_client.post_sensor_observation([_observation(0), _observation(1)]) is None
+        assert len(posted) == 2
+    await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_batched_observations_are_deduplicated(er_server_info):
+    er_client = AsyncERClient(**er_server_info, batch_observations={"max_latency": 0.01},
+                              deduplicate_observations=ObservationDeduplicator())
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        posted = []
+
+        def record(request):
+            observations = json.loads(request.content)
+            posted.append(observations)
+            return httpx.Response(httpx.codes.CREATED, json={"data": [
+                {"id": o["recorded_at"]} for o in observations]})
+
+        respx_mock.post(f'sensors/generic/{er_client.provider_key}/status').side_effect = record
+        er_client.observation_deduplicator.mark([_observation(2)])
+        observations = [_observation(i % 2) for i in range(4)] + [_observation(2)]
+        results = await asyncio.gather(*[er_client.post_sensor_observation(o) for o in observations])
+        assert posted == [[_observation(0), _observation(1)]]
+        assert er_client.observation_deduplicator.duplicates == 3
+        # Each caller gets the result of its own observation, or None when it was posted before
+        assert results == [{"id": o["recorded_at"]} for o in observations[:4]] + [None]
+    await er_client.close()
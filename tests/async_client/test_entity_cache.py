@@ -0,0 +1,182 @@
+import httpx
+import pytest
+import respx
+
+from erclient import AsyncERClient, EntityCache, ERClientBadRequest, ERClientNotFound
+
+SOURCE_ID = "4a2a5a1c-3b4f-4a3e-9a5e-0c1e2f3a4b5c"
+SUBJECT_ID = "d8ad9955-8301-43c4-9000-9a02f1cba675"
+
+
+@pytest.fixture
+def er_client(er_server_info):
+    return AsyncERClient(entity_cache=True, **er_server_info)
+
+
+@pytest.fixture
+def source():
+    return {"id": SOURCE_ID, "manufacturer_id": "018910980", "source_type": "tracking-device"}
+
+
+@pytest.fixture
+def subjects():
+    return [{"id": SUBJECT_ID, "name": "MMVessel", "is_active": True}]
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_cached(er_client, source, subjects):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        source_route = respx_mock.get("source/018910980/")
+        source_route.return_value = httpx.Response(httpx.codes.OK, json={"data": source})
+        subjects_route = respx_mock.get(f"source/{SOURCE_ID}/subjects")
+        subjects_route.return_value = httpx.Response(httpx.codes.OK, json={"data": subjects})
+        sources_route = respx_mock.get(f"subject/{SUBJECT_ID}/sources")
+        sources_route.return_value = httpx.Response(httpx.codes.OK, json={"data": [source]})
+
+        for _ in range(3):
+            assert await er_client.get_source_by_manufacturer_id("018910980") == source
+            assert await er_client.get_source_subjects(SOURCE_ID) == subjects
+            assert await er_client.get_subject_sources(SUBJECT_ID) == [source]
+
+        assert source_route.call_count == subjects_route.call_count == sources_route.call_count == 1
+        stats = er_client.entity_cache.stats()
+        assert stats["get_source_by_manufacturer_id"]["hits"] == 2
+        assert stats["get_source_by_manufacturer_id"]["misses"] == 1
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_not_found_is_cached(er_client):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("source/unknown/")
+        route.return_value = httpx.Response(httpx.codes.NOT_FOUND, json={})
+        for _ in range(2):
+            with pytest.raises(ERClientNotFound):
+                await er_client.get_source_by_manufacturer_id("unknown")
+        assert route.call_count == 1
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_patch_subject_invalidates_subject_lookups(er_client, source, subjects):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        subjects_route = respx_mock.get(f"source/{SOURCE_ID}/subjects")
+        subjects_route.side_effect = [
+            httpx.Response(httpx.codes.OK, json={"data": subjects}),
+            httpx.Response(httpx.codes.OK, json={"data": [{**subjects[0], "is_active": False}]}),
+        ]
+        sources_route = respx_mock.get(f"subject/{SUBJECT_ID}/sources")
+        sources_route.return_value = httpx.Response(httpx.codes.OK, json={"data": [source]})
+        respx_mock.patch(f"subject/{SUBJECT_ID}").return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {**subjects[0], "is_active": False}})
+
+        await er_client.get_source_subjects(SOURCE_ID)
+        await er_client.get_subject_sources(SUBJECT_ID)
+        await er_client.patch_subject(SUBJECT_ID, {"is_active": False})
+
+        assert (await er_client.get_source_subjects(SOURCE_ID))[0]["is_active"] is False
+        await er_client.get_subject_sources(SUBJECT_ID)
+        assert subjects_route.call_count == sources_route.call_count == 2
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_delete_source_invalidates_source_lookups(er_client, source, subjects):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        source_route = respx_mock.get("source/018910980/")
+        source_route.side_effect = [
+            httpx.Response(httpx.codes.OK, json={"data": source}),
+            httpx.Response(httpx.codes.NOT_FOUND, json={}),
+        ]
+        respx_mock.get(f"source/{SOURCE_ID}/subjects").return_value = httpx.Response(
+            httpx.codes.OK, json={"data": subjects})
+        respx_mock.delete(f"source/{SOURCE_ID}/").return_value = httpx.Response(httpx.codes.NO_CONTENT)
+
+        await er_client.get_source_by_manufacturer_id("018910980")
+        await er_client.get_source_subjects(SOURCE_ID)
+        await er_client.delete_source(SOURCE_ID)
+
+        with pytest.raises(ERClientNotFound):
+            await er_client.get_source_by_manufacturer_id("018910980")
+        assert er_client.entity_cache.stats()["get_source_subjects"]["size"] == 0
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_group_membership_changes_invalidate_subjects(er_server_info, subjects):
+    cache = EntityCache()
+    er_client = AsyncERClient(entity_cache=cache, **er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get(f"source/{SOURCE_ID}/subjects")
+        route.return_value = httpx.Response(httpx.codes.OK, json={"data": subjects})
+        respx_mock.post("subjectgroup/group-1/subjects/").return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {}})
+        respx_mock.delete("subjectgroup/group-1/subjects/").return_value = httpx.Response(httpx.codes.NO_CONTENT)
+
+        await er_client.get_source_subjects(SOURCE_ID)
+        await er_client.add_subjects_to_subjectgroup("group-1", [{"id": SUBJECT_ID}])
+        await er_client.get_source_subjects(SOURCE_ID)
+        await er_client.remove_subjects_from_subjectgroup("group-1", [{"id": SUBJECT_ID}])
+        await er_client.get_source_subjects(SOURCE_ID)
+        assert route.call_count == 3
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_group_membership_errors_are_not_masked_by_malformed_subjects(er_client):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        respx_mock.post("subjectgroup/group-1/subjects/").return_value = httpx.Response(
+            httpx.codes.BAD_REQUEST, json={"status": {"code": 400, "detail": "id is required"}})
+        respx_mock.delete("subjectgroup/group-1/subjects/").return_value = httpx.Response(
+            httpx.codes.BAD_REQUEST, json={"status": {"code": 400, "detail": "id is required"}})
+        with pytest.raises(ERClientBadRequest):
+            await er_client.add_subjects_to_subjectgroup("group-1", [{"name": "MMVessel"}])
+        with pytest.raises(ERClientBadRequest):
+            await er_client.remove_subjects_from_subjectgroup("group-1", ["not-a-dict"])
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_posting_observations_forgets_missing_sources(er_client, source):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("source/018910980/")
+        route.side_effect = [httpx.Response(httpx.codes.NOT_FOUND, json={}),
+                             httpx.Response(httpx.codes.OK, json={"data": source})]
+        respx_mock.post("observations").return_value = httpx.Response(httpx.codes.CREATED, json={"data": {}})
+
+        with pytest.raises(ERClientNotFound):
+            await er_client.get_source_by_manufacturer_id("018910980")
+        # ER creates the source for the first observation posted for it
+        await er_client.post_observation(
+            {"source": "018910980", "recorded_at": "2023-01-01T00:00:00Z", "location": {"lat": 1, "lon": 2}})
+        assert await er_client.get_source_by_manufacturer_id("018910980") == source
+        assert route.call_count == 2
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_not_cached_by_default(er_server_info, source):
+    er_client = AsyncERClient(**er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("source/018910980/")
+        route.return_value = httpx.Response(httpx.codes.OK, json={"data": source})
+        await er_client.get_source_by_manufacturer_id("018910980")
+        await er_client.get_source_by_manufacturer_id("018910980")
+        assert route.call_count == 2
+        await er_client.close()
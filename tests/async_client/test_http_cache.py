@@ -0,0 +1,62 @@
+import httpx
+import pytest
+import respx
+
+from erclient import AsyncERClient, ERClientNotFound
+
+
+@pytest.fixture
+def er_client_with_cache(er_server_info):
+    return AsyncERClient(http_cache=True, **er_server_info)
+
+
+@pytest.mark.asyncio
+async def test_event_types_are_revalidated(er_client_with_cache):
+    event_types = {"data": [{"value": "rainfall_rep", "display": "Rainfall"}]}
+    async with respx.mock(
+            base_url=er_client_with_cache._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get('activity/events/eventtypes')
+        route.side_effect = [
+            httpx.Response(httpx.codes.OK, json=event_types, headers={"ETag": 'W/"v1"'}),
+            httpx.Response(httpx.codes.NOT_MODIFIED),
+        ]
+        assert await er_client_with_cache.get_event_types() == event_types["data"]
+        assert await er_client_with_cache.get_event_types() == event_types["data"]
+        assert "If-None-Match" not in route.calls[0].request.headers
+        assert route.calls[1].request.headers["If-None-Match"] == 'W/"v1"'
+        assert er_client_with_cache.http_cache.hits == 1
+        await er_client_with_cache.close()
+
+
+@pytest.mark.asyncio
+async def test_feature_group_revalidation_with_last_modified(er_client_with_cache):
+    feature_group = {"data": {"id": "fg-1", "name": "Boundaries"}}
+    async with respx.mock(
+            base_url=er_client_with_cache._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get('spatialfeaturegroup/fg-1')
+        route.side_effect = [
+            httpx.Response(httpx.codes.OK, json=feature_group,
+                           headers={"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}),
+            httpx.Response(httpx.codes.NOT_MODIFIED),
+        ]
+        await er_client_with_cache.get_feature_group("fg-1")
+        assert await er_client_with_cache.get_feature_group("fg-1") == feature_group["data"]
+        assert route.calls[1].request.headers["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+        await er_client_with_cache.close()
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached(er_client_with_cache):
+    async with respx.mock(
+            base_url=er_client_with_cache._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get('activity/events/categories')
+        route.return_value = httpx.Response(httpx.codes.NOT_FOUND, json={})
+        for _ in range(2):
+            with pytest.raises(ERClientNotFound):
+                await er_client_with_cache.get_event_categories()
+        assert "If-None-Match" not in route.calls[1].request.headers
+        assert len(er_client_with_cache.http_cache) == 0
+        await er_client_with_cache.close()
@@ -0,0 +1,53 @@
+import json
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+import respx
+
+from erclient import AsyncERClient, JSONCodec
+
+
+class RecordingCodec(JSONCodec):
+    def __init__(self):
+        self.decoded = []
+
+    def loads(self, data):
+        self.decoded.append(data)
+        return super().loads(data)
+
+
+@pytest.mark.asyncio
+async def test_post_observation_serializes_datetimes(er_client, position, position_created_response):
+    recorded_at = datetime(2023, 1, 11, 17, 41, tzinfo=timezone.utc)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('observations')
+        route.return_value = httpx.Response(
+            httpx.codes.CREATED, json=position_created_response)
+        await er_client.post_observation({**position, "recorded_at": recorded_at})
+        request = route.calls[0].request
+        assert request.headers["Content-Type"] == "application/json"
+        assert json.loads(request.content)["recorded_at"] == recorded_at.isoformat()
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_custom_codec_decodes_response_bytes(er_server_info, position):
+    codec = RecordingCodec()
+    er_client = AsyncERClient(json_codec=codec, **er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        respx_mock.post('observations').return_value = httpx.Response(
+            httpx.codes.CREATED, json={"data": {"id": "abc"}})
+        response = await er_client.post_observation(position)
+        assert response == {"id": "abc"}
+        assert codec.decoded and isinstance(codec.decoded[0], bytes)
+        await er_client.close()
+
+
+def test_unknown_codec_name_is_rejected(er_server_info):
+    with pytest.raises(ValueError):
+        AsyncERClient(json_codec="yaml", **er_server_info)
@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import respx
+
+from erclient import ERClientBadRequest
+from erclient.client import AsyncERClient
+
+
+def _position(position, i):
+    return {**position, "manufacturer_id": f"collar-{i}", "recorded_at": f"2023-01-11T19:41:{i:02d}+02:00"}
+
+
+def _record(posted, response_data):
+    def record(request):
+        posted.append(json.loads(request.content))
+        return httpx.Response(httpx.codes.CREATED, json={"data": response_data})
+    return record
+
+
+@pytest.mark.asyncio
+async def test_concurrent_posts_are_batched_by_size(er_server_info, position):
+    er_client = AsyncERClient(**er_server_info, batch_observations={"max_batch_size": 3, "max_latency": 10})
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        posted = []
+        route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        route.side_effect = _record(posted, {"accepted": True})
+        positions = [_position(position, i) for i in range(6)]
+        results = await asyncio.gather(*[er_client.post_sensor_observation(p) for p in positions])
+        assert results == [{"accepted": True}] * 6
+        assert posted == [positions[:3], positions[3:]]
+    await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_latency_bytes_and_sensor_types(er_server_info, position):
+    er_client = AsyncERClient(**er_server_info, batch_observations={"max_latency": 0.05, "max_batch_bytes": 1000})
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        generic, gps = [], []
+        respx_mock.post(f'sensors/generic/{er_client.provider_key}/status').side_effect = _record(
+            generic, [{"id": "a"}, {"id": "b"}])
+        respx_mock.post(f'sensors/gps/{er_client.provider_key}/status').side_effect = _record(gps, {"id": "c"})
+        batcher = er_client.observation_batcher
+        futures = [await batcher.submit(_position(position, i)) for i in range(2)]
+        futures.append(await batcher.submit(_position(position, 2), sensor_type="gps"))
+        assert not generic and batcher.pending == 3
+        # One answer per observation goes to each observation
+        assert await asyncio.gather(*futures) == [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+        assert len(generic) == 1 and len(gps) == 1
+
+        # A batch never grows past max_batch_bytes
+        size = len(er_client.json_codec.dumps(_position(position, 0)))
+        per_batch = 1000 // size
+        generic.clear()
+        futures = [await batcher.submit(_position(position, i)) for i in range(per_batch + 1)]
+        await batcher.flush()
+        assert [len(batch) for batch in generic] == [per_batch, 1]
+    await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_fails_every_observation_and_close_flushes(er_server_info, position):
+    er_client = AsyncERClient(**er_server_info, batch_observations={"max_latency": 10})
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        route.return_value = httpx.Response(httpx.codes.BAD_REQUEST, json={"status": {"detail": "bad"}})
+        futures = [await er_client.observation_batcher.submit(_position(position, i)) for i in range(2)]
+        await er_client.close()
+        assert route.call_count == 1
+        for future in futures:
+            with pytest.raises(ERClientBadRequest):
+                future.result()
+
+
+@pytest.mark.asyncio
+async def test_lists_and_scheduled_observations_are_not_batched(er_server_info, position, position_created_response):
+    er_client = AsyncERClient(**er_server_info, batch_observations=True, observation_interval=0)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        route.return_value = httpx.Response(httpx.codes.CREATED, json=position_created_response)
+        await er_client.post_sensor_observation([_position(position, 0), _position(position, 1)])
+        assert route.call_count == 1
+        await (await er_client.schedule_sensor_observation(_position(position, 2)))
+        assert route.call_count == 2
+        assert er_client.observation_batcher.pending == 0
+        assert json.loads(route.calls[-1].request.content)["manufacturer_id"] == "collar-2"
+    await er_client.close()
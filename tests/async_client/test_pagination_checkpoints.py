@@ -0,0 +1,63 @@
+import httpx
+import pytest
+import respx
+
+from erclient import AsyncERClient
+
+NEXT = "https://fake-site.erdomain.org/api/v1.0/activity/events?use_cursor=true&cursor={}"
+
+
+def _page(request):
+    page = int(request.url.params.get("cursor", 0))
+    return httpx.Response(httpx.codes.OK, json={"data": {
+        "next": NEXT.format(page + 1) if page < 2 else None,
+        "results": [{"id": f"{page}-{i}"} for i in range(2)],
+    }})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("options", [{}, {"prefetch_pages": 2}, {"batch_size": 2}])
+async def test_resume_events_from_checkpoint(er_server_info, options):
+    er_client = AsyncERClient(**er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("activity/events")
+        route.side_effect = _page
+        checkpoints = []
+        events = er_client.get_events(state="active", on_checkpoint=checkpoints.append, **options)
+        async for _ in events:
+            if len(checkpoints) == 2:
+                break
+        await events.aclose()
+        assert checkpoints[-1].pages == 2
+
+        resumed = [item async for item in er_client.get_events(
+            state="active", resume_from=checkpoints[-1].to_dict(), **options)]
+        expected = [{"id": "2-0"}, {"id": "2-1"}]
+        assert resumed == ([expected] if options.get("batch_size") else expected)
+        assert route.calls[-1].request.url.params["cursor"] == "2"
+        assert "resume_from" not in route.calls[-1].request.url.params
+        with pytest.raises(ValueError):
+            async for _ in er_client.get_events(state="done", resume_from=checkpoints[-1]):
+                pass
+    await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_checkpoints(er_client):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        respx_mock.get("observations").side_effect = [
+            httpx.Response(httpx.codes.OK, json={"data": {
+                "next": "https://fake-site.erdomain.org/api/v1.0/observations?use_cursor=true&cursor=abc",
+                "results": [{"id": 1}, {"id": 2}]}}),
+            httpx.Response(httpx.codes.OK, json={"data": {"next": None, "results": [{"id": 3}]}}),
+        ]
+        checkpoints = []
+        observations = [o async for o in er_client.get_observations(stream=True, on_checkpoint=checkpoints.append)]
+        assert len(observations) == 3
+        assert checkpoints[0].next_params["cursor"] == "abc"
+        assert checkpoints[-1].done and checkpoints[-1].items == 3
+    await er_client.close()
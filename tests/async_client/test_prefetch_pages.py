@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from erclient import AsyncERClient, ERClientInternalError
+
+NEXT = "https://fake-site.erdomain.org/api/v1.0/activity/events?use_cursor=true&cursor={}"
+
+
+def _pages(count):
+    return [
+        httpx.Response(httpx.codes.OK, json={"data": {
+            "next": NEXT.format(page + 1) if page + 1 < count else None,
+            "results": [{"id": f"{page}-{i}"} for i in range(2)],
+        }})
+        for page in range(count)
+    ]
+
+
+@pytest.fixture
+def er_client(er_server_info):
+    return AsyncERClient(prefetch_pages=2, **er_server_info)
+
+
+@pytest.mark.asyncio
+async def test_next_pages_are_fetched_while_consuming(er_client):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("activity/events")
+        route.side_effect = _pages(5)
+        events = er_client.get_events()
+        assert (await events.__anext__())["id"] == "0-0"
+        await asyncio.sleep(0.05)
+        # Two pages wait in the buffer and a third is fetched and waiting for room
+        assert route.call_count == 4
+        rest = [event["id"] async for event in events]
+        assert rest == ["0-1"] + [f"{page}-{i}" for page in range(1, 5) for i in range(2)]
+        assert route.calls[1].request.url.params["cursor"] == "1"
+        assert "prefetch_pages" not in route.calls[0].request.url.params
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_stopping_early_stops_prefetching(er_client):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("observations")
+        route.side_effect = _pages(20)
+        observations = er_client.get_observations()
+        await observations.__anext__()
+        await observations.aclose()
+        calls = route.call_count
+        await asyncio.sleep(0.05)
+        assert route.call_count == calls < 20
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_the_consumer_after_earlier_pages(er_client):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("activity/events")
+        route.side_effect = _pages(2)[:1] + [httpx.Response(httpx.codes.INTERNAL_SERVER_ERROR, json={})]
+        received = []
+        with pytest.raises(ERClientInternalError):
+            async for event in er_client.get_events():
+                received.append(event["id"])
+        assert received == ["0-0", "0-1"]
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_prefetch_per_call_in_batches(er_server_info):
+    er_client = AsyncERClient(**er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        respx_mock.get("activity/events").side_effect = _pages(3)
+        batches = [batch async for batch in er_client.get_events(prefetch_pages=1, batch_size=2)]
+        assert len(batches) == 3
+        await er_client.close()
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+import respx
+
+from erclient import RateLimiter
+from erclient.client import AsyncERClient
+
+
+@pytest.mark.asyncio
+async def test_requests_are_paced_per_endpoint_family(er_server_info, position, position_created_response):
+    limiter = RateLimiter(limits={"sensors/": (40, 1)})
+    er_client = AsyncERClient(**er_server_info, rate_limiter=limiter)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        sensors_route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        sensors_route.return_value = httpx.Response(
+            httpx.codes.CREATED, json=position_created_response)
+        me_route = respx_mock.get('user/me')
+        me_route.return_value = httpx.Response(httpx.codes.OK, json={"data": {}})
+
+        started = time.monotonic()
+        await asyncio.gather(*[er_client.get_me() for _ in range(10)])
+        # Unlimited endpoint family
+        assert time.monotonic() - started < 0.1
+
+        started = time.monotonic()
+        await asyncio.gather(*[er_client.post_sensor_observation(dict(position)) for _ in range(5)])
+        assert time.monotonic() - started >= 4 / 40 * 0.9
+        assert sensors_route.call_count == 5
+        await er_client.close()
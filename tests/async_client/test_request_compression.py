@@ -0,0 +1,86 @@
+import gzip
+import json
+
+import httpx
+import pytest
+import respx
+
+from erclient import AsyncERClient, ERClientBadRequest, RequestCompression
+
+
+@pytest.fixture
+def positions(position):
+    return [{**position, "manufacturer_id": f"device-{i}"} for i in range(100)]
+
+
+@pytest.mark.asyncio
+async def test_large_bodies_are_gzipped(er_server_info, positions, position_created_response):
+    er_client = AsyncERClient(compress_requests=True, **er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('observations')
+        route.return_value = httpx.Response(
+            httpx.codes.CREATED, json=position_created_response)
+        await er_client.post_observation(positions)
+        request = route.calls[0].request
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(request.content)) == positions
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_falls_back_when_server_rejects_compression(er_server_info, positions, position_created_response):
+    compression = RequestCompression(encoding="deflate", threshold=100)
+    er_client = AsyncERClient(compress_requests=compression, **er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('observations')
+        route.side_effect = [
+            httpx.Response(httpx.codes.UNSUPPORTED_MEDIA_TYPE, json={}),
+            httpx.Response(httpx.codes.CREATED, json=position_created_response),
+        ]
+        await er_client.post_observation(positions)
+        assert route.call_count == 2
+        assert route.calls[0].request.headers["Content-Encoding"] == "deflate"
+        assert "Content-Encoding" not in route.calls[1].request.headers
+        assert json.loads(route.calls[1].request.content) == positions
+        assert not compression.enabled
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_keeps_compressing_when_the_request_itself_is_bad(er_server_info, positions, bad_request_response):
+    er_client = AsyncERClient(compress_requests=True, **er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('observations')
+        route.return_value = httpx.Response(
+            httpx.codes.BAD_REQUEST, json=bad_request_response)
+        with pytest.raises(ERClientBadRequest):
+            await er_client.post_observation(positions)
+        assert route.call_count == 1
+        assert er_client.request_compression.enabled
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_falls_back_when_server_cannot_decode_compressed_body(er_server_info, positions,
+                                                                    position_created_response):
+    er_client = AsyncERClient(compress_requests=True, **er_server_info)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('observations')
+        route.side_effect = [
+            httpx.Response(httpx.codes.BAD_REQUEST, json={"status": {
+                "code": 400, "detail": "JSON parse error - 'utf-8' codec can't decode byte 0x8b in position 1"}}),
+            httpx.Response(httpx.codes.CREATED, json=position_created_response),
+        ]
+        await er_client.post_observation(positions)
+        assert route.call_count == 2
+        assert "Content-Encoding" not in route.calls[1].request.headers
+        assert not er_client.request_compression.enabled
+        await er_client.close()
@@ -0,0 +1,113 @@
+import httpx
+import pytest
+import respx
+
+from erclient import (ERClientException, ERClientInternalError,
+                      ERClientRateLimitExceeded, RetryPolicy)
+from erclient.client import AsyncERClient
+
+
+@pytest.fixture
+def retrying_er_client(er_server_info):
+    return AsyncERClient(**er_server_info, retry_policy=RetryPolicy(max_retries=3, backoff_factor=0))
+
+
+@pytest.mark.asyncio
+async def test_post_retries_after_429_honoring_retry_after(retrying_er_client, report):
+    er_client = retrying_er_client
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('activity/events')
+        route.side_effect = (
+            httpx.Response(httpx.codes.TOO_MANY_REQUESTS, headers={"Retry-After": "0"}, json={}),
+            httpx.Response(httpx.codes.CREATED, json={"data": {"id": "1"}}),
+        )
+
+        result = await er_client.post_report(report)
+
+        assert result == {"id": "1"}
+        assert route.call_count == 2
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried_on_internal_error(retrying_er_client, report):
+    er_client = retrying_er_client
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('activity/events')
+        route.return_value = httpx.Response(httpx.codes.INTERNAL_SERVER_ERROR, json={})
+
+        with pytest.raises(ERClientInternalError):
+            await er_client.post_report(report)
+
+        assert route.call_count == 1
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_get_is_retried_until_max_retries(retrying_er_client):
+    er_client = retrying_er_client
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get('user/me')
+        route.return_value = httpx.Response(httpx.codes.INTERNAL_SERVER_ERROR, json={})
+
+        with pytest.raises(ERClientInternalError):
+            await er_client.get_me()
+
+        assert route.call_count == 4
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_get_is_retried_on_request_errors(retrying_er_client):
+    er_client = retrying_er_client
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get('user/me')
+        route.side_effect = (
+            httpx.ReadTimeout("timed out"),
+            httpx.Response(httpx.codes.OK, json={"data": {"username": "test"}}),
+        )
+
+        assert await er_client.get_me() == {"username": "test"}
+        assert route.call_count == 2
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_long_retry_after_is_raised_to_the_caller(retrying_er_client, report):
+    er_client = retrying_er_client
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post('activity/events')
+        route.return_value = httpx.Response(
+            httpx.codes.TOO_MANY_REQUESTS, headers={"Retry-After": "3600"}, json={})
+
+        with pytest.raises(ERClientRateLimitExceeded) as exc_info:
+            await er_client.post_report(report)
+
+        assert exc_info.value.retry_after == 3600
+        assert route.call_count == 1
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_no_retries_by_default(er_client):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get('user/me')
+        route.return_value = httpx.Response(httpx.codes.SERVICE_UNAVAILABLE, json={})
+
+        with pytest.raises(ERClientException):
+            await er_client.get_me()
+
+        assert route.call_count == 1
+        await er_client.close()
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import respx
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+END = datetime(2023, 1, 31, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def observations():
+    return [{"id": i, "recorded_at": (START + timedelta(hours=6 * i)).isoformat()} for i in range(120)]
+
+
+def _in_window(items, field, lower, upper):
+    lower, upper = datetime.fromisoformat(lower), datetime.fromisoformat(upper)
+    return [item for item in items if lower <= datetime.fromisoformat(item[field]) <= upper]
+
+
+def _observations_handler(observations):
+    def handler(request):
+        params = request.url.params
+        results = _in_window(observations, "recorded_at", params["since"], params["until"])
+        if params.get("page_size") == "1":
+            return httpx.Response(httpx.codes.OK, json={"data": {"count": len(results), "next": None,
+                                                                 "results": results[:1]}})
+        return httpx.Response(httpx.codes.OK, json={"data": {"next": None, "results": results}})
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_scan_observations_ordered(er_client, observations):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("observations")
+        route.side_effect = _observations_handler(observations)
+        scanned = [o async for o in er_client.scan_observations(
+            START, END, partitions=4, ordered=True, source_id="source-1")]
+        assert scanned == observations
+        assert route.call_count == 4
+        assert all(call.request.url.params["source_id"] == "source-1" for call in route.calls)
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_scan_observations_resplits_dense_windows(er_client, observations):
+    dense = observations + [{"id": 1000 + i, "recorded_at": (START + timedelta(minutes=i)).isoformat()}
+                            for i in range(200)]
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("observations")
+        route.side_effect = _observations_handler(dense)
+        scanned = [o async for o in er_client.scan_observations(
+            START, END, partitions=2, split_threshold=100, max_concurrency=3)]
+        assert sorted(o["id"] for o in scanned) == sorted(o["id"] for o in dense)
+        scans = [call for call in route.calls if call.request.url.params["page_size"] != "1"]
+        assert len(scans) > 2
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_scan_events_combines_filters(er_client):
+    events = [{"id": i, "time": (START + timedelta(days=i)).isoformat()} for i in range(30)]
+
+    def handler(request):
+        event_filter = json.loads(request.url.params["filter"])
+        assert event_filter["state"] == ["active"]
+        date_range = event_filter["date_range"]
+        results = _in_window(events, "time", date_range["lower"], date_range["upper"])
+        return httpx.Response(httpx.codes.OK, json={"data": {"next": None, "results": results}})
+
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get("activity/events")
+        route.side_effect = handler
+        scanned = [e async for e in er_client.scan_events(
+            START, END, partitions=3, filter=json.dumps({"state": ["active"]}))]
+        assert sorted(e["id"] for e in scanned) == list(range(30))
+        assert route.call_count == 3
+        await er_client.close()
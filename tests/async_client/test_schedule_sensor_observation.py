@@ -0,0 +1,120 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+import respx
+
+from erclient import ERClientBadRequest
+from erclient.client import AsyncERClient
+
+INTERVAL = 0.1
+
+
+@pytest.fixture
+def er_client(er_server_info):
+    return AsyncERClient(**er_server_info, observation_interval=INTERVAL)
+
+
+def _position(position, manufacturer_id, i):
+    return {**position, "manufacturer_id": manufacturer_id,
+            "recorded_at": f"2023-01-11T19:41:{i:02d}+02:00"}
+
+
+@pytest.mark.asyncio
+async def test_observations_of_one_source_are_spaced_and_ordered(er_client, position, position_created_response):
+    post_times = []
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        def record(request):
+            post_times.append((time.monotonic(), json.loads(request.content)["recorded_at"]))
+            return httpx.Response(httpx.codes.CREATED, json=position_created_response)
+
+        route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        route.side_effect = record
+
+        positions = [_position(position, "collar-1", i) for i in range(4)]
+        futures = await er_client.schedule_sensor_observation(positions)
+        results = await asyncio.gather(*futures)
+
+        assert route.call_count == 4
+        assert results == [position_created_response["data"]] * 4
+        assert [recorded_at for _, recorded_at in post_times] == [p["recorded_at"] for p in positions]
+        gaps = [b[0] - a[0] for a, b in zip(post_times, post_times[1:])]
+        assert all(gap >= INTERVAL * 0.9 for gap in gaps)
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_different_sources_are_posted_concurrently(er_client, position, position_created_response):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        route.return_value = httpx.Response(
+            httpx.codes.CREATED, json=position_created_response)
+
+        started = time.monotonic()
+        for source in range(20):
+            for i in range(2):
+                await er_client.schedule_sensor_observation(_position(position, f"collar-{source}", i))
+        await er_client.flush_scheduled_observations()
+        elapsed = time.monotonic() - started
+
+        assert route.call_count == 40
+        # Sequentially, 20 sources x 2 observations would take at least 20 intervals
+        assert elapsed < INTERVAL * 5
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_conflict_is_retried_after_the_interval(er_client, position, position_created_response):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        route.side_effect = (
+            httpx.Response(httpx.codes.CONFLICT, json={}),
+            httpx.Response(httpx.codes.CREATED, json=position_created_response),
+        )
+
+        future = await er_client.schedule_sensor_observation(position)
+
+        assert await future == position_created_response["data"]
+        assert route.call_count == 2
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_errors_are_delivered_to_the_caller(er_client, position, bad_request_response):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        route.return_value = httpx.Response(
+            httpx.codes.BAD_REQUEST, json=bad_request_response)
+
+        future = await er_client.schedule_sensor_observation(position)
+
+        with pytest.raises(ERClientBadRequest):
+            await future
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_close_posts_queued_observations(er_client, position, position_created_response):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        route.return_value = httpx.Response(
+            httpx.codes.CREATED, json=position_created_response)
+
+        futures = await er_client.schedule_sensor_observation(
+            [_position(position, "collar-1", i) for i in range(3)])
+        await er_client.close()
+
+        assert route.call_count == 3
+        assert all(f.done() for f in futures)
@@ -0,0 +1,95 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from erclient import ERClientBadRequest, ObservationSpool
+from erclient.client import AsyncERClient
+
+
+def _observation(i):
+    return {"manufacturer_id": "collar-1", "recorded_at": f"2023-01-11T19:41:{i:02d}+00:00"}
+
+
+@pytest.mark.asyncio
+async def test_observations_are_spooled_while_er_is_unreachable_and_replayed_in_order(er_server_info, tmp_path):
+    spool = ObservationSpool(str(tmp_path), retry_interval=0)
+    er_client = AsyncERClient(**er_server_info, spool=spool)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        posted = []
+        outage = [True]
+
+        def record(request):
+            if outage[0]:
+                raise httpx.ConnectError("Connection refused")
+            posted.append((request.url.path.rsplit("/api/v1.0/", 1)[-1], json.loads(request.content)))
+            return httpx.Response(httpx.codes.CREATED, json={"data": {}})
+
+        respx_mock.post(f'sensors/generic/{er_client.provider_key}/status').side_effect = record
+        respx_mock.post('observations').side_effect = record
+
+        assert await er_client.post_sensor_observation(_observation(0)) is None
+        assert await er_client.post_observation(_observation(1)) is None
+        assert not spool.is_empty
+
+        outage[0] = False
+        # The replay starts in the background; new observations queue up behind it
+        assert await er_client.post_sensor_observation(_observation(2)) is None
+        await er_client.replay_spool()
+        sensors = f"sensors/generic/{er_client.provider_key}/status"
+        assert posted == [
+            (sensors, [_observation(0)]),
+            ("observations", [_observation(1)]),
+            (sensors, [_observation(2)]),
+        ]
+        assert spool.is_empty
+
+        assert await er_client.post_sensor_observation(_observation(3)) == {}
+        assert posted[-1] == (sensors, _observation(3))
+    await er_client.close()
+    assert spool._file.closed
+
+
+@pytest.mark.asyncio
+async def test_replay_stops_at_the_first_outage(er_server_info, tmp_path):
+    spool = ObservationSpool(str(tmp_path), batch_size=1)
+    for i in range(3):
+        spool.append("sensors", _observation(i), sensor_type="generic")
+    er_client = AsyncERClient(**er_server_info, spool=spool)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.post(f'sensors/generic/{er_client.provider_key}/status')
+        route.side_effect = [httpx.Response(httpx.codes.CREATED, json={"data": {}}),
+                             httpx.Response(httpx.codes.SERVICE_UNAVAILABLE)]
+        assert await er_client.replay_spool() == 1
+        assert [record["payload"] for _, record in spool.peek(10)] == [_observation(1), _observation(2)]
+    await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_rejected_observations_are_dropped_and_other_errors_raised(er_server_info, tmp_path):
+    spool = ObservationSpool(str(tmp_path))
+    spool.append("sensors", _observation(0), sensor_type="generic")
+    spool.append("sensors", _observation(1), sensor_type="generic")
+    er_client = AsyncERClient(**er_server_info, spool=spool)
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        def reject_first(request):
+            payload = json.loads(request.content)
+            if _observation(0) in (payload if isinstance(payload, list) else [payload]):
+                return httpx.Response(httpx.codes.BAD_REQUEST, json={"status": {"detail": "bad observation"}})
+            return httpx.Response(httpx.codes.CREATED, json={"data": {}})
+
+        respx_mock.post(f'sensors/generic/{er_client.provider_key}/status').side_effect = reject_first
+        assert await er_client.replay_spool() == 1
+        assert spool.is_empty
+
+        with pytest.raises(ERClientBadRequest):
+            await er_client.post_sensor_observation(_observation(0))
+        assert spool.is_empty
+    await er_client.close()
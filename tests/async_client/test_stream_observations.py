@@ -0,0 +1,53 @@
+import httpx
+import pytest
+import respx
+
+from erclient import ERClientPermissionDenied
+
+
+@pytest.fixture
+def observation_pages():
+    return [
+        {"data": {"next": "https://fake-site.erdomain.org/api/v1.0/observations?use_cursor=true&cursor=abc",
+                  "results": [{"id": 1}, {"id": 2}, {"id": 3}]}},
+        {"data": {"next": None, "results": [{"id": 4}]}},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_observations_stream(er_client, observation_pages):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        route = respx_mock.get('observations')
+        route.side_effect = [httpx.Response(httpx.codes.OK, json=page) for page in observation_pages]
+        observations = [o async for o in er_client.get_observations(source_id="source-1", stream=True)]
+        assert observations == [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]
+        assert route.call_count == 2
+        assert route.calls[1].request.url.params["cursor"] == "abc"
+        assert route.calls[1].request.url.params["source_id"] == "source-1"
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_get_observations_stream_in_batches(er_client, observation_pages):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        respx_mock.get('observations').side_effect = [
+            httpx.Response(httpx.codes.OK, json=page) for page in observation_pages]
+        batches = [b async for b in er_client.get_observations(stream=True, batch_size=2)]
+        assert batches == [[{"id": 1}, {"id": 2}], [{"id": 3}], [{"id": 4}]]
+        await er_client.close()
+
+
+@pytest.mark.asyncio
+async def test_get_observations_stream_error(er_client):
+    async with respx.mock(
+            base_url=er_client._api_root("v1.0"), assert_all_called=False
+    ) as respx_mock:
+        respx_mock.get('observations').return_value = httpx.Response(
+            httpx.codes.FORBIDDEN, json={"status": {"code": 403, "detail": "Forbidden"}})
+        with pytest.raises(ERClientPermissionDenied):
+            [o async for o in er_client.get_observations(stream=True)]
+        await er_client.close()
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import respx
+
+from erclient import FileTokenCache
+from erclient.client import AsyncERClient
+
+
+@pytest.fixture
+def server_info_without_token(er_server_info):
+    return {k: v for k, v in er_server_info.items() if k != "token"}
+
+
+@pytest.fixture
+def token_cache(tmp_path):
+    return FileTokenCache(str(tmp_path / "tokens.json"))
+
+
+@pytest.fixture
+def token_response():
+    return {
+        "access_token": "new-access-token",
+        "refresh_token": "new-refresh-token",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+    }
+
+
+@pytest.mark.asyncio
+async def test_login_result_is_shared_with_later_clients(server_info_without_token, token_cache, token_response):
+    first = AsyncERClient(**server_info_without_token, token_cache=token_cache)
+    second = AsyncERClient(**server_info_without_token, token_cache=token_cache)
+    async with respx.mock(assert_all_called=False) as respx_mock:
+        token_route = respx_mock.post(server_info_without_token["token_url"])
+        token_route.return_value = httpx.Response(httpx.codes.OK, json=token_response)
+        me_route = respx_mock.get(f'{first._api_root("v1.0")}/user/me')
+        me_route.return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {"username": "test"}})
+
+        await first.get_me()
+        await second.get_me()
+
+        assert token_route.call_count == 1
+        assert second.auth == token_response
+        assert me_route.calls.last.request.headers["Authorization"] == "Bearer new-access-token"
+        await first.close()
+        await second.close()
+
+
+@pytest.mark.asyncio
+async def test_expired_cached_token_is_ignored(server_info_without_token, token_cache, token_response):
+    client = AsyncERClient(**server_info_without_token, token_cache=token_cache)
+    key = FileTokenCache.make_key(client.service_root, client.client_id, client.username)
+    token_cache.store(key, {**token_response, "access_token": "stale"},
+                      datetime.now(tz=timezone.utc) - timedelta(seconds=1))
+    async with respx.mock(assert_all_called=False) as respx_mock:
+        token_route = respx_mock.post(server_info_without_token["token_url"])
+        token_route.return_value = httpx.Response(httpx.codes.OK, json=token_response)
+        me_route = respx_mock.get(f'{client._api_root("v1.0")}/user/me')
+        me_route.return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {"username": "test"}})
+
+        await client.get_me()
+
+        assert token_route.call_count == 1
+        assert token_cache.load(key)[0] == token_response
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_clients_starting_together_log_in_once(server_info_without_token, token_cache, token_response):
+    clients = [AsyncERClient(**server_info_without_token, token_cache=token_cache) for _ in range(5)]
+    async with respx.mock(assert_all_called=False) as respx_mock:
+        async def slow_login(request):
+            await asyncio.sleep(0.05)
+            return httpx.Response(httpx.codes.OK, json=token_response)
+
+        token_route = respx_mock.post(server_info_without_token["token_url"])
+        token_route.side_effect = slow_login
+        respx_mock.get(f'{clients[0]._api_root("v1.0")}/user/me').return_value = httpx.Response(
+            httpx.codes.OK, json={"data": {"username": "test"}})
+
+        await asyncio.gather(*[client.get_me() for client in clients])
+
+        assert token_route.call_count == 1
+        assert all(client.auth == token_response for client in clients)
+    for client in clients:
+        await client.close()
@@ -12,14 +12,18 @@ def _mock_response(status_code, json_data=None, text=None, ok=None, url="https:/
     """Create a mock requests.Response."""
     resp = MagicMock(spec=requests.Response)
     resp.status_code = status_code
+    resp.headers = {}
     resp.url = url
     if json_data is not None:
         resp.text = json.dumps(json_data)
+        resp.content = json.dumps(json_data).encode()
         resp.json.return_value = json_data
     elif text is not None:
         resp.text = text
+        resp.content = text.encode()
     else:
         resp.text = ""
+        resp.content = "".encode()
     if ok is not None:
         resp.ok = ok
     else:
@@ -16,13 +16,16 @@ SUBJECTS_PAYLOAD = [{"id": SUBJECT_ID}]
 def _mock_response(status_code, json_data=None):
     resp = MagicMock(spec=requests.Response)
     resp.status_code = status_code
+    resp.headers = {}
     resp.ok = 200 <= status_code < 300
     if json_data is not None:
         resp.json.return_value = json_data
         resp.text = json.dumps(json_data)
+        resp.content = json.dumps(json_data).encode()
     else:
         resp.json.return_value = {}
         resp.text = ""
+        resp.content = "".encode()
     return resp
 
 
@@ -15,6 +15,7 @@ def test_service_root_base_url_assembles_api_path(er_server_info, get_events_typ
         mock_response.ok = True
         mock_response.json.return_value = get_events_types_response_v1
         mock_response.text = json.dumps(get_events_types_response_v1)
+        mock_response.content = json.dumps(get_events_types_response_v1).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.get.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -46,6 +47,7 @@ def test_get_event_types_different_versions(er_server_info, version, events_type
         mock_response.ok = True
         mock_response.json.return_value = events_types_response
         mock_response.text = json.dumps(events_types_response)
+        mock_response.content = json.dumps(events_types_response).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.get.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -65,6 +67,7 @@ def test_get_event_types_without_version_treated_like_v1(er_server_info, get_eve
         mock_response.ok = True
         mock_response.json.return_value = get_events_types_response_v1
         mock_response.text = json.dumps(get_events_types_response_v1)
+        mock_response.content = json.dumps(get_events_types_response_v1).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.get.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -83,6 +86,7 @@ def test_post_event_type_different_versions(er_server_info, post_event_type_payl
         mock_response.ok = True
         mock_response.json.return_value = post_event_type_response
         mock_response.text = json.dumps(post_event_type_response)
+        mock_response.content = json.dumps(post_event_type_response).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.post.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -101,6 +105,7 @@ def test_post_event_type_without_version_treated_like_v1(er_server_info, post_ev
         mock_response.ok = True
         mock_response.json.return_value = post_event_type_response
         mock_response.text = json.dumps(post_event_type_response)
+        mock_response.content = json.dumps(post_event_type_response).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.post.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -119,6 +124,7 @@ def test_patch_event_type_different_versions(er_server_info, patch_event_type_pa
         mock_response.ok = True
         mock_response.json.return_value = patch_event_type_response
         mock_response.text = json.dumps(patch_event_type_response)
+        mock_response.content = json.dumps(patch_event_type_response).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.patch.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -137,6 +143,7 @@ def test_patch_event_type_without_version_treated_like_v1(er_server_info, patch_
         mock_response.ok = True
         mock_response.json.return_value = patch_event_type_response
         mock_response.text = json.dumps(patch_event_type_response)
+        mock_response.content = json.dumps(patch_event_type_response).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.patch.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -159,6 +166,7 @@ def test_get_event_type_different_versions(er_server_info, version):
         mock_response.ok = True
         mock_response.json.return_value = get_response
         mock_response.text = json.dumps(get_response)
+        mock_response.content = json.dumps(get_response).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.get.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -188,6 +196,7 @@ def test_get_event_type_version_alias_v2_uses_v2_api_root(er_server_info):
         mock_response.ok = True
         mock_response.json.return_value = get_response
         mock_response.text = json.dumps(get_response)
+        mock_response.content = json.dumps(get_response).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.get.return_value = mock_response
         mock_session.return_value = mock_session_instance
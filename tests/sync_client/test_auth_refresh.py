@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from erclient import ERClientException
+from erclient.client import ERClient
+
+
+def _mock_response(status_code, json_data):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = status_code
+    resp.headers = {}
+    resp.ok = 200 <= status_code < 300
+    resp.json.return_value = json_data
+    resp.text = json.dumps(json_data)
+    resp.content = json.dumps(json_data).encode()
+    return resp
+
+
+@pytest.fixture
+def token_response():
+    return {
+        "access_token": "new-access-token",
+        "refresh_token": "new-refresh-token",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+    }
+
+
+@pytest.fixture
+def server_info_without_token(er_server_info):
+    return {k: v for k, v in er_server_info.items() if k != "token"}
+
+
+def _expire(client):
+    client.auth = {
+        "access_token": "old-access-token",
+        "refresh_token": "old-refresh-token",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+    }
+    client.auth_expires = datetime.now(tz=timezone.utc) - timedelta(seconds=1)
+
+
+def test_concurrent_threads_share_one_token_refresh(server_info_without_token, token_response):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+
+        def slow_token(*args, **kwargs):
+            time.sleep(0.05)
+            return _mock_response(200, token_response)
+
+        mock_session_instance.post.side_effect = slow_token
+        mock_session_instance.get.return_value = _mock_response(
+            200, {"data": {"username": "test"}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**server_info_without_token)
+        _expire(client)
+
+        barrier = threading.Barrier(20)
+
+        def call_me(_):
+            barrier.wait()
+            return client.get_me()
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            results = list(executor.map(call_me, range(20)))
+
+        assert all(r == {"username": "test"} for r in results)
+        mock_session_instance.post.assert_called_once()
+        token_url, = mock_session_instance.post.call_args[0]
+        token_kwargs = mock_session_instance.post.call_args[1]
+        assert token_url == server_info_without_token["token_url"]
+        assert token_kwargs["data"]["grant_type"] == "refresh_token"
+        assert token_kwargs["timeout"] == (ERClient.DEFAULT_CONNECT_TIMEOUT_SECONDS,
+                                           ERClient.DEFAULT_DATA_TIMEOUT_SECONDS)
+        for call in mock_session_instance.get.call_args_list:
+            assert call[1]["headers"]["Authorization"] == "Bearer new-access-token"
+
+
+def test_failed_refresh_falls_back_to_login(server_info_without_token, token_response):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.side_effect = (
+            _mock_response(400, {"error": "invalid_grant"}),
+            _mock_response(200, token_response),
+        )
+        mock_session_instance.get.return_value = _mock_response(
+            200, {"data": {"username": "test"}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**server_info_without_token, connect_timeout=1, data_timeout=2)
+        _expire(client)
+
+        assert client.get_me() == {"username": "test"}
+        grant_types = [c[1]["data"]["grant_type"]
+                       for c in mock_session_instance.post.call_args_list]
+        assert grant_types == ["refresh_token", "password"]
+        assert mock_session_instance.post.call_args[1]["timeout"] == (1, 2)
+
+
+def test_failed_login_raises(server_info_without_token):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response(
+            401, {"error": "invalid_credentials"})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**server_info_without_token)
+
+        with pytest.raises(ERClientException):
+            client.get_me()
+        mock_session_instance.get.assert_not_called()
+        assert client.auth is None
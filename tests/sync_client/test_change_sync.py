@@ -0,0 +1,58 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from erclient import ChangeSync, WatermarkFile
+from erclient.client import ERClient
+
+
+def _mock_response(json_data):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = 200
+    resp.headers = {}
+    resp.ok = True
+    resp.text = json.dumps(json_data)
+    resp.content = resp.text.encode()
+    return resp
+
+
+def _page(results):
+    return _mock_response({"data": {"next": None, "results": results}})
+
+
+def test_events_sync_fetches_deltas_across_runs(er_server_info, tmp_path):
+    first = [{"id": "a", "updated_at": "2024-01-01T10:00:00+00:00"},
+             {"id": "b", "updated_at": "2024-01-01T10:05:00+00:00"}]
+    # The overlap fetches "b" again, unchanged, along with a new version of "a"
+    second = [{"id": "b", "updated_at": "2024-01-01T10:05:00+00:00"},
+              {"id": "a", "updated_at": "2024-01-01T10:06:00+00:00"}]
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = [_page(first), _page(second)]
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        store = WatermarkFile(str(tmp_path / "state.json"))
+        assert list(ChangeSync(client, store=store).events(state="active")) == first
+        assert "updated_since" not in mock_session_instance.get.call_args[1]["params"]
+
+        # A later run, e.g. another process, picks up from the saved watermark
+        assert list(ChangeSync(client, store=store).events(state="active")) == [second[1]]
+        params = mock_session_instance.get.call_args[1]["params"]
+        assert params["updated_since"] == "2024-01-01T10:03:00+00:00"
+        assert params["state"] == "active"
+        assert store.load()["events"]["watermark"] == "2024-01-01T10:06:00+00:00"
+
+
+def test_observations_sync_uses_created_after(er_server_info):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = [_page([]), _page([])]
+        mock_session.return_value = mock_session_instance
+
+        sync = ChangeSync(ERClient(**er_server_info), initial="2024-01-01T00:00:00Z")
+        assert list(sync.observations(subject_id="subject-1")) == []
+        params = mock_session_instance.get.call_args[1]["params"]
+        assert params["created_after"] == "2024-01-01T00:00:00+00:00"
+        assert params["subject_id"] == "subject-1"
@@ -0,0 +1,76 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from erclient.client import ERClient
+
+NEXT = "https://fake-site.erdomain.org/api/v1.0/{}?use_cursor=true&cursor={}"
+
+
+def _mock_response(json_data):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = 200
+    resp.headers = {}
+    resp.ok = True
+    resp.text = json.dumps(json_data)
+    resp.content = resp.text.encode()
+    return resp
+
+
+def _cursor_pages(path, pages):
+    return [
+        _mock_response({"data": {
+            "next": NEXT.format(path, f"cj0x{i}%3D%3D") if i < len(pages) - 1 else None,
+            "results": results}})
+        for i, results in enumerate(pages)]
+
+
+@pytest.mark.parametrize("method, path, kwargs", [
+    ("get_events", "activity/events", {"page_size": 2}),
+    ("get_patrols", "activity/patrols", {"page_size": 2}),
+    ("get_sources", "sources", {"page_size": 2}),
+    ("get_observations", "observations", {"subject_id": "subject-1", "page_size": 2}),
+    ("get_objects", "subjects", {"object": "subjects", "page_size": 2}),
+])
+def test_paginators_follow_cursors(er_server_info, method, path, kwargs):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = _cursor_pages(path, [[{"id": 1}, {"id": 2}], [{"id": 3}]])
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        assert list(getattr(client, method)(**kwargs)) == [{"id": 1}, {"id": 2}, {"id": 3}]
+
+        first_call, second_call = mock_session_instance.get.call_args_list
+        assert first_call[0][0].endswith(path)
+        assert first_call[1]["params"]["use_cursor"] == "true"
+        assert "cursor" not in first_call[1]["params"]
+        # Sent back decoded, so it isn't encoded twice
+        assert second_call[1]["params"]["cursor"] == "cj0x0=="
+        assert second_call[1]["params"]["page_size"] == 2
+
+
+def test_explicit_page_gets_one_page(er_server_info):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = _cursor_pages("activity/events", [[{"id": 1}], [{"id": 2}]])
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        assert list(client.get_events(page=3)) == [{"id": 1}]
+        params = mock_session_instance.get.call_args[1]["params"]
+        assert params["page"] == 3
+        assert "use_cursor" not in params
+
+
+def test_max_results(er_server_info):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = _cursor_pages(
+            "activity/events", [[{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}]])
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        assert list(client.get_events(max_results=3)) == [{"id": 1}, {"id": 2}, {"id": 3}]
@@ -0,0 +1,75 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from erclient import ERClientException
+from erclient.client import ERClient
+
+
+def _mock_response(json_data, status_code=201):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = status_code
+    resp.headers = {}
+    resp.ok = status_code < 400
+    resp.text = json.dumps(json_data)
+    resp.content = resp.text.encode()
+    return resp
+
+
+def _observation(i):
+    return {"manufacturer_id": "collar-1", "recorded_at": f"2023-01-11T19:41:{i:02d}+00:00"}
+
+
+def test_already_posted_observations_are_not_sent_again(er_server_info):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response({"data": {}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info, deduplicate_observations=True)
+        client.post_sensor_observation(_observation(0))
+        assert client.post_sensor_observation(_observation(0)) is None
+        assert mock_session_instance.post.call_count == 1
+
+        client.post_observation([_observation(0), _observation(1), _observation(1)])
+        posted = json.loads(mock_session_instance.post.call_args[1]["data"])
+        assert posted == [_observation(1)]
+        deduplicator = client.observation_deduplicator
+        assert (deduplicator.unique, deduplicator.duplicates) == (2, 3)
+
+
+def test_failed_posts_are_not_remembered(er_server_info):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response(
+            {"status": {"detail": "Conflict"}}, status_code=409)
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info, deduplicate_observations=True)
+        for _ in range(2):
+            with pytest.raises(ERClientException):
+                client.post_sensor_observation(_observation(0))
+        assert mock_session_instance.post.call_count == 2
+        assert not client.observation_deduplicator.is_duplicate(_observation(0))
+
+
+def test_index_is_saved_on_close_and_reloaded_after_a_restart(er_server_info, tmp_path):
+    path = str(tmp_path / "posted.json")
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response({"data": [{"id": 1}, {"id": 2}]})
+        mock_session.return_value = mock_session_instance
+
+        with ERClient(**er_server_info, deduplicate_observations=path) as client:
+            assert client.post_observation([_observation(0), _observation(1)]) == [{"id": 1}, {"id": 2}]
+
+        client = ERClient(**er_server_info, deduplicate_observations=path)
+        assert client.observation_deduplicator.size == 2
+        mock_session_instance.post.return_value = _mock_response({"data": [{"id": 3}]})
+        # Results line up with the list passed in
+        assert client.post_observation([_observation(1), _observation(2), _observation(2)]) == [
+            None, {"id": 3}, {"id": 3}]
+        assert mock_session_instance.post.call_count == 2
+        client.close()
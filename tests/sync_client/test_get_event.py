@@ -27,6 +27,7 @@ def test_get_event_returns_event(er_server_info, get_event_response):
         mock_response = MagicMock()
         mock_response.ok = True
         mock_response.text = json.dumps(get_event_response)
+        mock_response.content = json.dumps(get_event_response).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.get.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -49,6 +50,7 @@ def test_get_event_passes_include_params(er_server_info, get_event_response):
         mock_response = MagicMock()
         mock_response.ok = True
         mock_response.text = json.dumps(get_event_response)
+        mock_response.content = json.dumps(get_event_response).encode()
         mock_session_instance = MagicMock()
         mock_session_instance.get.return_value = mock_response
         mock_session.return_value = mock_session_instance
@@ -0,0 +1,75 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from erclient import ERClientException
+from erclient.client import ERClient
+from erclient.retry import RetryPolicy
+
+
+def _mock_response(json_data, status_code=200):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = status_code
+    resp.headers = {}
+    resp.ok = status_code < 400
+    resp.text = json.dumps(json_data)
+    resp.content = resp.text.encode()
+    return resp
+
+
+def test_pages_are_fetched_without_a_count_request_and_failures_refetched(er_server_info):
+    subjects = [{"id": i} for i in range(25)]
+    failed = []
+
+    def get(url, params=None, **kwargs):
+        page = params["page"]
+        if page == 2 and not failed:
+            failed.append(page)
+            return _mock_response({"status": {"code": 500}}, status_code=500)
+        results = subjects[(page - 1) * 10:page * 10]
+        return _mock_response({"data": {"count": len(subjects), "next": None, "results": results}})
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = get
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info, retry_policy=RetryPolicy(max_retries=0, backoff_factor=0))
+        progress = []
+        loaded = list(client.get_objects_multithreaded(
+            object="subjects", page_size=10, threads=2, ordered=True, subject_group="group-1",
+            progress=lambda *args: progress.append(args)))
+
+        assert loaded == subjects
+        pages = [call[1]["params"]["page"] for call in mock_session_instance.get.call_args_list]
+        assert sorted(pages) == [1, 2, 2, 3]
+        for call in mock_session_instance.get.call_args_list:
+            params = call[1]["params"]
+            assert params["page_size"] == 10
+            assert params["subject_group"] == "group-1"
+            assert not {"object", "threads", "ordered", "progress"} & set(params)
+        assert progress[-1] == (3, 3, 25)
+
+
+def test_pages_have_one_retry_budget(er_server_info):
+    def get(url, params=None, **kwargs):
+        if params["page"] == 2:
+            failure = _mock_response({"status": {"code": 500}}, status_code=500)
+            failure.url = url
+            return failure
+        return _mock_response({"data": {"count": 30, "next": None, "results": [{"id": params["page"]}]}})
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = get
+        mock_session.return_value = mock_session_instance
+
+        # The client's own retries would multiply the pager's
+        client = ERClient(**er_server_info, retry_policy=RetryPolicy(max_retries=5, backoff_factor=0))
+        with pytest.raises(ERClientException):
+            list(client.get_objects_multithreaded(object="subjects", page_size=10, threads=1, retries=2))
+
+        pages = [call[1]["params"]["page"] for call in mock_session_instance.get.call_args_list]
+        assert pages.count(2) == 3
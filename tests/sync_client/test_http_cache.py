@@ -0,0 +1,75 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from erclient import HTTPCache
+from erclient.client import ERClient
+
+
+def _mock_response(status_code, json_data=None, headers=None):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = status_code
+    resp.headers = headers or {}
+    resp.ok = status_code < 400
+    resp.url = "https://fake-site.erdomain.org/api/v1.0/mock"
+    resp.text = json.dumps(json_data) if json_data is not None else ""
+    resp.content = resp.text.encode()
+    return resp
+
+
+def test_metadata_is_revalidated(er_server_info):
+    categories = {"data": [{"value": "security", "display": "Security"}]}
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = [
+            _mock_response(200, categories, headers={"ETag": '"abc"'}),
+            _mock_response(304),
+        ]
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(http_cache=True, **er_server_info)
+        assert client.get_event_categories() == categories["data"]
+        assert client.get_event_categories() == categories["data"]
+
+        first, second = mock_session_instance.get.call_args_list
+        assert "If-None-Match" not in first[1]["headers"]
+        assert second[1]["headers"]["If-None-Match"] == '"abc"'
+        assert (client.http_cache.hits, client.http_cache.misses) == (1, 1)
+
+
+def test_changed_metadata_replaces_cached_response(er_server_info):
+    old = {"data": [{"id": "group-1", "name": "Rangers"}]}
+    new = {"data": [{"id": "group-1", "name": "Rangers"}, {"id": "group-2", "name": "Vehicles"}]}
+    cache = HTTPCache()
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = [
+            _mock_response(200, old, headers={"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}),
+            _mock_response(200, new, headers={"Last-Modified": "Thu, 22 Oct 2015 07:28:00 GMT"}),
+            _mock_response(304),
+        ]
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(http_cache=cache, **er_server_info)
+        assert client.get_subjectgroups() == old["data"]
+        assert client.get_subjectgroups() == new["data"]
+        assert client.get_subjectgroups() == new["data"]
+
+        calls = mock_session_instance.get.call_args_list
+        assert calls[1][1]["headers"]["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+        assert calls[2][1]["headers"]["If-Modified-Since"] == "Thu, 22 Oct 2015 07:28:00 GMT"
+
+
+def test_without_cache_requests_are_unconditional(er_server_info):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response(
+            200, {"data": []}, headers={"ETag": '"abc"'})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        client.get_event_categories()
+        client.get_event_categories()
+
+        assert "If-None-Match" not in mock_session_instance.get.call_args[1]["headers"]
@@ -0,0 +1,102 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from erclient import SQLiteMirror
+from erclient.client import ERClient
+
+EVENTS = [
+    {"id": "e1", "serial_number": 1, "event_type": "fire_rep", "state": "new",
+     "time": "2024-01-01T04:00:00-06:00", "updated_at": "2024-01-01T10:00:00+00:00"},
+    {"id": "e2", "serial_number": 2, "event_type": "wildlife_sighting_rep", "state": "active",
+     "time": "2024-01-02T10:00:00+00:00", "updated_at": "2024-01-02T10:00:00+00:00"},
+]
+OBSERVATIONS = [
+    {"id": "o1", "source": "source-1", "recorded_at": "2024-01-01T10:00:00+00:00",
+     "created_at": "2024-01-01T10:00:05+00:00", "location": {"latitude": 1, "longitude": 2}},
+    {"id": "o2", "source": "source-1", "recorded_at": "2024-01-01T11:00:00+00:00",
+     "created_at": "2024-01-01T11:00:05+00:00", "location": {"latitude": 1, "longitude": 3}},
+]
+
+
+def _mock_response(json_data):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = 200
+    resp.headers = {}
+    resp.ok = True
+    resp.text = json.dumps(json_data)
+    resp.content = resp.text.encode()
+    return resp
+
+
+def _page(results):
+    return _mock_response({"data": {"next": None, "results": results}})
+
+
+@pytest.fixture
+def mock_session_instance():
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session.return_value = mock_session_instance
+        yield mock_session_instance
+
+
+def test_sync_and_query(er_server_info, mock_session_instance, tmp_path):
+    mock_session_instance.get.side_effect = [
+        _page(EVENTS), _page(OBSERVATIONS),
+        _mock_response({"data": [{"id": "subject-1", "name": "Jo", "subject_type": "wildlife", "is_active": True}]}),
+    ]
+    path = str(tmp_path / "er.sqlite3")
+    with SQLiteMirror(ERClient(**er_server_info), path) as mirror:
+        assert mirror.sync_events() == 2
+        assert mirror.sync_observations(subject_id="subject-1") == 2
+        assert mirror.sync_subjects() == 1
+
+    with SQLiteMirror(ERClient(**er_server_info), path) as mirror:
+        assert [e["id"] for e in mirror.events()] == ["e1", "e2"]
+        # -06:00 is compared in UTC
+        assert [e["id"] for e in mirror.events(since="2024-01-01T09:00:00Z", until="2024-01-01T10:00:00Z")] == ["e1"]
+        assert mirror.events(event_type="wildlife_sighting_rep") == [EVENTS[1]]
+        assert mirror.events(serial_number=1) == [EVENTS[0]]
+        assert mirror.get_event("e2") == EVENTS[1]
+        assert mirror.observations(subject_id="subject-1") == OBSERVATIONS
+        assert mirror.observations(source_id="source-1", since="2024-01-01T10:30:00Z") == [OBSERVATIONS[1]]
+        assert [s["name"] for s in mirror.subjects(is_active=True)] == ["Jo"]
+        assert {name for name, in mirror.connection.execute("SELECT name FROM sqlite_master WHERE type='index'")} >= {
+            "events_time", "events_event_type", "events_serial_number",
+            "observations_recorded_at", "observations_subject_id", "observations_source_id"}
+
+
+def test_incremental_sync_updates_rows(er_server_info, mock_session_instance):
+    updated = {**EVENTS[0], "state": "resolved", "updated_at": "2024-01-03T10:00:00+00:00"}
+    mock_session_instance.get.side_effect = [_page(EVENTS), _page([EVENTS[1], updated])]
+    with SQLiteMirror(ERClient(**er_server_info), ":memory:") as mirror:
+        mirror.sync_events()
+        assert mirror.sync_events() == 1
+        assert mirror.get_event("e1")["state"] == "resolved"
+        params = mock_session_instance.get.call_args[1]["params"]
+        assert params["updated_since"] == "2024-01-02T09:58:00+00:00"
+
+
+def test_failed_sync_changes_nothing(er_server_info, mock_session_instance):
+    mock_session_instance.get.side_effect = [_page(EVENTS)]
+    with SQLiteMirror(ERClient(**er_server_info), ":memory:") as mirror:
+        mirror.sync_events()
+        mock_session_instance.get.side_effect = RuntimeError("connection lost")
+        with pytest.raises(RuntimeError):
+            mirror.sync_observations(subject_id="subject-1")
+        assert mirror.observations() == []
+        state = dict(mirror.connection.execute("SELECT stream, state FROM sync_state"))
+        assert list(state) == ["events"]
+
+
+def test_sync_by_source_keeps_the_subject(er_server_info, mock_session_instance):
+    moved = {**OBSERVATIONS[0], "location": {"latitude": 5, "longitude": 6}}
+    mock_session_instance.get.side_effect = [_page(OBSERVATIONS), _page([moved]), _page([moved])]
+    with SQLiteMirror(ERClient(**er_server_info), ":memory:") as mirror:
+        mirror.sync_observations(subject_id="subject-1")
+        assert mirror.sync_observations(source_id="source-1") == 1
+        assert mirror.sync_observations() == 1
+        assert mirror.observations(subject_id="subject-1") == [moved, OBSERVATIONS[1]]
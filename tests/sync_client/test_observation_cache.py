@@ -0,0 +1,93 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from erclient import ObservationCache
+from erclient.client import ERClient
+
+
+def _mock_response(json_data):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = 200
+    resp.headers = {}
+    resp.ok = True
+    resp.text = json.dumps(json_data)
+    resp.content = resp.text.encode()
+    return resp
+
+
+def test_settled_buckets_are_read_from_disk(er_server_info, tmp_path):
+    now = datetime.now(tz=timezone.utc)
+    # One observation every 6 hours over the last 6 days
+    observations = [{"id": i, "recorded_at": (now - timedelta(hours=6 * i)).isoformat()} for i in range(24, -1, -1)]
+
+    def get(url, params=None, **kwargs):
+        since = datetime.fromisoformat(params["since"])
+        until = datetime.fromisoformat(params["until"]) if "until" in params else now
+        results = [o for o in observations if since <= datetime.fromisoformat(o["recorded_at"]) <= until]
+        return _mock_response({"data": {"next": None, "results": results}})
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = get
+        mock_session.return_value = mock_session_instance
+
+        cache = ObservationCache(str(tmp_path), bucket=timedelta(days=1), settle=timedelta(days=2))
+        client = ERClient(**er_server_info, observation_cache=cache)
+        start = now - timedelta(days=5, hours=1)
+
+        first = list(client.get_subject_observations("subject-1", start=start))
+        assert first == [o for o in observations if datetime.fromisoformat(o["recorded_at"]) >= start]
+        # One request per settled day, then one for the live edge
+        settled_days = (cache.settled_until() - cache.floor(start)).days
+        assert mock_session_instance.get.call_count == settled_days + 1
+
+        mock_session_instance.get.reset_mock()
+        assert list(client.get_subject_observations("subject-1", start=start)) == first
+        assert mock_session_instance.get.call_count == 1
+        live_params = mock_session_instance.get.call_args[1]["params"]
+        assert live_params["since"] == cache.settled_until().isoformat()
+        assert live_params["subject_id"] == "subject-1"
+
+        # Another subject, or other details, are other buckets
+        mock_session_instance.get.reset_mock()
+        list(client.get_source_observations("subject-1", start=start))
+        assert mock_session_instance.get.call_count == settled_days + 1
+
+
+def test_no_start_bypasses_the_cache(er_server_info, tmp_path):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response({"data": {"next": None, "results": [{"id": 1}]}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info, observation_cache=str(tmp_path))
+        assert list(client.get_subject_observations("subject-1")) == [{"id": 1}]
+        assert mock_session_instance.get.call_count == 1
+        assert list(tmp_path.iterdir()) == []
+
+
+def test_bucket_sizes_sharing_a_directory_are_kept_apart(er_server_info, tmp_path):
+    # One observation every 6 hours on Jan 2 and 3, 2024; Jan 2 starts a 2-day bucket too
+    day = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    observations = [{"id": i, "recorded_at": (day + timedelta(hours=6 * i)).isoformat()} for i in range(8)]
+
+    def get(url, params=None, **kwargs):
+        since = datetime.fromisoformat(params["since"])
+        until = datetime.fromisoformat(params["until"])
+        results = [o for o in observations if since <= datetime.fromisoformat(o["recorded_at"]) <= until]
+        return _mock_response({"data": {"next": None, "results": results}})
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = get
+        mock_session.return_value = mock_session_instance
+
+        end = day + timedelta(days=2) - timedelta(seconds=1)
+        for bucket, requests_made in ((timedelta(days=1), 2), (timedelta(days=2), 1)):
+            mock_session_instance.get.reset_mock()
+            client = ERClient(**er_server_info, observation_cache=ObservationCache(str(tmp_path), bucket=bucket))
+            assert list(client.get_subject_observations("subject-1", start=day, end=end)) == observations
+            assert mock_session_instance.get.call_count == requests_made
@@ -0,0 +1,55 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from erclient import CheckpointFile
+from erclient.client import ERClient
+
+NEXT = "https://fake-site.erdomain.org/api/v1.0/observations?use_cursor=true&cursor={}"
+
+
+def _mock_response(json_data):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = 200
+    resp.headers = {}
+    resp.ok = True
+    resp.text = json.dumps(json_data)
+    resp.content = resp.text.encode()
+    return resp
+
+
+def _get(url, params=None, **kwargs):
+    page = int(params.get("cursor", 0))
+    return _mock_response({"data": {
+        "next": NEXT.format(page + 1) if page < 2 else None,
+        "results": [{"id": f"{page}-{i}"} for i in range(2)]}})
+
+
+def test_resume_observations_from_checkpoint_file(er_server_info, tmp_path):
+    checkpoints = CheckpointFile(str(tmp_path / "backfill.json"))
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = _get
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        observations = client.get_observations(subject_id="subject-1", resume_from=checkpoints.load(),
+                                               on_checkpoint=checkpoints.save)
+        first = [next(observations) for _ in range(3)]  # The scan dies in the second page
+        observations.close()
+        assert first == [{"id": "0-0"}, {"id": "0-1"}, {"id": "1-0"}]
+        assert checkpoints.load().pages == 1
+
+        mock_session_instance.get.reset_mock()
+        resumed = list(client.get_observations(subject_id="subject-1", resume_from=checkpoints.load(),
+                                               on_checkpoint=checkpoints.save))
+        assert resumed == [{"id": f"{page}-{i}"} for page in (1, 2) for i in range(2)]
+        assert mock_session_instance.get.call_args_list[0][1]["params"]["cursor"] == "1"
+
+        checkpoint = checkpoints.load()
+        assert (checkpoint.pages, checkpoint.items, checkpoint.done) == (3, 6, True)
+        # A finished scan has nothing left to fetch
+        mock_session_instance.get.reset_mock()
+        assert list(client.get_observations(subject_id="subject-1", resume_from=checkpoint)) == []
+        assert mock_session_instance.get.call_count == 0
@@ -0,0 +1,67 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from erclient import RateLimiter
+from erclient.client import ERClient
+
+
+def _mock_response(status_code, json_data):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = status_code
+    resp.headers = {}
+    resp.ok = 200 <= status_code < 300
+    resp.json.return_value = json_data
+    resp.text = json.dumps(json_data)
+    resp.content = json.dumps(json_data).encode()
+    return resp
+
+
+def test_requests_acquire_from_their_endpoint_bucket(er_server_info, position):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response(200, {"data": {}})
+        mock_session_instance.post.return_value = _mock_response(201, {"data": {}})
+        mock_session.return_value = mock_session_instance
+
+        limiter = MagicMock(spec=RateLimiter)
+        client = ERClient(**er_server_info, rate_limiter=limiter)
+        client.get_me()
+        client.post_observation(position)
+        client.delete_event("event-id")
+
+        assert [c[0][0] for c in limiter.acquire.call_args_list] == [
+            "https://fake-site.erdomain.org/api/v1.0/user/me",
+            "observations",
+            "activity/event/event-id/",
+        ]
+
+
+def test_rate_limiter_throttles_get_requests(er_server_info):
+    with patch("erclient.client.requests.Session") as mock_session, \
+            patch("erclient.rate_limit.time.sleep") as mock_sleep:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response(200, {"data": {}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info, rate_limiter=RateLimiter(limits={"user": (1, 1)}))
+        for _ in range(3):
+            client.get_me()
+
+        assert mock_sleep.call_count == 2
+
+
+def test_rate_limiter_throttles_under_a_prefixed_service_root(er_server_info):
+    er_server_info = {**er_server_info, "service_root": "https://fake-site.erdomain.org/er/api/v1.0"}
+    with patch("erclient.client.requests.Session") as mock_session, \
+            patch("erclient.rate_limit.time.sleep") as mock_sleep:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response(200, {"data": {}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info, rate_limiter=RateLimiter(limits={"user": (1, 1)}))
+        for _ in range(3):
+            client.get_me()
+
+        assert mock_sleep.call_count == 2
@@ -0,0 +1,110 @@
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from erclient import ERClientException
+from erclient.client import ERClient
+
+
+def _mock_response(status_code, json_data=None):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = status_code
+    resp.headers = {}
+    resp.ok = 200 <= status_code < 300
+    resp.url = "https://fake-site.erdomain.org/api/v1.0/mock"
+    resp.json.return_value = json_data
+    resp.text = json.dumps(json_data)
+    resp.content = json.dumps(json_data).encode()
+    return resp
+
+
+@pytest.fixture
+def positions():
+    return [{"manufacturer_id": f"device-{i}", "recorded_at": "2023-01-11T19:41:00+02:00",
+             "location": {"lat": -1.59083, "lon": 35.43903}} for i in range(100)]
+
+
+def test_large_bodies_are_gzipped(er_server_info, positions):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response(201, {"data": {}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(compress_requests=True, **er_server_info)
+        client.post_observation(positions)
+
+        call_kwargs = mock_session_instance.post.call_args[1]
+        assert call_kwargs["headers"]["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(call_kwargs["data"])) == positions
+
+
+def test_small_bodies_are_not_compressed(er_server_info, positions):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response(201, {"data": {}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(compress_requests=True, **er_server_info)
+        client.post_observation(positions[0])
+
+        call_kwargs = mock_session_instance.post.call_args[1]
+        assert "Content-Encoding" not in call_kwargs["headers"]
+
+
+def test_falls_back_when_server_rejects_compression(er_server_info, positions):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.side_effect = [
+            _mock_response(415, {"status": {"detail": "Unsupported Media Type"}}),
+            _mock_response(201, {"data": {}}),
+            _mock_response(201, {"data": {}}),
+        ]
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(compress_requests=True, **er_server_info)
+        client.post_observation(positions)
+        client.post_observation(positions)
+
+        first, second, third = mock_session_instance.post.call_args_list
+        assert first[1]["headers"]["Content-Encoding"] == "gzip"
+        assert "Content-Encoding" not in second[1]["headers"]
+        assert json.loads(second[1]["data"]) == positions
+        assert "Content-Encoding" not in third[1]["headers"]
+        assert not client.request_compression.enabled
+
+
+def test_keeps_compressing_when_the_request_itself_is_bad(er_server_info, positions):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response(
+            400, {"status": {"detail": "Invalid location"}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(compress_requests=True, **er_server_info)
+        with pytest.raises(ERClientException):
+            client.post_observation(positions)
+
+        assert mock_session_instance.post.call_count == 1
+        assert client.request_compression.enabled
+
+
+def test_falls_back_when_server_cannot_decode_compressed_body(er_server_info, positions):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.side_effect = [
+            _mock_response(400, {"status": {
+                "detail": "JSON parse error - 'utf-8' codec can't decode byte 0x8b in position 1"}}),
+            _mock_response(201, {"data": {}}),
+        ]
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(compress_requests=True, **er_server_info)
+        client.post_observation(positions)
+
+        first, second = mock_session_instance.post.call_args_list
+        assert first[1]["headers"]["Content-Encoding"] == "gzip"
+        assert "Content-Encoding" not in second[1]["headers"]
+        assert not client.request_compression.enabled
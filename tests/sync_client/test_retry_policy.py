@@ -0,0 +1,171 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from erclient import ERClientException, RetryPolicy
+from erclient.client import ERClient
+
+
+def _mock_response(status_code, json_data=None, headers=None):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = status_code
+    resp.headers = headers or {}
+    resp.ok = 200 <= status_code < 300
+    resp.url = "https://fake-site.erdomain.org/api/v1.0/mock"
+    resp.json.return_value = json_data
+    resp.text = json.dumps(json_data)
+    resp.content = json.dumps(json_data).encode()
+    return resp
+
+
+@pytest.fixture
+def sleeps():
+    with patch("erclient.client.time.sleep") as mock_sleep:
+        yield mock_sleep
+
+
+def test_get_waits_for_retry_after_then_succeeds(er_server_info, sleeps):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = (
+            _mock_response(429, {}, headers={"Retry-After": "3"}),
+            _mock_response(200, {"data": {"username": "test"}}),
+        )
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+
+        assert client.get_me() == {"username": "test"}
+        assert mock_session_instance.get.call_count == 2
+        sleeps.assert_called_once_with(3)
+
+
+def test_get_does_not_retry_client_errors(er_server_info, sleeps):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response(400, {})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+
+        with pytest.raises(ERClientException) as exc_info:
+            client.get_me()
+        assert exc_info.value.status_code == 400
+        mock_session_instance.get.assert_called_once()
+        sleeps.assert_not_called()
+
+
+def test_get_gives_up_after_max_retries_with_backoff(er_server_info, sleeps):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response(503, {})
+        mock_session.return_value = mock_session_instance
+
+        policy = RetryPolicy(max_retries=3, backoff_factor=1, jitter=False)
+        client = ERClient(**er_server_info, retry_policy=policy)
+
+        with pytest.raises(ERClientException) as exc_info:
+            client.get_me()
+        assert exc_info.value.status_code == 503
+        assert mock_session_instance.get.call_count == 4
+        assert [c[0][0] for c in sleeps.call_args_list] == [1, 2, 4]
+
+
+def test_get_legacy_fixed_delay_arguments(er_server_info, sleeps):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response(502, {})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+
+        with pytest.raises(ERClientException):
+            client._get("user/me", max_retries=2, seconds_between_attempts=7)
+        assert mock_session_instance.get.call_count == 3
+        assert [c[0][0] for c in sleeps.call_args_list] == [7, 7]
+
+
+def test_get_retries_connection_errors(er_server_info, sleeps):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = (
+            requests.ConnectionError("connection reset"),
+            _mock_response(200, {"data": {"username": "test"}}),
+        )
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+
+        assert client.get_me() == {"username": "test"}
+        assert mock_session_instance.get.call_count == 2
+
+
+def test_post_retries_throttling_but_not_server_errors(er_server_info, position, sleeps):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.side_effect = (
+            _mock_response(503, {}, headers={"Retry-After": "1"}),
+            _mock_response(201, {"data": {"id": "1"}}),
+        )
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        assert client.post_observation(position) == {"id": "1"}
+        assert mock_session_instance.post.call_count == 2
+        sleeps.assert_called_once_with(1)
+
+        mock_session_instance.post.reset_mock()
+        mock_session_instance.post.side_effect = None
+        mock_session_instance.post.return_value = _mock_response(500, {})
+        with pytest.raises(ERClientException) as exc_info:
+            client.post_observation(position)
+        assert exc_info.value.status_code == 500
+        mock_session_instance.post.assert_called_once()
+
+
+def test_post_does_not_retry_a_request_that_may_have_been_sent(er_server_info, position, sleeps):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.side_effect = requests.ReadTimeout("read timed out")
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+
+        with pytest.raises(requests.ReadTimeout):
+            client.post_observation(position)
+        mock_session_instance.post.assert_called_once()
+
+
+def test_delete_is_retried(er_server_info, sleeps):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.delete.side_effect = (
+            _mock_response(504, {}),
+            _mock_response(204, {}),
+        )
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        client.delete_event("event-id")
+
+        assert mock_session_instance.delete.call_count == 2
+
+
+def test_default_policy_is_the_only_retry_layer(er_server_info, sleeps):
+    client = ERClient(**er_server_info)
+    for prefix in ("http://", "https://"):
+        retries = client._http_session.get_adapter(prefix + "fake-site.erdomain.org").max_retries
+        assert (retries.total, retries.connect, retries.status) == (0, None, None)
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response(500, {})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        with pytest.raises(ERClientException):
+            client._get("user/me")
+        # As many attempts as before the retry policy
+        assert mock_session_instance.get.call_count == 5
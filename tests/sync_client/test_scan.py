@@ -0,0 +1,82 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from erclient.client import ERClient
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+END = datetime(2023, 1, 31, tzinfo=timezone.utc)
+
+
+def _mock_response(json_data):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = 200
+    resp.headers = {}
+    resp.ok = True
+    resp.text = json.dumps(json_data)
+    resp.content = resp.text.encode()
+    return resp
+
+
+def test_scan_observations(er_server_info):
+    observations = [{"id": i, "recorded_at": (START + timedelta(hours=6 * i)).isoformat()} for i in range(120)]
+
+    def get(url, params=None, **kwargs):
+        lower, upper = datetime.fromisoformat(params["since"]), datetime.fromisoformat(params["until"])
+        results = [o for o in observations if lower <= datetime.fromisoformat(o["recorded_at"]) <= upper]
+        return _mock_response({"data": {"count": len(results), "next": None, "results": results}})
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = get
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        scanned = list(client.scan_observations(START, END, partitions=4, ordered=True, subject_id="subject-1"))
+
+        assert scanned == observations
+        assert mock_session_instance.get.call_count == 4
+        for call in mock_session_instance.get.call_args_list:
+            assert call[1]["params"]["subject_id"] == "subject-1"
+
+
+def test_scan_events(er_server_info):
+    events = [{"id": i, "time": (START + timedelta(days=i)).isoformat()} for i in range(30)]
+
+    def get(url, params=None, **kwargs):
+        date_range = json.loads(params["filter"])["date_range"]
+        lower, upper = datetime.fromisoformat(date_range["lower"]), datetime.fromisoformat(date_range["upper"])
+        results = [e for e in events if lower <= datetime.fromisoformat(e["time"]) <= upper]
+        return _mock_response({"data": {"count": len(results), "next": None, "results": results}})
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = get
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        scanned = list(client.scan_events(START, END, partitions=5, split_threshold=4))
+
+        assert sorted(e["id"] for e in scanned) == list(range(30))
+
+
+def test_scan_events_counts_with_query_filters_only(er_server_info):
+    def get(url, params=None, **kwargs):
+        return _mock_response({"data": {"count": 0, "next": None, "results": []}})
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = get
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info)
+        list(client.scan_events(START, END, partitions=2, split_threshold=10, state="active", max_results=5,
+                                on_checkpoint=lambda checkpoint: None, batch_size=10))
+
+        counts = [call[1]["params"] for call in mock_session_instance.get.call_args_list
+                  if call[1]["params"].get("page_size") == 1]
+        assert len(counts) == 2
+        for params in counts:
+            assert set(params) == {"state", "filter", "page", "page_size"}
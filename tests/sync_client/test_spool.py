@@ -0,0 +1,143 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from erclient import ERClientException, ObservationSpool
+from erclient.client import ERClient
+
+
+def _mock_response(json_data, status_code=200):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = status_code
+    resp.headers = {}
+    resp.ok = status_code < 400
+    resp.text = json.dumps(json_data)
+    resp.content = resp.text.encode()
+    return resp
+
+
+def _observation(i):
+    return {"manufacturer_id": "collar-1", "recorded_at": f"2023-01-11T19:41:{i:02d}+00:00"}
+
+
+def test_observations_are_spooled_while_er_is_unreachable_and_replayed_in_order(er_server_info, tmp_path):
+    posted = []
+    outage = [True]
+
+    def post(url, data=None, **kwargs):
+        if outage[0]:
+            raise requests.ConnectionError("Connection refused")
+        posted.append((url.rsplit("/api/v1.0/", 1)[-1], json.loads(data)))
+        return _mock_response({"data": {}}, status_code=201)
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.side_effect = post
+        mock_session.return_value = mock_session_instance
+
+        spool = ObservationSpool(str(tmp_path), retry_interval=0)
+        client = ERClient(**er_server_info, spool=spool)
+        assert client.post_sensor_observation(_observation(0)) is None
+        assert client.post_observation([_observation(1)]) is None
+        assert client.post_sensor_observation(_observation(2)) is None
+        assert not spool.is_empty
+        assert posted == []
+
+        outage[0] = False
+        # Spooled observations go first, batched per endpoint, then the new one
+        client.post_sensor_observation(_observation(3))
+        sensors = f"sensors/generic/{er_server_info['provider_key']}/status"
+        assert posted == [
+            (sensors, [_observation(0)]),
+            ("observations", [_observation(1)]),
+            (sensors, [_observation(2)]),
+            (sensors, _observation(3)),
+        ]
+        assert spool.is_empty
+
+
+def test_new_observations_wait_behind_the_spool_until_the_retry_interval(er_server_info, tmp_path):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response({}, status_code=502)
+        mock_session.return_value = mock_session_instance
+
+        spool = ObservationSpool(str(tmp_path), retry_interval=60)
+        client = ERClient(**er_server_info, spool=spool)
+        client.post_sensor_observation(_observation(0))
+        assert mock_session_instance.post.call_count == 1
+
+        mock_session_instance.post.return_value = _mock_response({"data": {}}, status_code=201)
+        client.post_sensor_observation(_observation(1))
+        assert mock_session_instance.post.call_count == 1
+        assert len(spool.peek(10)) == 2
+
+        assert client.replay_spool() == 2
+        assert mock_session_instance.post.call_count == 2
+        assert spool.is_empty
+
+
+def test_rejected_observations_are_dropped_from_the_spool(er_server_info, tmp_path):
+    spool = ObservationSpool(str(tmp_path))
+    for i in range(3):
+        spool.append("sensors", _observation(i), sensor_type="generic")
+
+    def post(url, data=None, **kwargs):
+        observations = json.loads(data)
+        if _observation(1) in observations:
+            return _mock_response({"status": {"detail": "bad observation"}}, status_code=400)
+        return _mock_response({"data": {}}, status_code=201)
+
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.side_effect = post
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info, spool=spool)
+        assert client.replay_spool() == 2
+        assert spool.is_empty
+        # The batch, then each observation on its own
+        assert mock_session_instance.post.call_count == 4
+
+
+def test_other_errors_are_raised_without_spooling(er_server_info, tmp_path):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response(
+            {"status": {"detail": "bad observation"}}, status_code=400)
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**er_server_info, spool=str(tmp_path))
+        with pytest.raises(ERClientException):
+            client.post_sensor_observation(_observation(0))
+        assert client.spool.is_empty
+
+
+def test_payloads_the_codec_encodes_are_spooled_and_replayed(er_server_info, tmp_path):
+    source = uuid.uuid4()
+    observation = {"source": source, "recorded_at": datetime(2023, 1, 11, 19, 41, tzinfo=timezone.utc),
+                   "location": {"lat": Decimal("-1.59083"), "lon": Decimal("35.43903")},
+                   "additional": {"fixed_at": datetime(2023, 1, 11, 19, 40, tzinfo=timezone.utc)}}
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.side_effect = requests.ConnectionError("Connection refused")
+        mock_session.return_value = mock_session_instance
+
+        with ERClient(**er_server_info, spool=ObservationSpool(str(tmp_path), fsync="interval")) as client:
+            assert client.post_observation(observation) is None
+        assert client.spool._file.closed
+
+        mock_session_instance.post.side_effect = None
+        mock_session_instance.post.return_value = _mock_response({"data": {}}, status_code=201)
+        client = ERClient(**er_server_info, spool=str(tmp_path))
+        assert client.replay_spool() == 1
+        assert json.loads(mock_session_instance.post.call_args[1]["data"]) == [{
+            "source": str(source), "recorded_at": "2023-01-11T19:41:00+00:00",
+            "location": {"lat": -1.59083, "lon": 35.43903},
+            "additional": {"fixed_at": "2023-01-11T19:40:00+00:00"}}]
+        client.close()
@@ -0,0 +1,41 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from erclient.client import ERClient
+
+
+def _stream_response(body, chunk_size=10):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = 200
+    resp.headers = {}
+    resp.ok = True
+    # Deliver the body in small chunks, whatever chunk size is asked for
+    resp.iter_content.return_value = (
+        body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    return resp
+
+
+def test_get_observations_stream(er_server_info):
+    pages = [
+        {"data": {"next": "https://fake-site.erdomain.org/api/v1.0/observations?page=2",
+                  "results": [{"id": 1}, {"id": 2}]}},
+        {"data": {"next": None, "results": [{"id": 3}]}},
+    ]
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.side_effect = [
+            _stream_response(json.dumps(page).encode()) for page in pages]
+        mock_session.return_value = mock_session_instance
+
+        er_client = ERClient(**er_server_info)
+        observations = er_client.get_subject_observations("subject-1", stream=True)
+        assert next(observations) == {"id": 1}
+        assert mock_session_instance.get.call_count == 1
+        assert list(observations) == [{"id": 2}, {"id": 3}]
+
+        first_call, second_call = mock_session_instance.get.call_args_list
+        assert first_call[1]["stream"] is True
+        assert second_call[1]["params"]["page"] == "2"
+        assert second_call[1]["params"]["subject_id"] == "subject-1"
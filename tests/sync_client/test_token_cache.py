@@ -0,0 +1,98 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from erclient import FileTokenCache
+from erclient.client import ERClient
+
+
+def _mock_response(status_code, json_data):
+    resp = MagicMock(spec=requests.Response)
+    resp.status_code = status_code
+    resp.headers = {}
+    resp.ok = 200 <= status_code < 300
+    resp.json.return_value = json_data
+    resp.text = json.dumps(json_data)
+    resp.content = json.dumps(json_data).encode()
+    return resp
+
+
+@pytest.fixture
+def server_info_without_token(er_server_info):
+    return {k: v for k, v in er_server_info.items() if k != "token"}
+
+
+@pytest.fixture
+def token_cache(tmp_path):
+    return FileTokenCache(str(tmp_path / "tokens.json"))
+
+
+@pytest.fixture
+def token_response():
+    return {
+        "access_token": "new-access-token",
+        "refresh_token": "new-refresh-token",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+    }
+
+
+def test_login_result_is_shared_with_later_clients(server_info_without_token, token_cache, token_response):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response(200, token_response)
+        mock_session_instance.get.return_value = _mock_response(
+            200, {"data": {"username": "test"}})
+        mock_session.return_value = mock_session_instance
+
+        first = ERClient(**server_info_without_token, token_cache=token_cache)
+        first.get_me()
+        assert mock_session_instance.post.call_count == 1
+
+        # A new "worker" starts with the token the first one obtained
+        second = ERClient(**server_info_without_token, token_cache=token_cache)
+        second.get_me()
+
+        assert mock_session_instance.post.call_count == 1
+        assert second.auth == token_response
+        assert second.auth_expires == first.auth_expires
+        headers = mock_session_instance.get.call_args[1]["headers"]
+        assert headers["Authorization"] == "Bearer new-access-token"
+
+
+def test_newer_token_from_another_process_is_used_instead_of_refreshing(server_info_without_token, token_cache, token_response):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.get.return_value = _mock_response(
+            200, {"data": {"username": "test"}})
+        mock_session.return_value = mock_session_instance
+
+        client = ERClient(**server_info_without_token, token_cache=token_cache)
+        client.auth = {**token_response, "access_token": "expired-access-token"}
+        client.auth_expires = datetime.now(tz=timezone.utc) - timedelta(seconds=1)
+        key = FileTokenCache.make_key(client.service_root, client.client_id, client.username)
+        token_cache.store(key, token_response,
+                          datetime.now(tz=timezone.utc) + timedelta(minutes=30))
+
+        client.get_me()
+
+        mock_session_instance.post.assert_not_called()
+        assert client.auth["access_token"] == "new-access-token"
+
+
+def test_token_cache_is_keyed_by_username(server_info_without_token, token_cache, token_response):
+    with patch("erclient.client.requests.Session") as mock_session:
+        mock_session_instance = MagicMock()
+        mock_session_instance.post.return_value = _mock_response(200, token_response)
+        mock_session_instance.get.return_value = _mock_response(
+            200, {"data": {"username": "test"}})
+        mock_session.return_value = mock_session_instance
+
+        ERClient(**server_info_without_token, token_cache=token_cache).get_me()
+        other_user = {**server_info_without_token, "username": "someone-else"}
+        ERClient(**other_user, token_cache=token_cache).get_me()
+
+        assert mock_session_instance.post.call_count == 2
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from erclient.change_sync import ChangeStream, WatermarkFile
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+OVERLAP = timedelta(minutes=2)
+
+
+def _event(id, minutes):
+    return {"id": id, "updated_at": (T0 + timedelta(minutes=minutes)).isoformat()}
+
+
+def test_overlap_duplicates_are_dropped_and_new_versions_kept():
+    stream = ChangeStream()
+    assert stream.since(OVERLAP) is None
+    delta = stream.begin()
+    assert [delta.accept(e, "updated_at") for e in (_event("a", 0), _event("b", 10))] == [True, True]
+    delta.commit(OVERLAP)
+    assert stream.watermark == T0 + timedelta(minutes=10)
+    assert stream.since(OVERLAP) == T0 + timedelta(minutes=8)
+    # "a" is too old to be fetched again, so it's no longer remembered
+    assert set(stream.seen) == {"b"}
+
+    delta = stream.begin()
+    assert not delta.accept(_event("b", 10), "updated_at")
+    assert delta.accept(_event("b", 11), "updated_at")
+    assert delta.accept({"id": "c"}, "updated_at")  # No timestamp: can't tell
+    assert (delta.upserts, delta.duplicates) == (2, 1)
+
+
+def test_uncommitted_delta_changes_nothing():
+    stream = ChangeStream(watermark=T0)
+    delta = stream.begin()
+    delta.accept(_event("a", 5), "updated_at")
+    assert stream.watermark == T0 and stream.seen == {}
+
+
+def test_state_round_trips_through_watermark_file(tmp_path):
+    store = WatermarkFile(str(tmp_path / "state.json"))
+    assert store.load() == {}
+    stream = ChangeStream(watermark=T0, seen={"a": T0.isoformat()})
+    store.save({"events": stream.to_dict()})
+    loaded = ChangeStream.from_dict(store.load()["events"])
+    assert (loaded.watermark, loaded.seen) == (stream.watermark, stream.seen)
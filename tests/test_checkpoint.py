@@ -0,0 +1,37 @@
+import pytest
+
+from erclient.checkpoint import CheckpointFile, PaginationCheckpoint, start_checkpoint
+
+PARAMS = {"subject_id": "subject-1", "page_size": 100, "use_cursor": "true"}
+
+
+def test_start_and_advance():
+    checkpoint = start_checkpoint("observations", PARAMS)
+    assert checkpoint.next_params == PARAMS and not checkpoint.done
+    checkpoint = checkpoint.advance({**PARAMS, "cursor": "abc"}, 100).advance(None, 40)
+    assert (checkpoint.pages, checkpoint.items, checkpoint.done) == (2, 140, True)
+
+
+def test_resume_from_checkpoint_or_dict():
+    checkpoint = start_checkpoint("observations", PARAMS).advance({**PARAMS, "cursor": "abc"}, 100)
+    assert start_checkpoint("observations", PARAMS, checkpoint) is checkpoint
+    assert start_checkpoint("observations", PARAMS, checkpoint.to_dict()) == checkpoint
+
+
+def test_resume_from_a_different_query():
+    checkpoint = start_checkpoint("observations", PARAMS)
+    with pytest.raises(ValueError):
+        start_checkpoint("observations", {**PARAMS, "subject_id": "subject-2"}, checkpoint)
+    with pytest.raises(ValueError):
+        start_checkpoint("activity/events", PARAMS, checkpoint)
+
+
+def test_checkpoint_file(tmp_path):
+    checkpoints = CheckpointFile(str(tmp_path / "scan.json"))
+    assert checkpoints.load() is None
+    checkpoint = start_checkpoint("observations", PARAMS).advance({**PARAMS, "cursor": "abc"}, 100)
+    checkpoints.save(checkpoint)
+    assert checkpoints.load() == checkpoint
+    assert [p.name for p in tmp_path.iterdir()] == ["scan.json"]
+    checkpoints.clear()
+    assert checkpoints.load() is None
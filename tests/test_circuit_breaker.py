@@ -0,0 +1,59 @@
+from unittest import mock
+
+import pytest
+
+from erclient import CircuitBreaker, ERClientServiceUnreachable
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # Not consecutive anymore
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.acquire() == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(ERClientServiceUnreachable) as exc_info:
+        breaker.acquire()
+    assert 0 < exc_info.value.retry_after <= 30
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30)
+    with mock.patch("erclient.circuit_breaker.time.monotonic", return_value=100):
+        breaker.record_failure()
+    with mock.patch("erclient.circuit_breaker.time.monotonic", return_value=131):
+        assert breaker.acquire() == CircuitBreaker.HALF_OPEN
+        with pytest.raises(ERClientServiceUnreachable):
+            breaker.acquire()
+
+        breaker.record_failure()  # Probe failed
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(ERClientServiceUnreachable):
+            breaker.acquire()
+
+    with mock.patch("erclient.circuit_breaker.time.monotonic", return_value=162):
+        assert breaker.acquire() == CircuitBreaker.HALF_OPEN
+        breaker.record_success()
+        assert breaker.acquire() == CircuitBreaker.CLOSED
+
+
+def test_late_failures_do_not_delay_recovery():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30)
+    with mock.patch("erclient.circuit_breaker.time.monotonic", return_value=100):
+        breaker.record_failure()
+    # Requests sent before the circuit opened keep failing
+    for now in (110, 120, 129):
+        with mock.patch("erclient.circuit_breaker.time.monotonic", return_value=now):
+            breaker.record_failure()
+    with mock.patch("erclient.circuit_breaker.time.monotonic", return_value=131):
+        assert breaker.acquire() == CircuitBreaker.HALF_OPEN
+
+
+def test_breakers_are_shared_per_service_root():
+    breaker = CircuitBreaker.for_service("https://breaker-test-a.pamdas.org")
+    assert CircuitBreaker.for_service("https://breaker-test-a.pamdas.org") is breaker
+    assert CircuitBreaker.for_service("https://breaker-test-b.pamdas.org") is not breaker
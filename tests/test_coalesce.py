@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from erclient.coalesce import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_call():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 1}
+
+    key = SingleFlight.key("GET", "https://site/api/v1.0/status", {"b": 2, "a": 1})
+    results = await asyncio.gather(*[single_flight.do(key, fetch) for _ in range(10)])
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 10
+    assert len({id(result) for result in results}) == 10
+    assert single_flight.coalesced == 9
+    assert single_flight.in_flight == 0
+
+    await single_flight.do(key, fetch)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared():
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*[single_flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_first_caller_does_not_cancel_the_call():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.ensure_future(single_flight.do("key", fetch))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(single_flight.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "done"
+
+
+@pytest.mark.asyncio
+async def test_callers_join_a_call_whose_first_caller_was_cancelled():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.ensure_future(single_flight.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    assert single_flight.in_flight == 1
+    assert await single_flight.do("key", fetch) == "done"
+    assert len(calls) == 1
+    assert single_flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_forget_starts_new_calls():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    first = asyncio.ensure_future(single_flight.do("key", fetch))
+    await asyncio.sleep(0)
+    single_flight.forget()
+    second = asyncio.ensure_future(single_flight.do("key", fetch))
+    await asyncio.gather(first, second)
+    assert len(calls) == 2
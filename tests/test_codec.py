@@ -0,0 +1,51 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from erclient.codec import JSONCodec, OrjsonCodec, get_codec
+
+
+def test_json_codec_encodes_to_bytes():
+    recorded_at = datetime(2023, 7, 4, 21, 38, tzinfo=timezone.utc)
+    source_id = uuid.uuid4()
+    body = JSONCodec().dumps(
+        {"recorded_at": recorded_at, "source": source_id, "speed": Decimal("1.5"), "name": "Élan"})
+    assert isinstance(body, bytes)
+    assert json.loads(body) == {
+        "recorded_at": recorded_at.isoformat(),
+        "source": str(source_id),
+        "speed": 1.5,
+        "name": "Élan",
+    }
+
+
+def test_json_codec_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        JSONCodec().dumps({"value": object()})
+
+
+def test_json_codec_decodes_bytes_and_text():
+    codec = JSONCodec()
+    assert codec.loads(b'{"data": [1, 2]}') == {"data": [1, 2]}
+    assert codec.loads('{"data": [1, 2]}') == {"data": [1, 2]}
+
+
+def test_get_codec():
+    assert isinstance(get_codec(), JSONCodec)
+    assert isinstance(get_codec("json"), JSONCodec)
+    codec = JSONCodec()
+    assert get_codec(codec) is codec
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+
+
+def test_orjson_codec():
+    pytest.importorskip("orjson")
+    recorded_at = datetime(2023, 7, 4, 21, 38, tzinfo=timezone.utc)
+    codec = get_codec("orjson")
+    assert isinstance(codec, OrjsonCodec)
+    body = codec.dumps({"recorded_at": recorded_at, "speed": Decimal("1.5")})
+    assert codec.loads(body) == {"recorded_at": "2023-07-04T21:38:00+00:00", "speed": 1.5}
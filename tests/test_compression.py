@@ -0,0 +1,56 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+from erclient.compression import RequestCompression
+
+
+@pytest.fixture
+def body():
+    positions = [{"manufacturer_id": f"device-{i}", "location": {"lat": -1.5, "lon": 35.4}} for i in range(200)]
+    return json.dumps(positions).encode()
+
+
+def test_gzip(body):
+    compressed = RequestCompression().compress(body)
+    assert gzip.decompress(compressed) == body
+    assert len(compressed) * 5 < len(body)
+
+
+def test_deflate(body):
+    compression = RequestCompression(encoding="deflate", level=9)
+    assert zlib.decompress(compression.compress(body)) == body
+    assert compression.headers({"Accept": "*/*"}) == {"Accept": "*/*", "Content-Encoding": "deflate"}
+
+
+def test_small_bodies_and_disabled_compression_are_skipped(body):
+    compression = RequestCompression(threshold=len(body) + 1)
+    assert compression.compress(body) is None
+    assert compression.compress(None) is None
+    compression = RequestCompression()
+    compression.disable()
+    assert compression.compress(body) is None
+
+
+def test_from_option():
+    assert isinstance(RequestCompression.from_option(True), RequestCompression)
+    assert RequestCompression.from_option(None) is None
+    assert RequestCompression.from_option(False) is None
+    compression = RequestCompression(threshold=0)
+    assert RequestCompression.from_option(compression) is compression
+
+
+def test_unknown_encoding():
+    with pytest.raises(ValueError):
+        RequestCompression(encoding="br")
+
+
+def test_is_rejection():
+    compression = RequestCompression()
+    assert compression.is_rejection(415)
+    assert compression.is_rejection(400, '{"detail": "Unsupported Content-Encoding gzip"}')
+    assert not compression.is_rejection(400, '{"detail": "Invalid location"}')
+    assert not compression.is_rejection(400)
+    assert not compression.is_rejection(500, 'gzip')
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+from erclient import ObservationDeduplicator
+
+
+def _observation(minutes, manufacturer_id="collar-1"):
+    recorded_at = datetime(2023, 1, 11, tzinfo=timezone.utc) + timedelta(minutes=minutes)
+    return {"manufacturer_id": manufacturer_id, "recorded_at": recorded_at.isoformat()}
+
+
+def test_posted_observations_are_dropped():
+    deduplicator = ObservationDeduplicator()
+    observations = [_observation(0), _observation(1), _observation(0, "collar-2")]
+    assert deduplicator.filter(observations) == observations
+    deduplicator.mark(observations)
+
+    # The same time written differently, and repeats within one call
+    resent = {"manufacturer_id": "collar-1", "recorded_at": "2023-01-11 02:01:00+02:00"}
+    assert deduplicator.is_duplicate(resent)
+    assert deduplicator.filter([resent, _observation(2), _observation(2)]) == [_observation(2)]
+    assert (deduplicator.unique, deduplicator.duplicates) == (4, 2)
+    assert deduplicator.filter([resent, _observation(3), _observation(3)], positions=True) == (
+        [_observation(3)], [None, 0, 0])
+
+    # Observations that can't be told apart are never dropped
+    assert deduplicator.filter([{"recorded_at": "2023-01-11T00:00:00+00:00"}, {"manufacturer_id": "collar-1"}]) == [
+        {"recorded_at": "2023-01-11T00:00:00+00:00"}, {"manufacturer_id": "collar-1"}]
+
+
+def test_index_is_bounded_by_window_and_size():
+    deduplicator = ObservationDeduplicator(window=timedelta(hours=2), bucket=timedelta(hours=1))
+    deduplicator.mark([_observation(0), _observation(90)])
+    deduplicator.mark([_observation(60 * 4)])
+    assert not deduplicator.is_duplicate(_observation(0))
+    assert deduplicator.is_duplicate(_observation(60 * 4))
+    assert deduplicator.size == 1
+
+    deduplicator = ObservationDeduplicator(window=timedelta(days=1), bucket=timedelta(hours=1), max_keys=3)
+    deduplicator.mark([_observation(i) for i in range(0, 200, 20)])
+    assert deduplicator.size <= 3
+    assert deduplicator.is_duplicate(_observation(180))
+    assert not deduplicator.is_duplicate(_observation(0))
+
+
+def test_index_is_persisted(tmp_path):
+    path = str(tmp_path / "observations.json")
+    deduplicator = ObservationDeduplicator(path, save_interval=60)
+    deduplicator.mark([_observation(0)])
+    deduplicator.close()
+
+    deduplicator = ObservationDeduplicator.from_option(path)
+    assert deduplicator.is_duplicate(_observation(0))
+    assert not deduplicator.is_duplicate(_observation(1))
+
+    (tmp_path / "observations.json").write_text("{")
+    assert ObservationDeduplicator(path).size == 0
+    assert ObservationDeduplicator.from_option(None) is None
+    assert ObservationDeduplicator.from_option(deduplicator) is deduplicator
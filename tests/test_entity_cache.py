@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+import pytest
+
+from erclient import ERClientNotFound
+from erclient.entity_cache import EntityCache
+
+
+@pytest.fixture
+def clock():
+    with patch("erclient.entity_cache.time.monotonic") as monotonic:
+        monotonic.return_value = 1000.0
+        yield monotonic
+
+
+def test_results_expire_after_ttl(clock):
+    cache = EntityCache(ttl=60)
+    cache.set("get_source_subjects", "source-1", [{"id": "subject-1"}])
+    clock.return_value += 59
+    assert cache.get("get_source_subjects", "source-1") == [{"id": "subject-1"}]
+    clock.return_value += 2
+    assert cache.get("get_source_subjects", "source-1") is EntityCache.MISS
+    assert cache.stats()["get_source_subjects"] == dict(
+        hits=1, negative_hits=0, misses=1, evictions=0, size=0)
+
+
+def test_cached_results_are_copies(clock):
+    cache = EntityCache()
+    cache.set("get_source_by_manufacturer_id", "018910980", {"id": "source-1"})
+    cache.get("get_source_by_manufacturer_id", "018910980")["id"] = "changed"
+    assert cache.get("get_source_by_manufacturer_id", "018910980") == {"id": "source-1"}
+
+
+def test_not_found_is_cached_for_negative_ttl(clock):
+    cache = EntityCache(negative_ttl=10)
+    cache.set_not_found("get_source_by_manufacturer_id", "unknown")
+    with pytest.raises(ERClientNotFound):
+        cache.get("get_source_by_manufacturer_id", "unknown")
+    clock.return_value += 11
+    assert cache.get("get_source_by_manufacturer_id", "unknown") is EntityCache.MISS
+    assert cache.stats()["get_source_by_manufacturer_id"]["negative_hits"] == 1
+
+
+def test_per_method_settings(clock):
+    cache = EntityCache(max_entries=10, methods={
+        "get_subject_sources": {"ttl": 0}, "get_source_subjects": {"max_entries": 2}})
+    cache.set("get_subject_sources", "subject-1", [])
+    assert cache.get("get_subject_sources", "subject-1") is EntityCache.MISS
+    for source in ("a", "b", "c"):
+        cache.set("get_source_subjects", source, [])
+    cache.get("get_source_subjects", "b")
+    assert cache.stats()["get_source_subjects"]["evictions"] == 1
+    assert cache.get("get_source_subjects", "a") is EntityCache.MISS
+    with pytest.raises(ValueError):
+        EntityCache(methods={"get_subjects": {"ttl": 1}})
+
+
+def test_invalidate(clock):
+    cache = EntityCache()
+    cache.set("get_source_subjects", "source-1", [{"id": "subject-1"}])
+    cache.set("get_source_subjects", "source-2", [{"id": "subject-2"}])
+    cache.set("get_source_subjects", "source-3", [])
+    cache.invalidate("get_source_subjects", where=lambda subjects: any(s["id"] == "subject-2" for s in subjects))
+    assert cache.stats()["get_source_subjects"]["size"] == 2
+    cache.invalidate("get_source_subjects", "source-1")
+    assert cache.get("get_source_subjects", "source-1") is EntityCache.MISS
+    cache.invalidate("get_source_subjects")
+    assert cache.stats()["get_source_subjects"]["size"] == 0
+
+
+def test_invalidate_not_found(clock):
+    cache = EntityCache()
+    cache.set_not_found("get_source_by_manufacturer_id", "missing")
+    cache.set("get_source_by_manufacturer_id", "found", {"id": "source-1"})
+    cache.invalidate_not_found("get_source_by_manufacturer_id", ["missing", "found", "unknown"])
+    assert cache.get("get_source_by_manufacturer_id", "missing") is EntityCache.MISS
+    assert cache.get("get_source_by_manufacturer_id", "found") == {"id": "source-1"}
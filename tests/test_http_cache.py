@@ -0,0 +1,42 @@
+from erclient.http_cache import HTTPCache
+
+
+def test_key_ignores_param_order_and_none_values():
+    url = "https://fake-site.erdomain.org/api/v1.0/subjectgroups"
+    assert HTTPCache.key(url, {"flat": True, "group_name": None, "isvisible": True}) == \
+        HTTPCache.key(url, {"isvisible": True, "flat": True})
+    assert HTTPCache.key(url) == url
+
+
+def test_store_and_validators():
+    cache = HTTPCache()
+    cache.store("a", {"ETag": '"v1"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}, b"{}")
+    assert cache.get("a").validators() == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    assert cache.get("a").content == b"{}"
+
+
+def test_responses_without_validators_are_not_cached():
+    cache = HTTPCache()
+    cache.store("a", {"ETag": '"v1"'}, b"{}")
+    cache.store("a", {}, b"[]")
+    assert cache.get("a") is None
+    cache.store("b", {"ETag": '"v1"', "Cache-Control": "private, no-store"}, b"{}")
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_dropped():
+    cache = HTTPCache(max_entries=2)
+    cache.store("a", {"ETag": "1"}, b"a")
+    cache.store("b", {"ETag": "2"}, b"b")
+    cache.get("a")
+    cache.store("c", {"ETag": "3"}, b"c")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_from_option():
+    assert isinstance(HTTPCache.from_option(True), HTTPCache)
+    assert HTTPCache.from_option(None) is None
+    cache = HTTPCache()
+    assert HTTPCache.from_option(cache) is cache
@@ -0,0 +1,64 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from erclient.observation_cache import ObservationCache
+
+
+def test_floor_and_settled_until(tmp_path):
+    cache = ObservationCache(str(tmp_path), bucket=timedelta(hours=6), settle=timedelta(days=2))
+    value = datetime(2024, 1, 1, 13, 30, tzinfo=timezone.utc)
+    assert cache.floor(value) == datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    assert cache.settled_until(value) == datetime(2023, 12, 30, 12, tzinfo=timezone.utc)
+
+
+def test_store_and_load(tmp_path):
+    cache = ObservationCache(str(tmp_path))
+    key = cache.key("site", "subject_id", "subject-1", "2024-01-01")
+    assert cache.load(key) is None
+    cache.store(key, [{"id": 1}])
+    assert cache.load(key) == [{"id": 1}]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_truncated_file_is_a_miss(tmp_path):
+    cache = ObservationCache(str(tmp_path))
+    cache.store("k", [{"id": i} for i in range(100)])
+    path = os.path.join(str(tmp_path), "k.json.gz")
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+    assert cache.load("k") is None
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = ObservationCache(str(tmp_path), max_bytes=10 ** 6)
+    observations = [{"id": i} for i in range(10)]
+    for key in ("a", "b", "c"):
+        cache.store(key, observations)
+    past = time.time() - 100
+    for key, age in (("a", 1), ("b", 3), ("c", 2)):
+        os.utime(os.path.join(str(tmp_path), f"{key}.json.gz"), (past - age, past - age))
+    size = os.path.getsize(os.path.join(str(tmp_path), "a.json.gz"))
+    cache.max_bytes = size * 2
+    cache.load("b")  # Now the most recently used
+    cache.store("d", observations)
+    assert {key for key in "abcd" if cache.load(key) is not None} == {"b", "d"}
+
+
+def test_directory_is_scanned_only_when_over_max_bytes(tmp_path):
+    cache = ObservationCache(str(tmp_path), max_bytes=10 ** 6)
+    observations = [{"id": i} for i in range(10)]
+    cache.store("a", observations)  # The first store scans the directory
+    with patch("erclient.observation_cache.os.scandir", wraps=os.scandir) as scandir:
+        for key in "bcd":
+            cache.store(key, observations)
+        cache.store("a", observations)  # Replacing a file doesn't grow the directory
+        assert scandir.call_count == 0
+        cache.max_bytes = cache.size() - 1
+        assert scandir.call_count == 1
+        cache.store("e", observations)
+        assert scandir.call_count == 2
+    assert cache.size() <= cache.max_bytes
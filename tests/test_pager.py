@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from erclient.er_errors import ERClientNotFound, ERClientServiceUnreachable
+from erclient.pager import ConcurrentPager
+from erclient.retry import RetryPolicy
+
+NO_BACKOFF = RetryPolicy(backoff_factor=0, jitter=False)
+
+
+def _pages(total, page_size, with_count=True):
+    def fetch_page(page):
+        results = list(range((page - 1) * page_size, min(page * page_size, total)))
+        if not results and page > 1:
+            raise ERClientNotFound()
+        response = {"results": results, "next": f"?page={page + 1}" if page * page_size < total else None}
+        if with_count:
+            response["count"] = total
+        return response
+    return fetch_page
+
+
+def test_yields_every_object_in_page_order():
+    pager = ConcurrentPager(_pages(95, 10), page_size=10, threads=4, ordered=True)
+    assert list(pager) == list(range(95))
+
+
+@pytest.mark.parametrize("total", [0, 10, 25])
+def test_pages_without_count_stop_at_the_last_page(total):
+    pager = ConcurrentPager(_pages(total, 10, with_count=False), page_size=10, threads=3)
+    assert sorted(pager) == list(range(total))
+
+
+def test_failed_page_is_fetched_again():
+    fetch_page = _pages(50, 10)
+    calls = []
+
+    def flaky(page):
+        calls.append(page)
+        if page == 3 and calls.count(3) < 3:
+            raise ERClientServiceUnreachable("unavailable")
+        return fetch_page(page)
+
+    pager = ConcurrentPager(flaky, page_size=10, retries=3, retry_policy=NO_BACKOFF, ordered=True)
+    assert list(pager) == list(range(50))
+    assert calls.count(3) == 3
+
+
+def test_gives_up_after_retries():
+    def failing(page):
+        if page == 2:
+            raise ERClientServiceUnreachable("unavailable")
+        return _pages(50, 10)(page)
+
+    pager = ConcurrentPager(failing, page_size=10, retries=2, retry_policy=NO_BACKOFF)
+    with pytest.raises(ERClientServiceUnreachable):
+        list(pager)
+
+
+def test_in_flight_pages_are_bounded():
+    fetch_page = _pages(1000, 10)
+    lock = threading.Lock()
+    requested = []
+
+    def tracked(page):
+        with lock:
+            requested.append(page)
+        return fetch_page(page)
+
+    pager = iter(ConcurrentPager(tracked, page_size=10, threads=2, max_in_flight=4, ordered=True))
+    for _ in range(25):  # Three pages consumed
+        next(pager)
+    # Pages are only requested as earlier ones are consumed
+    assert len(requested) <= 3 + 4
+    pager.close()
+
+
+def test_progress():
+    progress = []
+    pager = ConcurrentPager(_pages(25, 10), page_size=10, ordered=True,
+                            progress=lambda *args: progress.append(args))
+    list(pager)
+    assert progress == [(1, 3, 10), (2, 3, 20), (3, 3, 25)]
+
+
+def test_retry_after_of_the_error_is_honored(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("erclient.pager.time.sleep", sleeps.append)
+    fetch_page = _pages(20, 10)
+    calls = []
+
+    def throttled(page):
+        calls.append(page)
+        if page == 2 and calls.count(2) == 1:
+            raise ERClientServiceUnreachable("unavailable", status_code=503, retry_after=7)
+        return fetch_page(page)
+
+    pager = ConcurrentPager(throttled, page_size=10, retry_policy=NO_BACKOFF, ordered=True)
+    assert list(pager) == list(range(20))
+    assert sleeps == [7]
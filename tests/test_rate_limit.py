@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+
+from erclient.rate_limit import RateLimiter, TokenBucket
+
+
+def test_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=10, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # Each further reservation waits one more token's worth
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_bucket_refills_over_time():
+    bucket = TokenBucket(rate=100, capacity=1)
+    assert bucket.reserve() == 0
+    time.sleep(0.02)
+    assert bucket.reserve() == 0
+
+
+def test_bucket_rejects_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_paces_requests():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    await asyncio.gather(*[bucket.acquire_async() for _ in range(6)])
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+
+
+@pytest.mark.parametrize("path,expected", [
+    ("observations", "observations"),
+    ("/observations/", "observations/"),
+    ("https://site.pamdas.org/api/v1.0/activity/events?page=2", "activity/events"),
+    ("https://site.pamdas.org/api/v2.0/activity/eventtypes", "activity/eventtypes"),
+    ("https://host.example.org/er/api/v1.0/activity/events", "activity/events"),
+    ("/er/api/v1.0/sensors/generic/provider/status", "sensors/generic/provider/status"),
+    ("sensors/generic/provider/status", "sensors/generic/provider/status"),
+])
+def test_endpoint_is_relative_to_the_api_root(path, expected):
+    assert RateLimiter.endpoint(path) == expected
+
+
+def test_longest_prefix_wins():
+    limiter = RateLimiter(limits={"activity/events": 5, "activity/events/categories": (1, 2), "sensors/": 20},
+                          default=50)
+    assert limiter.bucket_for("activity/events").rate == 5
+    assert limiter.bucket_for("activity/event/1234").rate == 50
+    assert limiter.bucket_for("activity/events/categories").capacity == 2
+    assert limiter.bucket_for("https://site.pamdas.org/api/v1.0/sensors/generic/x/status").rate == 20
+    assert RateLimiter(limits={"observations": 1}).bucket_for("subjects") is None
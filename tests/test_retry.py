@@ -0,0 +1,56 @@
+import pytest
+
+from erclient.retry import RetryPolicy
+
+
+@pytest.mark.parametrize("method,status_code,expected", [
+    ("GET", 429, True),
+    ("GET", 500, True),
+    ("GET", 502, True),
+    ("GET", 400, False),
+    ("GET", 404, False),
+    ("DELETE", 504, True),
+    ("POST", 429, True),
+    ("POST", 503, True),
+    ("POST", 500, False),
+    ("POST", 502, False),
+    ("PATCH", 504, False),
+])
+def test_should_retry_by_method_and_status(method, status_code, expected):
+    assert RetryPolicy().should_retry(method, 1, status_code=status_code) is expected
+
+
+def test_non_idempotent_requests_retry_connection_errors_only_when_not_sent():
+    policy = RetryPolicy()
+    assert policy.should_retry("GET", 1)
+    assert not policy.should_retry("POST", 1)
+    assert policy.should_retry("POST", 1, request_sent=False)
+    assert policy.copy(retry_non_idempotent=True).should_retry("POST", 1, status_code=500)
+
+
+def test_gives_up_after_max_retries():
+    policy = RetryPolicy(max_retries=2)
+    assert policy.retry_delay("GET", 2, status_code=503) is not None
+    assert policy.retry_delay("GET", 3, status_code=503) is None
+    assert RetryPolicy(max_retries=0).retry_delay("GET", 1, status_code=503) is None
+
+
+def test_backoff_grows_exponentially_and_is_capped():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+    assert [policy.backoff(n) for n in range(1, 6)] == [1, 2, 4, 5, 5]
+
+
+def test_jitter_stays_within_backoff():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=8)
+    for _ in range(50):
+        assert 0 <= policy.backoff(4) <= 8
+
+
+def test_retry_after_is_used_instead_of_backoff():
+    policy = RetryPolicy(backoff_factor=10, jitter=False, max_retry_after=60)
+    assert policy.retry_delay("POST", 1, status_code=429, retry_after=2) == 2
+    assert policy.retry_delay("POST", 1, status_code=429, retry_after=0) == 0
+    # Longer than we are willing to wait: give up and let the caller see retry_after
+    assert policy.retry_delay("POST", 1, status_code=429, retry_after=61) is None
+    assert policy.copy(respect_retry_after=False).retry_delay(
+        "POST", 1, status_code=429, retry_after=61) == 10
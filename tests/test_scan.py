@@ -0,0 +1,130 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from erclient.scan import (RESOLUTION, ScanPlanner, Window, event_window_filter,
+                           scan_windows, scan_windows_async)
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+END = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_windows_cover_the_range_without_overlap():
+    windows = ScanPlanner(START, END, partitions=4).windows()
+    assert len(windows) == 4
+    assert windows[0].start == START
+    assert windows[-1].end == END
+    for previous, window in zip(windows, windows[1:]):
+        assert window.start == previous.end + RESOLUTION
+
+
+def test_iso_strings_and_naive_datetimes_are_utc():
+    planner = ScanPlanner("2023-01-01T00:00:00Z", datetime(2023, 1, 2))
+    assert planner.start == START
+    assert planner.end == datetime(2023, 1, 2, tzinfo=timezone.utc)
+    with pytest.raises(ValueError):
+        ScanPlanner(END, START)
+
+
+def test_dense_windows_are_split_until_below_threshold():
+    # All items are in the first week of the year
+    dense_end = START + timedelta(days=7)
+
+    def count_window(window):
+        overlap = min(window.end, dense_end) - max(window.start, START)
+        return max(0, overlap / timedelta(days=7) * 1000)
+
+    planner = ScanPlanner(START, END, partitions=2, split_threshold=300)
+    windows = planner.plan(count_window)
+    assert windows == sorted(windows)
+    assert windows[0].start == START and windows[-1].end == END
+    assert all(count_window(w) <= 300 for w in windows)
+    assert len(windows) > 2
+
+    async def count_window_async(window):
+        return count_window(window)
+
+    assert asyncio.run(planner.plan_async(count_window_async)) == windows
+
+
+def test_windows_are_not_split_below_min_window():
+    planner = ScanPlanner(START, START + timedelta(minutes=3), partitions=1, split_threshold=0,
+                          min_window=timedelta(minutes=1))
+    assert len(planner.plan(lambda window: 10)) == 2
+
+
+def test_event_window_filter_keeps_other_criteria():
+    window = Window(START, END)
+    event_filter = json.loads(event_window_filter('{"state": ["active"]}', window))
+    assert event_filter == {"state": ["active"],
+                            "date_range": {"lower": START.isoformat(), "upper": END.isoformat()}}
+
+
+def _windows(count):
+    return ScanPlanner(START, END, partitions=count).windows()
+
+
+def test_scan_windows_ordered():
+    windows = _windows(4)
+
+    def scan_window(window):
+        index = windows.index(window)
+        for i in range(50):
+            yield index, i
+
+    assert list(scan_windows(windows, scan_window, ordered=True, max_concurrency=2, buffer_size=5)) == [
+        (index, i) for index in range(4) for i in range(50)]
+    unordered = list(scan_windows(windows, scan_window, buffer_size=5))
+    assert sorted(unordered) == [(index, i) for index in range(4) for i in range(50)]
+
+
+def test_scan_windows_errors_and_early_stop():
+    windows = _windows(3)
+    started = []
+    lock = threading.Lock()
+
+    def scan_window(window):
+        with lock:
+            started.append(window)
+        if window == windows[1]:
+            raise ValueError("boom")
+        yield from range(1000)
+
+    with pytest.raises(ValueError):
+        list(scan_windows(windows, scan_window, ordered=True, buffer_size=2))
+
+    items = scan_windows(windows[:1], lambda window: iter(range(1000)), buffer_size=2)
+    assert next(items) == 0
+    items.close()
+
+
+@pytest.mark.asyncio
+async def test_scan_windows_async():
+    windows = _windows(4)
+
+    async def scan_window(window):
+        index = windows.index(window)
+        for i in range(20):
+            await asyncio.sleep(0)
+            yield index, i
+
+    ordered = [item async for item in scan_windows_async(windows, scan_window, ordered=True,
+                                                         max_concurrency=2, buffer_size=3)]
+    assert ordered == [(index, i) for index in range(4) for i in range(20)]
+    unordered = [item async for item in scan_windows_async(windows, scan_window, buffer_size=3)]
+    assert sorted(unordered) == ordered
+
+
+@pytest.mark.asyncio
+async def test_scan_windows_async_errors():
+    windows = _windows(2)
+
+    async def scan_window(window):
+        yield 1
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        [item async for item in scan_windows_async(windows, scan_window)]
@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+from erclient.spool import OBSERVATIONS, SENSORS, ObservationSpool
+
+
+def _observation(i):
+    return {"manufacturer_id": "collar-1", "recorded_at": f"2023-01-11T19:41:{i:02d}+00:00"}
+
+
+def test_records_are_read_back_in_order_until_acknowledged(tmp_path):
+    spool = ObservationSpool(str(tmp_path))
+    assert spool.is_empty
+    assert spool.next_batch() is None
+
+    spool.append(OBSERVATIONS, _observation(0))
+    spool.append(SENSORS, [_observation(1), _observation(2)], sensor_type="gps")
+    assert not spool.is_empty
+
+    entries = spool.peek(10)
+    assert [record["payload"] for _, record in entries] == [_observation(0), [_observation(1), _observation(2)]]
+    assert entries[1][1]["sensor_type"] == "gps"
+
+    spool.ack(entries[0][0])
+    assert [record["kind"] for _, record in spool.peek(10)] == [SENSORS]
+    spool.ack(entries[1][0])
+    assert spool.is_empty
+    assert spool.peek(10) == []
+
+
+def test_next_batch_groups_records_for_the_same_endpoint(tmp_path):
+    spool = ObservationSpool(str(tmp_path), batch_size=3)
+    for i in range(4):
+        spool.append(SENSORS, _observation(i), sensor_type="generic")
+    spool.append(SENSORS, _observation(4), sensor_type="gps")
+
+    kind, sensor_type, entries = spool.next_batch()
+    assert (kind, sensor_type) == (SENSORS, "generic")
+    assert [observations for _, observations in entries] == [[_observation(i)] for i in range(3)]
+    spool.ack(entries[-1][0])
+
+    # The last generic observation isn't posted together with the gps one
+    _, _, entries = spool.next_batch()
+    assert [observations for _, observations in entries] == [[_observation(3)]]
+    spool.ack(entries[-1][0])
+    assert spool.next_batch()[:2] == (SENSORS, "gps")
+
+
+def test_segments_rotate_and_are_deleted_once_posted(tmp_path):
+    spool = ObservationSpool(str(tmp_path), segment_bytes=200)
+    for i in range(10):
+        spool.append(OBSERVATIONS, _observation(i))
+    segments = [name for name in os.listdir(tmp_path) if name.endswith(".log")]
+    assert len(segments) > 1
+
+    entries = spool.peek(100)
+    assert [record["payload"] for _, record in entries] == [_observation(i) for i in range(10)]
+    spool.ack(entries[-1][0])
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".log")] == [max(segments)]
+    assert spool.is_empty
+
+
+def test_reopened_spool_resumes_after_the_acknowledged_record(tmp_path):
+    spool = ObservationSpool(str(tmp_path))
+    for i in range(3):
+        spool.append(OBSERVATIONS, _observation(i))
+    spool.ack(spool.peek(1)[0][0])
+    spool.close()
+
+    spool = ObservationSpool(str(tmp_path))
+    assert [record["payload"] for _, record in spool.peek(10)] == [_observation(1), _observation(2)]
+    spool.ack(spool.peek(10)[-1][0])
+    spool.close()
+
+    # Everything was posted: nothing is replayed, new records are read back
+    spool = ObservationSpool(str(tmp_path))
+    assert spool.is_empty
+    spool.append(OBSERVATIONS, _observation(3))
+    assert [record["payload"] for _, record in spool.peek(10)] == [_observation(3)]
+
+
+def test_a_record_cut_short_by_a_crash_is_discarded(tmp_path):
+    spool = ObservationSpool(str(tmp_path))
+    spool.append(OBSERVATIONS, _observation(0))
+    spool.append(OBSERVATIONS, _observation(1))
+    spool.close()
+    segment = os.path.join(tmp_path, [name for name in os.listdir(tmp_path) if name.endswith(".log")][0])
+    with open(segment, "r+b") as f:
+        f.truncate(os.path.getsize(segment) - 5)
+
+    spool = ObservationSpool(str(tmp_path))
+    assert [record["payload"] for _, record in spool.peek(10)] == [_observation(0)]
+    spool.append(OBSERVATIONS, _observation(2))
+    assert [record["payload"] for _, record in spool.peek(10)] == [_observation(0), _observation(2)]
+
+
+def test_a_damaged_record_in_the_middle_is_skipped(tmp_path):
+    spool = ObservationSpool(str(tmp_path))
+    for i in range(3):
+        spool.append(OBSERVATIONS, _observation(i))
+    spool.close()
+    segment = os.path.join(tmp_path, [name for name in os.listdir(tmp_path) if name.endswith(".log")][0])
+    with open(segment, "rb") as f:
+        lines = f.readlines()
+    with open(segment, "wb") as f:
+        f.write(lines[0] + lines[1].replace(b"collar-1", b"collar-X") + lines[2])
+
+    spool = ObservationSpool(str(tmp_path))
+    assert [record["payload"] for _, record in spool.peek(10)] == [_observation(0), _observation(2)]
+    spool.append(OBSERVATIONS, _observation(3))
+    assert [record["payload"] for _, record in spool.peek(10)] == [_observation(0), _observation(2), _observation(3)]
+
+    # A damaged last record doesn't keep the spool from emptying
+    spool.ack(spool.peek(10)[-1][0])
+    spool.close()
+    with open(segment, "ab") as f:
+        f.write(lines[1].replace(b"collar-1", b"collar-X"))
+    spool = ObservationSpool(str(tmp_path))
+    assert not spool.is_empty
+    assert spool.peek(10) == []
+    assert spool.is_empty
+
+
+def test_fsync_policy_is_validated(tmp_path):
+    with pytest.raises(ValueError):
+        ObservationSpool(str(tmp_path), fsync="sometimes")
+    assert ObservationSpool.from_option(None) is None
+    spool = ObservationSpool.from_option(str(tmp_path))
+    assert ObservationSpool.from_option(spool) is spool
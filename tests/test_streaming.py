@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from erclient.streaming import ResultsStreamParser
+
+
+def _parse(body, chunk_size):
+    parser = ResultsStreamParser()
+    items = []
+    for i in range(0, len(body), chunk_size):
+        items.extend(parser.feed(body[i:i + chunk_size]))
+    items.extend(parser.close())
+    return items, parser
+
+
+@pytest.fixture
+def page():
+    return {
+        "data": {
+            "count": 3,
+            "next": "https://fake-site.erdomain.org/api/v1.0/observations?page=2",
+            "previous": None,
+            "results": [
+                {"id": 1, "additional": {"note": "quote \" and bracket ] inside", "tags": ["a", "b"]}},
+                {"id": 2, "additional": {"name": "Élan ☃"}, "location": {"lat": -1.59083, "lon": 35.43903}},
+                {"id": 3, "additional": {}},
+            ],
+        },
+        "status": {"code": 200, "message": "OK"},
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 100000])
+def test_results_are_streamed_at_any_chunk_size(page, chunk_size):
+    body = json.dumps(page, ensure_ascii=False).encode("utf-8")
+    items, parser = _parse(body, chunk_size)
+    assert items == page["data"]["results"]
+    assert parser.page == {**page["data"], "results": []}
+    assert parser.envelope["status"] == page["status"]
+
+
+def test_items_are_returned_as_soon_as_they_are_complete(page):
+    body = json.dumps(page).encode()
+    first_item_end = body.index(b'"id": 2') - 2
+    parser = ResultsStreamParser()
+    assert parser.feed(body[:first_item_end]) == [page["data"]["results"][0]]
+
+
+def test_pagination_after_results_and_unwrapped_pages():
+    body = json.dumps({"results": [1.5, 22, "x"], "next": None, "count": 3}).encode()
+    items, parser = _parse(body, 3)
+    assert items == [1.5, 22, "x"]
+    assert parser.page == {"results": [], "next": None, "count": 3}
+
+
+def test_nested_results_keys_are_not_streamed():
+    page = {"results": [{"id": 1, "results": [1, 2]}], "meta": {"results": [3]}}
+    items, parser = _parse(json.dumps(page).encode(), 5)
+    assert items == [{"id": 1, "results": [1, 2]}]
+    assert parser.envelope == {"results": [], "meta": {"results": [3]}}
+
+
+def test_truncated_body_raises():
+    parser = ResultsStreamParser()
+    parser.feed(b'{"results": [{"id": 1}, {"id"')
+    with pytest.raises(ValueError):
+        parser.close()
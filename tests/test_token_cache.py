@@ -0,0 +1,109 @@
+import json
+import os
+import stat
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from erclient.token_cache import FileTokenCache
+
+AUTH = {
+    "access_token": "cached-access-token",
+    "refresh_token": "cached-refresh-token",
+    "token_type": "Bearer",
+    "expires_in": 3600,
+}
+
+
+@pytest.fixture
+def token_cache(tmp_path):
+    return FileTokenCache(str(tmp_path / "tokens.json"))
+
+
+def test_store_and_load_round_trip(token_cache):
+    key = FileTokenCache.make_key("https://site.pamdas.org", "das_web_client", "user")
+    auth_expires = datetime.now(tz=timezone.utc) + timedelta(hours=1)
+
+    token_cache.store(key, AUTH, auth_expires)
+
+    assert token_cache.load(key) == (AUTH, auth_expires)
+
+
+def test_expired_and_missing_tokens_are_not_returned(token_cache):
+    key = FileTokenCache.make_key("https://site.pamdas.org", "das_web_client", "user")
+    token_cache.store(key, AUTH, datetime.now(tz=timezone.utc) - timedelta(seconds=1))
+
+    assert token_cache.load(key) is None
+    assert token_cache.load("unknown") is None
+
+
+def test_keys_depend_on_site_client_and_username():
+    keys = {
+        FileTokenCache.make_key("https://a.pamdas.org", "das_web_client", "user"),
+        FileTokenCache.make_key("https://b.pamdas.org", "das_web_client", "user"),
+        FileTokenCache.make_key("https://a.pamdas.org", "other_client", "user"),
+        FileTokenCache.make_key("https://a.pamdas.org", "das_web_client", "other"),
+    }
+    assert len(keys) == 4
+
+
+def test_cache_file_is_private(token_cache):
+    token_cache.store("key", AUTH, datetime.now(tz=timezone.utc) + timedelta(hours=1))
+
+    mode = stat.S_IMODE(os.stat(token_cache.path).st_mode)
+    assert mode == 0o600
+
+
+def test_delete_and_corrupt_file(token_cache):
+    token_cache.store("key", AUTH, datetime.now(tz=timezone.utc) + timedelta(hours=1))
+    token_cache.delete("key")
+    assert token_cache.load("key") is None
+
+    with open(token_cache.path, "w") as f:
+        f.write("{not json")
+    assert token_cache.load("key") is None
+    token_cache.store("key", AUTH, datetime.now(tz=timezone.utc) + timedelta(hours=1))
+    with open(token_cache.path) as f:
+        assert "key" in json.load(f)
+
+
+def test_lock_is_reentrant_and_exclusive_between_threads(token_cache):
+    events = []
+
+    def other_thread():
+        with token_cache.locked():
+            events.append("other")
+
+    with token_cache.locked():
+        with token_cache.locked():
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join(timeout=0.1)
+            events.append("owner")
+
+    thread.join()
+    assert events == ["owner", "other"]
+
+
+def test_lock_can_be_released_by_its_owner_from_another_thread(token_cache):
+    owner = object()
+    taken = threading.Thread(target=token_cache.acquire, args=(owner,))
+    taken.start()
+    taken.join()
+    events = []
+
+    def other_thread():
+        with token_cache.locked():
+            events.append("other")
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    thread.join(timeout=0.1)
+    assert events == []
+    with pytest.raises(RuntimeError):
+        token_cache.release()
+
+    token_cache.release(owner)
+    thread.join()
+    assert events == ["other"]